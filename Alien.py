@@ -1,14 +1,111 @@
 import time
 import math
+import bisect
 import unicodedata
 from typing import Callable, Dict, List, Tuple, Optional, Any
 import random
 import os
+import sys
+import contextlib
+import contextvars
+import threading
+from array import array
+
+from AlienContent import CONTENT_DIR, load_records
+
+# Console: where the game writes its messages and reads its answers
+class Console:
+    """The terminal. A chat bot session swaps in its own console with using_console."""
+
+    def write(self, message: str) -> None:
+        print(message)
+
+    def read(self, prompt: str) -> str:
+        return input(prompt)
+
+    def clear(self) -> None:
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+class SilentConsole(Console):
+    """Console of a bot or a script: nobody reads the messages and nothing is asked."""
+
+    def write(self, message: str) -> None:
+        pass
+
+    def read(self, prompt: str) -> str:
+        return ""
+
+    def clear(self) -> None:
+        pass
+
+current_console = contextvars.ContextVar('current_console', default=Console())
+
+@contextlib.contextmanager
+def using_console(console: Console):
+    """Send the messages of the game to this console inside the with block (per asyncio task)."""
+    token = current_console.set(console)
+    try:
+        yield console
+    finally:
+        current_console.reset(token)
+
+def say(message: Any = "") -> None:
+    current_console.get().write(str(message))
+
+def ask(prompt: str = "") -> str:
+    return current_console.get().read(prompt)
+
+# Small integer IDs of the monsters and zones: the kill counters of the players are arrays indexed by them
+class NameIds:
+    """IDs given in order of first sight and never reused, so a reload of content/ keeps the counters right.
+
+    Safe from several threads: the server loads players and content in executor threads.
+    """
+
+    __slots__ = ('ids', 'names', 'lock')
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """ID of the name, given now if it is new."""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            with self.lock:  # Checked again: another thread may have given it meanwhile
+                name_id = self.ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self.names.append(name)  # Before the ID is visible, so name(name_id) always works
+                    self.ids[name] = name_id
+        return name_id
+
+    def get(self, name: str) -> Optional[int]:
+        return self.ids.get(name)
+
+    def name(self, name_id: int) -> str:
+        return self.names[name_id]
+
+monster_ids = NameIds()
+zone_ids = NameIds()
+
+def clear_screen() -> None:
+    current_console.get().clear()
 
 # Class
 class Monster:
+    """Template of a monster species, shared by every fight. The live HP of a fight is in its Encounter."""
+
+    __slots__ = ('name', 'id', 'hp', 'damage', 'defense', 'crit_chance', 'crit_damage', 'dodge_chance', 'gold_reward', 'xp_reward',
+                 'damage_factor', '_frozen')
+
     def __init__(self, name: str, hp: int, damage: int, defense: int, gold_reward: int,xp_reward: int, crit_chance=0.03, crit_damage=1.25, dodge_chance=0.01):
         self.name = name
+        self.id = monster_ids.intern(name)  # Index of the monster in the kill counters of the players
         self.hp = hp
         self.damage = damage
         self.defense = defense
@@ -17,52 +114,134 @@ class Monster:
         self.dodge_chance = dodge_chance
         self.gold_reward = gold_reward
         self.xp_reward = xp_reward
-        self.initial_hp = hp  # Store the initial HP to reset later
+        self.damage_factor = 1 - Player.calculate_damage_reduction(defense) / 100.0  # Share of the player's damage that goes through
+        self._frozen = True  # Templates never change once built
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Monster templates are immutable, the HP of a fight against {self.name} lives in its Encounter.")
+        super().__setattr__(name, value)
+
+    @property
+    def initial_hp(self) -> int:
+        return self.hp
 
     @property
     def variable_gold_reward(self):
         """Return a random gold reward between 70% and 130% of the monster's gold reward."""
+        return self.roll_gold_reward()
+
+    def roll_gold_reward(self, rng=random) -> int:
+        """Roll a gold reward between 70% and 130% of the monster's gold reward."""
         variation = self.gold_reward * 0.3
-        return round(random.uniform(self.gold_reward - variation, self.gold_reward + variation))
+        return round(rng.uniform(self.gold_reward - variation, self.gold_reward + variation))
 
-    def attack(self, player: 'Player') -> None:
-        """The monster attacks the player."""
+    def roll_attack(self, player: 'Player', rng=random) -> 'BattleEvent':
+        """Roll one attack against the player without applying it."""
         damage_variation = self.damage * 0.1  # Calculate 10% of the monster's damage
-        modified_damage = self.damage + random.uniform(-damage_variation, damage_variation)  # Add the random damage variation to the monster's damage
+        modified_damage = self.damage + rng.uniform(-damage_variation, damage_variation)  # Add the random damage variation to the monster's damage
         modified_damage = round(modified_damage)  # Round the modified damage
-        
-        if random.random() <= player.dodge_chance:  # Player dodges the attack
-            print(f"{player.name} dodged the attack from {self.name}!")
-        elif random.random() <= self.crit_chance:  # Monster lands a critical hit
+
+        stats = player.stats
+        if rng.random() <= stats.dodge_chance:  # Player dodges the attack
+            return BattleEvent(self.name, player.name, 0, dodged=True)
+        elif rng.random() <= self.crit_chance:  # Monster lands a critical hit
             crit_dmg = round(modified_damage * self.crit_damage)  # Round the critical damage
-            damage_reduction = player.calculate_damage_reduction(player.calculate_defense())
-            effective_crit_damage = crit_dmg * (1 - damage_reduction / 100.0)  # Apply the damage reduction
+            effective_crit_damage = crit_dmg * stats.damage_factor  # Apply the damage reduction
             effective_crit_damage = round(effective_crit_damage)  # Round the effective crit damage
-            player.hp -= effective_crit_damage
-            print(f"{self.name} landed a critical hit on {player.name} for {effective_crit_damage} damage!")
+            return BattleEvent(self.name, player.name, effective_crit_damage, critical=True)
         else:
-            damage_reduction = player.calculate_damage_reduction(player.calculate_defense())
-            effective_damage = modified_damage * (1 - damage_reduction / 100.0)  # Apply the damage reduction after the damage variation
+            effective_damage = modified_damage * stats.damage_factor  # Apply the damage reduction after the damage variation
             effective_damage = round(effective_damage)  # Round the effective damage
-            player.hp -= effective_damage  # Player gets hit
-            print(f"{self.name} attacked {player.name} for {effective_damage} damage!")
+            return BattleEvent(self.name, player.name, effective_damage)
+
+    def attack(self, encounter: 'Encounter') -> None:
+        """The monster attacks the player of the encounter."""
+        say(encounter.monster_turn().describe())
+
+class StoredField:
+    """Attribute of Player kept in its own slot (_name), or in a column of the PlayerStore the player was added to.
+
+    A watched field tells Player.on_change (the leaderboards) every time it is set.
+    """
+
+    def __init__(self, watched: bool = False):
+        self.watched = watched
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        self.slot = owner.__dict__['_' + name]
+
+    def __get__(self, player: Optional['Player'], owner: type) -> Any:
+        if player is None:
+            return self
+        if player._store is None:
+            return self.slot.__get__(player, owner)
+        return player._store.columns[self.name][player._row].item()
+
+    def __set__(self, player: 'Player', value: Any) -> None:
+        if player._store is None:
+            self.slot.__set__(player, value)
+        else:
+            player._store.columns[self.name][player._row] = value
+        if self.watched and player.on_change is not None:
+            player.on_change(player, self.name, None)
 
 class Player:
     """Player class for the RPG game."""
 
-    def __init__(self, name: str):
+    # Slots instead of a __dict__ per player: the bot keeps thousands of them in memory
+    __slots__ = ('name', '_max_hp', '_xp', '_level', 'level_bonuses', 'achievements', 'achieved', '_total_xp', 'idle_zone', 'idle_since',
+                 '_stats', '_hp', '_base_atk', '_gold', '_defense', '_crit_chance', '_crit_damage', '_dodge_chance', 'in_battle', 'inventory',
+                 'equipped_weapon', 'equipped_ring', 'equipped_necklace', 'equipped_armor', 'kills', 'zone_kills', 'total_kills',
+                 '_store', '_row', 'on_change')
+
+    # The numbers a PlayerStore (AlienStore.py) can keep in columns, for the batch operations over every player
+    STORED_FIELDS = ('level', 'xp', 'total_xp', 'gold', 'hp', 'max_hp', 'base_atk', 'defense', 'crit_chance', 'crit_damage', 'dodge_chance')
+    level = StoredField()
+    xp = StoredField()
+    total_xp = StoredField(watched=True)
+    gold = StoredField(watched=True)
+    hp = StoredField()
+    max_hp = StoredField()
+    base_atk = StoredField()
+    defense = StoredField()
+    crit_chance = StoredField()
+    crit_damage = StoredField()
+    dodge_chance = StoredField()
+
+    def __init__(self, name: str, achievements: Optional['AchievementCatalogue'] = None):
         """Initialize the player with default attributes."""
+        self._store = None  # PlayerStore holding the stored fields, see AlienStore.py
+        self._row = -1
+        # Called as on_change(player, field, monster ID) when total_xp, gold or the kills change (AlienLeaderboard.py)
+        self.on_change = None
         self.name = name
         self.max_hp = 100
         self.xp = 0
         self.level = 1
-        self.level_bonuses = [False]*51  # Initialize a list of 51 False, one for each level until 50
-        self.achievements = []
+        self.level_bonuses = 0  # Bitset of the levels whose bonus was given
+        self.achievements = achievements if achievements is not None else AchievementCatalogue([])  # Shared by every player
+        self.achieved = 0  # Bitset of the achieved achievement ids
         self.total_xp = 0  # Initialize total XP
+        self.idle_zone = None  # Zone farmed while the player is away, see claim_idle
+        self.idle_since = None  # Time (time.time()) of the last idle claim
         self.reset()
 
+    def __copy__(self) -> 'Player':
+        """Shallow copy, never attached to the store of the original (a copy is a what-if, e.g. formulaGear)."""
+        clone = Player.__new__(Player)
+        for slot in Player.__slots__:
+            if hasattr(self, slot):
+                object.__setattr__(clone, slot, getattr(self, slot))
+        clone._store, clone._row, clone.on_change = None, -1, None
+        for field in Player.STORED_FIELDS:
+            setattr(clone, field, getattr(self, field))
+        return clone
+
     def reset(self) -> None:
         """Reset the player attributes to the default state."""
+        self._stats = None
         self.hp = self.max_hp
         self.base_atk = 15
         self.gold = 0
@@ -81,111 +260,159 @@ class Player:
             'Pant': None,
             'Boots': None,
         }
-        self.monster_kills = {}
-    
-    def record_kill(self, monster_name: Monster) -> None:
-        if monster_name in self.monster_kills:
-            self.monster_kills[monster_name] += 1
-        else:
-            self.monster_kills[monster_name] = 1
-    
+        self.kills = array('I')  # Kills per monster ID (monster_ids), grown when a new monster is killed
+        self.zone_kills = array('I')  # Total kills per zone ID (zone_ids), kept up to date by record_kill
+        self.total_kills = 0  # Sum of monster_kills, kept up to date by record_kill
+        if self.on_change is not None:
+            self.on_change(self, 'kills', None)  # Every kill counter changed
+
+    def record_kill(self, monster_id: int, zone: Optional[str] = None, count: int = 1) -> None:
+        if monster_id >= len(self.kills):
+            self.kills.extend([0] * (len(monster_ids) - len(self.kills)))
+        self.kills[monster_id] += count
+        if zone is not None:
+            zone_id = zone_ids.intern(zone)
+            if zone_id >= len(self.zone_kills):
+                self.zone_kills.extend([0] * (len(zone_ids) - len(self.zone_kills)))
+            self.zone_kills[zone_id] += count
+        self.total_kills += count
+        if self.on_change is not None:
+            self.on_change(self, 'kills', monster_id)
+
     def get_total_kills(self) -> int:
-        return sum(self.monster_kills.values())
+        return self.total_kills
+
+    def kill_count(self, monster_id: int) -> int:
+        return self.kills[monster_id] if monster_id < len(self.kills) else 0
+
+    def zone_kill_count(self, zone_id: int) -> int:
+        return self.zone_kills[zone_id] if zone_id < len(self.zone_kills) else 0
 
     def get_kills(self, monster_name: str) -> int:
-        return self.monster_kills.get(monster_name, 0)  # Returns 0 if the monster name is not found
-    
+        monster_id = monster_ids.get(monster_name)
+        return 0 if monster_id is None else self.kill_count(monster_id)  # 0 if the monster name is not found
+
+    def get_zone_kills(self, zone: str) -> int:
+        zone_id = zone_ids.get(zone)
+        return 0 if zone_id is None else self.zone_kill_count(zone_id)
+
+    @property
+    def monster_kills(self) -> Dict[str, int]:
+        """Kills of every monster killed at least once, by name."""
+        return {monster_ids.name(monster_id): kills for monster_id, kills in enumerate(self.kills) if kills}
+
     def print_monster_kills(self):
         """Print the number of times the player has killed each type of monster."""
         for monster_name, kill_count in self.monster_kills.items():
-            print(f"You have killed {kill_count} {monster_name}(s).")
+            say(f"You have killed {kill_count} {monster_name}(s).")
 
-    def add_achievement(self, achievement: 'Achievement'):
-        if not isinstance(achievement, Achievement):
-            raise TypeError(f"Expected Achievement, got {type(achievement)} instead.")
-        self.achievements.append(achievement)
+    def is_achieved(self, achievement: 'Achievement') -> bool:
+        return bool(self.achieved >> achievement.id & 1)
 
-    def check_achievements(self):
-        # print(self.achievements)  # Debug print
-        for achievement in self.achievements:
-            if not achievement.is_achieved and achievement.check_condition(self):  
+    def check_achievements(self, events: Optional[List[Tuple[str, Any]]] = None) -> None:
+        """Check the achievements watching one of the events, or all of them when events is None."""
+        if events is None:
+            candidates = self.achievements.achievements
+        else:
+            candidates = self.achievements.for_events(events)
+        gold_changed = False
+        for achievement in candidates:
+            if not self.is_achieved(achievement) and achievement.check_condition(self):  
                 gold_reward, xp_reward = achievement.reward
                 if achievement.effect:
-                    print(f"You have achieved {achievement.name} | {achievement.description} | Tu as obtenu {gold_reward} gold et {xp_reward} XP, ainsi qu'une amélioration de {achievement.effect_params[0]} {effect_to_stat[achievement.effect.__name__]}.")
+                    say(f"You have achieved {achievement.name} | {achievement.description} | Tu as obtenu {gold_reward} gold et {xp_reward} XP, ainsi qu'une amélioration de {achievement.effect_params[0]} {effect_to_stat[achievement.effect.__name__]}.")
                 else:
-                    print(f"You have achieved {achievement.name} | {achievement.description} | Tu as obtenu {gold_reward} gold et {xp_reward} XP.")
+                    say(f"You have achieved {achievement.name} | {achievement.description} | Tu as obtenu {gold_reward} gold et {xp_reward} XP.")
+                self.achieved |= 1 << achievement.id
                 achievement.give_reward(self)
-                achievement.is_achieved = True
-    def has_achievement(self, achievement_name: str) -> bool:
+                gold_changed = gold_changed or gold_reward > 0
+        # The gold given by the rewards may unlock the gold achievements
+        if gold_changed and events is not None and GOLD_EVENT not in events:
+            self.check_achievements([GOLD_EVENT])
+
+    def use_achievements(self, achievements: 'AchievementCatalogue') -> None:
+        """Switch to another catalogue (after a content reload), keeping the achievements by name."""
+        achieved = 0
         for achievement in self.achievements:
-            if achievement.name == achievement_name and achievement.is_achieved:
-                return True
-        return False
+            new_achievement = achievements.by_name.get(achievement.name)
+            if new_achievement is not None and self.is_achieved(achievement):
+                achieved |= 1 << new_achievement.id
+        self.achievements = achievements
+        self.achieved = achieved
+        self.check_achievements()  # New achievements may already be met
+
+    def has_achievement(self, achievement_name: str) -> bool:
+        achievement = self.achievements.by_name.get(achievement_name)
+        return achievement is not None and self.is_achieved(achievement)
     
     def display_achievements(self):
         # Clear screen
-        os.system('cls' if os.name == 'nt' else 'clear')
+        clear_screen()
 
-        print("\n*** Achievements ***")
+        say("\n*** Achievements ***")
         while True:
-            choice = input("\nDo you want to display:\n1) Incomplete Achievements\n2) Completed Achievements\nYour choice (1/2): ")
+            choice = ask("\nDo you want to display:\n1) Incomplete Achievements\n2) Completed Achievements\nYour choice (1/2): ")
             if choice in ['1', '2']:
                 # Clear screen before displaying achievements
-                os.system('cls' if os.name == 'nt' else 'clear')
+                clear_screen()
                 break
             else:
-                print("Invalid choice. Please enter either 1 or 2.")
+                say("Invalid choice. Please enter either 1 or 2.")
                 
         if choice == '1':
-            print("\n--- Incomplete Achievements ---")
+            say("\n--- Incomplete Achievements ---")
         else:
-            print("\n--- Completed Achievements ---")
+            say("\n--- Completed Achievements ---")
             
-        for achievement in self.achievements:
-            if (choice == '2' and achievement.is_achieved) or (choice == '1' and not achievement.is_achieved):
+        for achievement in self.achievements.achievements:
+            is_achieved = self.is_achieved(achievement)
+            if (choice == '2' and is_achieved) or (choice == '1' and not is_achieved):
                 if achievement.display_condition is None or achievement.display_condition(self):
-                    status = "Completed" if achievement.is_achieved else "Incomplete"
-                    print(f"\n{achievement.name} - {status}")
+                    status = "Completed" if is_achieved else "Incomplete"
+                    say(f"\n{achievement.name} - {status}")
                     if achievement.description:
-                        print(f"  {achievement.description}")
+                        say(f"  {achievement.description}")
 
-        print("\n******************************")  # End line for clarity
+        say("\n******************************")  # End line for clarity
 
 
 
     def level_up(self) -> None:
-        while self.level < len(Player.xp_requirements) - 1 and self.xp >= Player.xp_requirements[self.level]:
-            self.xp -= Player.xp_requirements[self.level]  # Subtract the xp needed to reach this level
-            self.level += 1
-
-            # Adjust stats increase based on the level reached
-            if self.level <= 10:
-                self.max_hp += 5
-                self.base_atk += 2
-                self.defense += 0
-            elif self.level <= 20:
-                self.max_hp += 10
-                self.base_atk += 4
-                self.defense += 1
-            elif self.level <= 30:
-                self.max_hp += 20
-                self.base_atk += 5
-                self.defense += 2
-            elif self.level <= 40:
-                self.max_hp += 50
-                self.base_atk += 10
-                self.defense += 3
-            else:  # Level 41 to 50
-                self.max_hp += 100
-                self.base_atk += 20
-                self.defense += 4
-
-            print(f"You have reached level {self.level}! Your stats have been increased.")
-            self.give_bonus()  # Add this line
-        if self.level >= len(Player.xp_requirements) - 1:
-            print("You are level max.")
+        """Jump straight to the level matching the player's XP and apply all the stat gains at once."""
+        max_level = len(Player.xp_requirements) - 1
+        if self.level < max_level and self.xp >= Player.xp_requirements[self.level]:
+            progress = Player.xp_cumulative[self.level] + self.xp  # XP earned since level 1
+            new_level = min(bisect.bisect_right(Player.xp_cumulative, progress) - 1, max_level)
+            self.xp = progress - Player.xp_cumulative[new_level]
+
+            # Apply the stats gained between the old level and the new one
+            old_hp, old_atk, old_def = Player.stat_gains_cumulative[self.level]
+            new_hp, new_atk, new_def = Player.stat_gains_cumulative[new_level]
+            self.max_hp += new_hp - old_hp
+            self.base_atk += new_atk - old_atk
+            self.defense += new_def - old_def
+            self.level = new_level
+            self.invalidate_stats()
+
+            say(f"You have reached level {self.level}! Your stats have been increased.")
+            self.give_bonus()
+        if self.level >= max_level:
+            say("You are level max.")
             self.xp = Player.xp_requirements[-1]  # Set xp to the maximum possible
 
+    @staticmethod
+    def level_stat_gains(level: int) -> Tuple[int, int, int]:
+        """Return the (max_hp, base_atk, defense) gained when reaching this level."""
+        if level <= 10:
+            return 5, 2, 0
+        elif level <= 20:
+            return 10, 4, 1
+        elif level <= 30:
+            return 20, 5, 2
+        elif level <= 40:
+            return 50, 10, 3
+        else:  # Level 41 to 50
+            return 100, 20, 4
 
     level_bonuses_data = {
         10: {'crit_chance': 0.01, 'crit_damage': 0.05},
@@ -196,12 +423,18 @@ class Player:
     }
 
     def give_bonus(self) -> None:
-        if self.level in Player.level_bonuses_data and not self.level_bonuses[self.level]:
-            bonuses = Player.level_bonuses_data[self.level]
-            for bonus_type, bonus_value in bonuses.items():
-                setattr(self, bonus_type, getattr(self, bonus_type) + bonus_value)
-                print(f"Your {bonus_type} has increased by {bonus_value}!")
-            self.level_bonuses[self.level] = True
+        """Give the bonuses of every bonus level reached and not given yet, in one step."""
+        total_bonuses = {}
+        for level, bonuses in Player.level_bonuses_data.items():
+            if level <= self.level and not self.level_bonuses >> level & 1:
+                for bonus_type, bonus_value in bonuses.items():
+                    total_bonuses[bonus_type] = total_bonuses.get(bonus_type, 0) + bonus_value
+                self.level_bonuses |= 1 << level
+        for bonus_type, bonus_value in total_bonuses.items():
+            setattr(self, bonus_type, getattr(self, bonus_type) + bonus_value)
+            say(f"Your {bonus_type} has increased by {round(bonus_value, 2)}!")
+        if total_bonuses:
+            self.invalidate_stats()
 
     def add_xp(self, amount: int) -> None:
         self.xp += amount
@@ -210,18 +443,32 @@ class Player:
 
     def print_commands(self) -> None:
         """Print the available commands."""
-        print("Available commands:")
-        print("- zone: Explore a zone to fight some alien")
-        print("- shop: Visit the shop")
-        print("- buy: Buy an item from the shop")
-        print("- sell: Sell an item from your inventory")
-        print("- equip: Equip an item from your inventory")
-        print("- stuff: Show equipped items and inventory")
-        print("- stats: Show player statistics")
-        print("- monster: Show your kill count")
-        print("- succès: Display achievements")
-        print("- quit: Quit the game")
-        print("- help: Show this help message")
+        say("Available commands:")
+        say("- zone: Explore a zone to fight some alien")
+        say("- zone <name> x<N>: Fight N aliens of a zone in a row, e.g. zone meteor x100")
+        say("- shop: Visit the shop")
+        say("- buy: Buy an item from the shop")
+        say("- sell: Sell an item from your inventory")
+        say("- equip: Equip an item from your inventory")
+        say("- stuff: Show equipped items and inventory")
+        say("- stats: Show player statistics")
+        say("- monster: Show your kill count")
+        say("- optimize: Find the best stuff to buy with your gold against a monster, e.g. optimize andariel (add turns to kill it fastest)")
+        say("- idle: Farm a zone while you are away, type idle again to claim the rewards")
+        say("- succès: Display achievements")
+        say("- quit: Quit the game")
+        say("- help: Show this help message")
+
+    @property
+    def stats(self) -> 'PlayerStats':
+        """Snapshot of the derived stats, computed once until invalidate_stats is called."""
+        if self._stats is None:
+            self._stats = PlayerStats(self)
+        return self._stats
+
+    def invalidate_stats(self) -> None:
+        """Forget the derived stats snapshot, to call after any change of equipment or base stats."""
+        self._stats = None
 
     def calculate_atk(self) -> int: 
         """Calculate the total attack value."""
@@ -246,27 +493,28 @@ class Player:
         if self.equipped_necklace:
             crit_damage += self.equipped_necklace.crit_damage
         return crit_damage
-    def attack(self, monster: 'Monster') -> None:
-        """Attack a monster."""
-        atk = self.calculate_atk()
-        if atk > 0:
-            crit_chance = self.calculate_crit_chance()
-            damage_variation = atk * 0.1
-            atk += random.uniform(-damage_variation, damage_variation)
-            atk = round(atk)  # Round the attack value after applying the damage variation
-            damage_reduction = self.calculate_damage_reduction(monster.defense)
-            effective_atk = atk * (1 - damage_reduction / 100.0)  # Apply the damage reduction after the damage variation
-            effective_atk = round(effective_atk)  # Round the effective attack
-            if random.random() < crit_chance:
-                crit_dmg = round(effective_atk * self.calculate_crit_damage())  # Use calculate_crit_damage() here
-                monster.hp -= crit_dmg
-                print(f"OwO You landed a cringical.. Ahem. Critical hit for {crit_dmg} on {monster.name}!")
-
-            else:
-                monster.hp -= effective_atk
-                print(f"You attacked {monster.name} for {effective_atk} damage!")
+    def roll_attack(self, monster: 'Monster', rng=random) -> 'BattleEvent':
+        """Roll one attack against a monster without applying it."""
+        stats = self.stats
+        atk = stats.atk
+        if atk <= 0:
+            return BattleEvent(self.name, monster.name, 0, by_player=True)
+        damage_variation = atk * 0.1
+        atk += rng.uniform(-damage_variation, damage_variation)
+        atk = round(atk)  # Round the attack value after applying the damage variation
+        effective_atk = atk * monster.damage_factor  # Apply the damage reduction after the damage variation
+        effective_atk = round(effective_atk)  # Round the effective attack
+        if rng.random() < stats.crit_chance:
+            crit_dmg = round(effective_atk * stats.crit_damage)
+            return BattleEvent(self.name, monster.name, crit_dmg, critical=True, by_player=True)
+        return BattleEvent(self.name, monster.name, effective_atk, by_player=True)
+
+    def attack(self, encounter: 'Encounter') -> None:
+        """Attack the monster of the encounter."""
+        if self.stats.atk > 0:
+            say(encounter.player_turn().describe())
         else:
-            print("You have no weapon equipped!")
+            say("You have no weapon equipped!")
 
     @staticmethod
     def calculate_damage_reduction(defense: int) -> float:
@@ -298,55 +546,69 @@ class Player:
 
     xp_requirements = generate_xp_requirements.__func__()
 
+    @staticmethod
+    def generate_level_table(xp_requirements: List[int], level_stat_gains: Callable[[int], Tuple[int, int, int]]) -> Tuple[List[int], List[Tuple[int, int, int]]]:
+        """Return the cumulative XP and (max_hp, base_atk, defense) gains needed to reach each level from level 1."""
+        xp_cumulative = [0, 0]  # Index = level, level 0 doesn't exist
+        stat_gains_cumulative = [(0, 0, 0), (0, 0, 0)]
+        for level in range(2, len(xp_requirements)):
+            xp_cumulative.append(xp_cumulative[-1] + xp_requirements[level - 1])
+            hp, atk, defense = stat_gains_cumulative[-1]
+            gained_hp, gained_atk, gained_def = level_stat_gains(level)
+            stat_gains_cumulative.append((hp + gained_hp, atk + gained_atk, defense + gained_def))
+        return xp_cumulative, stat_gains_cumulative
+
+    xp_cumulative, stat_gains_cumulative = generate_level_table.__func__(xp_requirements, level_stat_gains.__func__)
+
     def print_stats(self) -> None:
         """Print the current player's statistics."""
-        print("Player Stats:")
-        print(f"Name: {self.name}")
-        print(f"Level: {self.level}")
-        print(f"XP: {self.xp} sur {Player.xp_requirements[self.level]}, xp total: {self.total_xp}")
-        print(f"HP: {self.calculate_max_hp()}")
-        print(f"Attack: {self.calculate_atk()}")
-        print(f"Defense: {self.calculate_defense()}")
-        print(f"Crit Chance: {self.calculate_crit_chance() * 100:.2f}%")
-        print(f"Crit Damage: {self.calculate_crit_damage() * 100}%")
-        print(f"Dodge Chance: {self.dodge_chance * 100}%")
+        say("Player Stats:")
+        say(f"Name: {self.name}")
+        say(f"Level: {self.level}")
+        say(f"XP: {self.xp} sur {Player.xp_requirements[self.level]}, xp total: {self.total_xp}")
+        say(f"HP: {self.calculate_max_hp()}")
+        say(f"Attack: {self.calculate_atk()}")
+        say(f"Defense: {self.calculate_defense()}")
+        say(f"Crit Chance: {self.calculate_crit_chance() * 100:.2f}%")
+        say(f"Crit Damage: {self.calculate_crit_damage() * 100}%")
+        say(f"Dodge Chance: {self.dodge_chance * 100}%")
 
     def print_inventory(self) -> None:
         """Print the current inventory with a formatted UI."""
-        print("Inventory:")
-        print("-" * 30)
+        say("Inventory:")
+        say("-" * 30)
         for item in self.inventory:
-            print(f"{item.name}")
+            say(f"{item.name}")
             if isinstance(item, (Weapon, Armor, Ring, Necklace)):
                 item.print_stats()
-            print("-" * 30)
+            say("-" * 30)
 
     def print_equipped_items_stats(self) -> None:
         """Print the statistics of equipped items with a compact UI."""
-        print("\n*** Equipped Items ***")
+        say("\n*** Equipped Items ***")
         if self.equipped_weapon or self.equipped_ring or self.equipped_necklace or any(self.equipped_armor.values()):
             if self.equipped_weapon:
-                print(f"Weapon: {self.equipped_weapon.name}")
+                say(f"Weapon: {self.equipped_weapon.name}")
                 self.equipped_weapon.print_stats()
-                print("------------")
+                say("------------")
             
             if self.equipped_ring:
-                print(f"Ring: {self.equipped_ring.name}")
+                say(f"Ring: {self.equipped_ring.name}")
                 self.equipped_ring.print_stats()
-                print("------------")
+                say("------------")
             
             if self.equipped_necklace:
-                print(f"Necklace: {self.equipped_necklace.name}")
+                say(f"Necklace: {self.equipped_necklace.name}")
                 self.equipped_necklace.print_stats()
-                print("------------")
+                say("------------")
             
             for slot, armor in self.equipped_armor.items():
                 if armor:
-                    print(f"{slot}: {armor.name}")
+                    say(f"{slot}: {armor.name}")
                     armor.print_stats()
-                    print("------------")
+                    say("------------")
         else:
-            print("You have no items equipped.")
+            say("You have no items equipped.")
 
 
     def equip_item(self, item_name: str) -> None:
@@ -381,10 +643,11 @@ class Player:
 
                 # Remove the newly equipped item from the inventory
                 self.inventory.remove(item)
-                print(f"You equipped {item.name}!")
+                self.invalidate_stats()
+                say(f"You equipped {item.name}!")
                 return
 
-        print("You don't have this item in your inventory. Baka.")
+        say("You don't have this item in your inventory. Baka.")
     
     def sell(self, item_name):
         # Trouver l'item dans l'inventaire
@@ -396,42 +659,63 @@ class Player:
                 self.gold += sell_price
                 # Supprimer l'item de l'inventaire
                 self.inventory.remove(item)
-                print(f"You sold {item_name} for {sell_price} gold!")
+                say(f"You sold {item_name} for {sell_price} gold!")
                 return  # Si vous trouvez l'item, vous pouvez sortir de la fonction
         # Si vous arrivez ici, l'item n'était pas dans l'inventaire
-        print(f"You don't have {item_name} in your inventory!")
+        say(f"You don't have {item_name} in your inventory!")
 
     def admin_command(self):
         """Execute an admin command."""
         while True:
-            command = input("Enter command (addxp, addgold, exit): ")
+            command = ask("Enter command (addxp, addgold, exit): ")
             if command.lower() == "exit":
                 break
             elif command.lower() in ["addxp", "addgold"]:
-                amount = int(input("Enter amount: "))
+                amount = int(ask("Enter amount: "))
                 if command == "addxp":
                     self.xp += amount
-                    print(f"Added {amount} XP.")
+                    say(f"Added {amount} XP.")
                     self.level_up()  # Check if player levels up after adding XP
                 elif command == "addgold":
                     self.gold += amount
-                    print(f"Added {amount} gold.")
+                    say(f"Added {amount} gold.")
             else:
-                print("Unknown command.")
+                say("Unknown command.")
+
+class PlayerStats:
+    """Derived stats of a player (equipment included), read by the battle hot loops."""
+
+    __slots__ = ('atk', 'defense', 'max_hp', 'crit_chance', 'crit_damage', 'dodge_chance', 'damage_reduction', 'damage_factor')
+
+    def __init__(self, player: Player):
+        self.atk = player.calculate_atk()
+        self.defense = player.calculate_defense()
+        self.max_hp = player.calculate_max_hp()
+        self.crit_chance = player.calculate_crit_chance()
+        self.crit_damage = player.calculate_crit_damage()
+        self.dodge_chance = player.dodge_chance
+        self.damage_reduction = player.calculate_damage_reduction(self.defense)
+        self.damage_factor = 1 - self.damage_reduction / 100.0  # Share of the monster's damage that goes through
 
 class Item:
+    __slots__ = ('name', 'value')
+
     def __init__(self, name: str, value: int):
         self.name = name
         self.value = value
 
 class Weapon(Item):
+    __slots__ = ('damage',)
+
     def __init__(self, name: str, value: int, damage: int):
         super().__init__(name, value)
         self.damage = damage
     def print_stats(self):
-        print(f"Damage: {self.damage}")
+        say(f"Damage: {self.damage}")
 
 class Armor(Item):
+    __slots__ = ('defense', 'hp_bonus', 'slot')
+
     def __init__(self, name: str, value: int, defense: int, hp_bonus: int, slot: str):
         super().__init__(name, value)
         self.defense = defense
@@ -439,35 +723,43 @@ class Armor(Item):
         self.slot = slot
 
     def print_stats(self):
-        print(f"Defense: {self.defense}")
-        print(f"HP Bonus: {self.hp_bonus}")
+        say(f"Defense: {self.defense}")
+        say(f"HP Bonus: {self.hp_bonus}")
 
 class Ring(Item):
+    __slots__ = ('crit_chance',)
+
     def __init__(self, name: str, value: int, crit_chance: float):
         super().__init__(name, value)
         self.crit_chance = crit_chance
     def print_stats(self):
-        print(f"Crit Chance: {self.crit_chance}")
+        say(f"Crit Chance: {self.crit_chance}")
 
 class Necklace(Item):
+    __slots__ = ('crit_damage',)
+
     def __init__(self, name: str, value: int, crit_damage: float):
         super().__init__(name, value)
         self.crit_damage = crit_damage
     def print_stats(self):
-        print(f"Crit Damage: {self.crit_damage}")
+        say(f"Crit Damage: {self.crit_damage}")
 
 class Achievement:
+    __slots__ = ('name', 'condition', 'reward', 'description', 'id', 'effect', 'effect_params', 'display_condition', 'watches')
+
     def __init__(self, name: str, condition: Callable[[Player], bool], reward: Tuple[int, int], description: str = "",
                  effect: Optional[Callable[[Player, Any], None]] = None, effect_params: Optional[Tuple[Any, ...]] = None,
-                 display_condition: Optional[Callable[[Player], bool]] = None):
+                 display_condition: Optional[Callable[[Player], bool]] = None,
+                 watches: Optional[Tuple[Tuple[str, Any], ...]] = None):
         self.name = name
         self.condition = condition
         self.reward = reward
         self.description = description
-        self.is_achieved = False
+        self.id = -1  # Position in the AchievementCatalogue, set when the catalogue is built
         self.effect = effect
         self.effect_params = effect_params
         self.display_condition = display_condition
+        self.watches = watches  # Events that can make the condition true, None = every event
 
     def check_condition(self, player: Player) -> bool:
         return self.condition(player)
@@ -479,150 +771,69 @@ class Achievement:
         if self.effect:
             self.effect(player, *self.effect_params)
 
+# Achievement events: what can change the result of an achievement condition
+GOLD_EVENT = ('gold', None)
+
+def kill_event(monster_id: int) -> Tuple[str, int]:
+    """Event sent when the player kills this monster."""
+    return ('kill', monster_id)
+
+def zone_event(zone: Optional[str]) -> Tuple[str, Optional[int]]:
+    """Event sent when the player kills any monster of this zone."""
+    return ('zone', None if zone is None else zone_ids.intern(zone))
+
+class AchievementCatalogue:
+    """Immutable list of every achievement, built once and shared by all the players.
+
+    The achieved state lives in each Player (a bitset of achievement ids), so the
+    definitions and their closures exist only once whatever the number of players.
+    """
+
+    def __init__(self, achievements: List[Achievement]):
+        self.achievements = tuple(achievements)
+        self.by_name: Dict[str, Achievement] = {}
+        self.by_event: Dict[Tuple[str, Any], List[Achievement]] = {}
+        self.always: List[Achievement] = []  # Achievements without watches are checked on every event
+        for achievement_id, achievement in enumerate(self.achievements):
+            achievement.id = achievement_id
+            self.by_name[achievement.name] = achievement
+            if achievement.watches is None:
+                self.always.append(achievement)
+            else:
+                for event in achievement.watches:
+                    self.by_event.setdefault(event, []).append(achievement)
+
+    def __iter__(self):
+        return iter(self.achievements)
+
+    def __len__(self) -> int:
+        return len(self.achievements)
+
+    def for_events(self, events: List[Tuple[str, Any]]) -> List[Achievement]:
+        """Return the achievements watching one of the events, in catalogue order."""
+        found = {achievement.id: achievement for achievement in self.always}
+        for event in events:
+            for achievement in self.by_event.get(event, ()):
+                found[achievement.id] = achievement
+        return [found[achievement_id] for achievement_id in sorted(found)]
+
 #Achievements
 
 def has_required_achievement(self, achievement: Achievement) -> bool:
     if not achievement.required_achievement:
         return True
-    for ach in self.achievements:
-        if ach.name == achievement.required_achievement:
-            return ach.is_achieved
-    return False
-
-def meteor_guy(player: Player) -> bool:
-    meteor_monsters = ["Eclair", "Crocus", "Lunaris", "Voltaic"]
-    return all(player.get_kills(monster) > 0 for monster in meteor_monsters)
-def killed_10_crocus(player: Player) -> bool:
-    return player.get_kills("Crocus") >= 10
-def killed_10_lunaris(player: Player) -> bool:
-    return player.get_kills("Lunaris") >= 10
-def killed_10_eclair(player: Player) -> bool:
-    return player.get_kills("Eclair") >= 10
-def killed_10_voltaic(player: Player) -> bool:
-    return player.get_kills("Voltaic") >= 10
-def killed_5_of_each_meteor_monster(player: Player) -> bool:
-    meteor_monsters = ["Eclair", "Crocus", "Lunaris", "Voltaic"]
-    return all(player.get_kills(monster) >= 5 for monster in meteor_monsters)
-def killed_10_of_each_meteor_monster(player: Player) -> bool:
-    meteor_monsters = ["Eclair", "Crocus", "Lunaris", "Voltaic"]
-    return all(player.get_kills(monster) >= 10 for monster in meteor_monsters)
-def killed_100_meteor_monsters(player: Player) -> bool:
-    meteor_monsters = ["Eclair", "Crocus", "Lunaris", "Voltaic"]
-    return sum(player.get_kills(monster) for monster in meteor_monsters) >= 100
-
-def spatiofarm_guy(player: Player) -> bool:
-    spatiofarm_monsters = ["Petalo", "Gloo", "Vaporis", "Foudro"]
-    return all(player.get_kills(monster) > 0 for monster in spatiofarm_monsters)
-def killed_10_petalo(player: Player) -> bool:
-    return player.get_kills("Petalo") >= 10
-def killed_10_gloo(player: Player) -> bool:
-    return player.get_kills("Gloo") >= 10
-def killed_10_vaporis(player: Player) -> bool:
-    return player.get_kills("Vaporis") >= 10
-def killed_10_foudro(player: Player) -> bool:
-    return player.get_kills("Foudro") >= 10
-def killed_5_of_each_spatiofarm_monster(player: Player) -> bool:
-    spatiofarm_monsters = ["Petalo", "Gloo", "Vaporis", "Foudro"]
-    return all(player.get_kills(monster) >= 5 for monster in spatiofarm_monsters)
-def killed_10_of_each_spatiofarm_monster(player: Player) -> bool:
-    spatiofarm_monsters = ["Petalo", "Gloo", "Vaporis", "Foudro"]
-    return all(player.get_kills(monster) >= 10 for monster in spatiofarm_monsters)
-def killed_100_spatiofarm_monsters(player: Player) -> bool:
-    spatiofarm_monsters = ["Petalo", "Gloo", "Vaporis", "Foudro"]
-    return sum(player.get_kills(monster) for monster in spatiofarm_monsters) >= 100
-
-def astropolis_guy(player: Player) -> bool:
-    astropolis_monsters = ["Wakashoko", "Hans", "Glimmer"]
-    return all(player.get_kills(monster) > 0 for monster in astropolis_monsters)
-def killed_10_wakashoko(player: Player) -> bool:
-    return player.get_kills("Wakashoko") >= 10
-def killed_10_hans(player: Player) -> bool:
-    return player.get_kills("Hans") >= 10
-def killed_10_glimmer(player: Player) -> bool:
-    return player.get_kills("Glimmer") >= 10
-def killed_5_of_each_astropolis_monster(player: Player) -> bool:
-    astropolis_monsters = ["Wakashoko", "Hans", "Glimmer"]
-    return all(player.get_kills(monster) >= 5 for monster in astropolis_monsters)
-def killed_10_of_each_astropolis_monster(player: Player) -> bool:
-    astropolis_monsters = ["Wakashoko", "Hans", "Glimmer"]
-    return all(player.get_kills(monster) >= 10 for monster in astropolis_monsters)
-def killed_100_astropolis_monsters(player: Player) -> bool:
-    astropolis_monsters = ["Wakashoko", "Hans", "Glimmer"]
-    return sum(player.get_kills(monster) for monster in astropolis_monsters) >= 100
-
-def kill_xalith(player: Player) -> bool:
-    return player.get_kills("Xa'lith, Roi du Vide") >= 1
-def kill_andariel(player: Player) -> bool:
-    return player.get_kills("Andariel, l'Éradicateur des Mondes") >= 1
-def kill_mephis(player: Player) -> bool:
-    return player.get_kills("Mephistofedes, le Fléau Cosmique") >= 1
-def poche(player: Player) -> bool:
-    return player.gold >= 100
-def gobelin(player: Player) -> bool:
-    return player.gold >= 1000
-def enutrof(player: Player) -> bool:
-    return player.gold >= 10000
-
-# affichage des succès
-def can_display_gobelin(player: Player) -> bool:
-    return player.has_achievement('Poche')
-def can_display_enutrof(player: Player) -> bool:
-    return player.has_achievement('Gobelin')
-def can_display_killed_10_crocus(player: Player) -> bool:
-    return player.has_achievement('Meteor Guy')
-def can_display_killed_10_lunaris(player: Player) -> bool:
-    return player.has_achievement('Meteor Guy')
-def can_display_killed_10_eclair(player: Player) -> bool:
-    return player.has_achievement('Meteor Guy')
-def can_display_killed_10_voltaic(player: Player) -> bool:
-    return player.has_achievement('Meteor Guy')
-def can_display_killed_5_of_each_meteor_monster(player: Player) -> bool:
-    return player.has_achievement('Meteor Guy')
-def can_display_killed_10_of_each_meteor_monster(player: Player) -> bool:
-    return player.has_achievement('Meteor Amateur')
-def can_display_killed_100_meteor_monsters(player: Player) -> bool:
-    return player.has_achievement('Meteor Walker')
-def can_display_killed_10_petalo(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Guy')
-def can_display_killed_10_gloo(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Guy')
-def can_display_killed_10_vaporis(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Guy')
-def can_display_killed_10_foudro(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Guy')
-def can_display_killed_5_of_each_spatiofarm_monster(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Guy')
-def can_display_killed_10_of_each_spatiofarm_monster(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Amateur')
-def can_display_killed_100_spatiofarm_monsters(player: Player) -> bool:
-    return player.has_achievement('Spatiofarm Walker')
-def can_display_killed_10_wakashoko(player: Player) -> bool:
-    return player.has_achievement('Astropolis Guy')
-def can_display_killed_10_hans(player: Player) -> bool:
-    return player.has_achievement('Astropolis Guy')
-def can_display_killed_10_glimmer(player: Player) -> bool:
-    return player.has_achievement('Astropolis Guy')
-def can_display_killed_5_of_each_astropolis_monster(player: Player) -> bool:
-    return player.has_achievement('Astropolis Guy')
-def can_display_killed_10_of_each_astropolis_monster(player: Player) -> bool:
-    return player.has_achievement('Astropolis Amateur')
-def can_display_killed_100_astropolis_monsters(player: Player) -> bool:
-    return player.has_achievement('Astropolis Walker')
-
-def can_display_kill_xalith(player: Player) -> bool:
-    return player.has_achievement('Enutrof')
-def can_display_kill_andariel(player: Player) -> bool:
-    return player.has_achievement('Enutrof')
-def can_display_kill_mephis(player: Player) -> bool:
-    return player.has_achievement('Enutrof')
+    return self.has_achievement(achievement.required_achievement)
 
 # Increase stats pour gerer certains ach
 def increase_atk(player: Player, amount: int) -> None:
     player.base_atk += amount
+    player.invalidate_stats()
 def increase_def(player: Player, amount: int) -> None:
     player.defense += amount
+    player.invalidate_stats()
 def increase_HP(player: Player, amount: int) -> None:
     player.max_hp += amount
+    player.invalidate_stats()
 
 def remove_accents(input_str):
     nfkd_form = unicodedata.normalize('NFKD', input_str)
@@ -630,207 +841,480 @@ def remove_accents(input_str):
     return only_ascii.decode()
 
 def print_status(player: Player) -> None:
-    print(f"{player.name} HP: {player.calculate_max_hp()}  ATK: {player.calculate_atk()}  Gold: {player.gold}  Level: {player.level}")
-
-def init_shop() -> List[Item]:
-    shop_items = [
-        # Weapons
-        Weapon("Epee meteor", 100, 20),
-        Weapon("Lance anti-crocus", 500, 65),
-        Weapon("DAWN", 1999, 150),
-        Weapon("DUSK", 5000, 300),
-        Weapon("Lilith", 15000, 666),
-        Weapon("Baby", 1, 6666 ),
-
-        # Armors
-        Armor("Capuche du voleur", 300, 10, 50, 'Hat'),
-        Armor("Caskapointe", 700, 20, 150, 'Hat'),
-        Armor("Solomonk", 1500, 30, 450, 'Hat'),
-
-        Armor("Sandales", 450, 12, 60, 'Boots'),
-        Armor("Chaussons Lapins", 1050, 24, 180, 'Boots'),
-        Armor("Nova", 2250, 36, 540, 'Boots'),
-
-        Armor("Jambiere en cuivre", 600, 15, 75, 'Pant'),
-        Armor("Pantalon ", 1400, 30, 225, 'Pant'),
-        Armor("Eternal", 3000, 45, 675, 'Pant'),
-
-        Armor("Cotte de maille", 900, 20, 110, 'Chestplate'),
-        Armor("Garde Lune", 2000, 40, 330, 'Chestplate'),
-        Armor("Genesis", 3200, 60, 1000, 'Chestplate'),
-
-        # Rings
-        Ring("Gelano", 3000, 0.05),
-        Ring("Anonano", 10000, 0.08),
-        Ring("Dracanneau", 30000, 0.1),
-
-        # Necklace
-        Necklace("Gelamu", 1000, 0.1),
-        Necklace("Umbra", 7500, 0.25),
-        Necklace("Collier Divin", 40000, 0.6),
-    ]
-    return shop_items
-
-def init_monsters() -> Dict[str, List[Monster]]:
-
-    """Initialize the monsters."""
-    # Alien Noob
-    alien_noob_1 = Monster("Eclair", 110, 13, 0, 5,xp_reward=25)
-    alien_noob_2 = Monster("Crocus", 110, 15, 0, 5,xp_reward=24)
-    alien_noob_3 = Monster("Lunaris", 110, 18, 0, 5,xp_reward=26)
-    alien_noob_4 = Monster("Voltaic", 90, 25, 0, 5, crit_chance=0.1, crit_damage=1.4,xp_reward=30)
-
-    # Alien ça va
-    alien_cava_1 = Monster("Petalo", 450, 30, 10, 25,xp_reward=91)
-    alien_cava_2 = Monster("Gloo", 500, 33, 10, 25,xp_reward=89)
-    alien_cava_3 = Monster("Vaporis", 600, 40, 10, 25,xp_reward=92)
-    alien_cava_4 = Monster("Foudro", 300, 60, 10, 25, crit_chance=0.1, crit_damage=1.4,xp_reward=90)
-
-    # Alien Easy & Normal
-    alien_normal_1 = Monster("Wakashoko", 1400, 50, 25, 80,xp_reward=752)
-    alien_normal_2 = Monster("Hans", 1600, 60, 25, 80,xp_reward=751)
-    alien_normal_3 = Monster("Glimmer", 1300, 70, 25, 80, crit_chance=0.05, crit_damage=1.2,xp_reward=749)
-
-    # Alien Medium & Hard
-    alien_medium_1 = Monster("Wis", 2150, 105, 50, 140, crit_chance=0.07, crit_damage=1.4, xp_reward=2301)
-    alien_medium_2 = Monster("Gorgalon", 2300, 114, 50, 140, crit_chance=0.07, crit_damage=1.4, xp_reward=2302)
-    alien_medium_3 = Monster("Nebulus", 2100, 105, 50, 140, crit_chance=0.07, crit_damage=1.4, xp_reward=2300)
-
-    alien_hard_1 = Monster("Xant'ia", 4000, 150, 75, 200, crit_chance=0.09, crit_damage=1.5, xp_reward=6661)
-    alien_hard_2 = Monster("Zephyrus", 4150, 159, 75, 220, crit_chance=0.09, crit_damage=1.5, xp_reward=6666)
-    alien_hard_3 = Monster("Aurora", 3900, 150, 75, 200, crit_chance=0.09, crit_damage=1.5, xp_reward=6666)
-
-    # Boss Alien
-    alien_boss1 = Monster("Xa'lith, Roi du Vide", 10000, 300, 139, 500, crit_chance=0.15, crit_damage=2.0, xp_reward=15555)
-    alien_boss2 = Monster("Mephistofedes, le Fléau Cosmique", 12000, 250, 139, 500, crit_chance=0.15, crit_damage=2.0, xp_reward=15555)
-    alien_boss3 = Monster("Andariel, l'Éradicateur des Mondes", 8000, 400, 100, 500, crit_chance=0.25, crit_damage=2.0, xp_reward=15555)
-    # Endboss
-    alien_master = Monster("??..|§§§|..?!", 35000, 300, 200, 1, crit_chance=0.25, crit_damage=4.0, xp_reward=1)
-
-    return {
-        'meteor': [alien_noob_1, alien_noob_2, alien_noob_3, alien_noob_4],  
-        'spatiofarm': [alien_cava_1, alien_cava_2, alien_cava_3, alien_cava_4],  
-        'astropolis': [alien_normal_1, alien_normal_2, alien_normal_3],
-        'stellaris': [alien_medium_1, alien_medium_2, alien_medium_3],
-        'xenodrome': [alien_hard_1, alien_hard_2, alien_hard_3],
-        'nebulae': [alien_boss2, alien_boss3, alien_boss1],
-        'elysium':[alien_master]
-    }
+    say(f"{player.name} HP: {player.calculate_max_hp()}  ATK: {player.calculate_atk()}  Gold: {player.gold}  Level: {player.level}")
+
+ITEM_CLASSES = {'weapon': Weapon, 'armor': Armor, 'ring': Ring, 'necklace': Necklace}
+
+def init_shop(records: Optional[Dict[str, Any]] = None) -> List[Item]:
+    """Build the shop from content/shop.json (or from records already loaded)."""
+    records = records if records is not None else load_records()
+    return [ITEM_CLASSES[kind](*fields) for kind, *fields in records['shop']]
+
+def init_monsters(records: Optional[Dict[str, Any]] = None) -> Dict[str, List[Monster]]:
+    """Build the monsters of every zone from content/monsters.json (or from records already loaded)."""
+    records = records if records is not None else load_records()
+    for zone in records['monsters']:
+        zone_ids.intern(zone)
+    return {zone: [Monster(*fields) for fields in zone_records] for zone, zone_records in records['monsters'].items()}
+
+def init_zone_requirements(records: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[str]]:
+    """Achievement needed to enter each zone, from content/zones.json (or from records already loaded)."""
+    records = records if records is not None else load_records()
+    return dict(records['zones'])
+
+# Conditions des succès, écrites dans content/achievements.json
+EFFECTS = {'increase_atk': increase_atk, 'increase_def': increase_def, 'increase_HP': increase_HP}
+
+def build_condition(record: Tuple) -> Tuple[Callable[[Player], bool], Tuple[Tuple[str, Any], ...]]:
+    """Turn a condition record of AlienContent into the check and the events it watches."""
+    kind = record[0]
+    if kind == 'kills':
+        _, monster_name, at_least = record
+        monster_id = monster_ids.intern(monster_name)
+        return (lambda player: player.kill_count(monster_id) >= at_least), (kill_event(monster_id),)
+    if kind == 'each_killed':
+        _, monster_names, at_least = record
+        killed = tuple(monster_ids.intern(name) for name in monster_names)
+        return (lambda player: all(player.kill_count(monster_id) >= at_least for monster_id in killed)), tuple(map(kill_event, killed))
+    if kind == 'zone_kills':
+        _, zone, at_least = record
+        zone_id = zone_ids.intern(zone)
+        return (lambda player: player.zone_kill_count(zone_id) >= at_least), (zone_event(zone),)
+    _, at_least = record  # 'gold'
+    return (lambda player: player.gold >= at_least), (GOLD_EVENT,)
+
+def build_display_condition(shown_after: Optional[str]) -> Optional[Callable[[Player], bool]]:
+    """The achievement is only shown once the player has `shown_after`."""
+    if shown_after is None:
+        return None
+    return lambda player: player.has_achievement(shown_after)
+
+def init_achievements(records: Optional[Dict[str, Any]] = None) -> AchievementCatalogue:
+    """Build the achievements catalogue from content/achievements.json, shared by every player."""
+    records = records if records is not None else load_records()
+    achievements = []
+    for name, reward, description, condition, shown_after, effect in records['achievements']:
+        check, watches = build_condition(condition)
+        achievements.append(Achievement(name, check, tuple(reward), description,
+                                        effect=EFFECTS[effect[0]] if effect else None, effect_params=tuple(effect[1:]) if effect else None,
+                                        display_condition=build_display_condition(shown_after), watches=watches))
+    return AchievementCatalogue(achievements)
+
+
+# Battle engine
+BATTLE_DELAY = 0.7  # Seconds between two attacks when a battle is rendered in the terminal
+MAX_BATTLE_TURNS = 10000  # A battle where nobody can hurt the other ends in a draw
+MAX_FARM_FIGHTS = 1000  # Most fights a single "zone <name> x<N>" command can play
+IDLE_SECONDS_PER_ROUND = 2 * BATTLE_DELAY  # Time of one round when idling, as if the fight was watched
+IDLE_SECONDS_PER_FIGHT = 5.0  # Time between two idle fights
+MAX_IDLE_SECONDS = 7 * 24 * 3600  # Idle time above a week is lost
+
+class BattleEvent:
+    """One attack of a battle, as rolled by Player.roll_attack or Monster.roll_attack."""
+
+    def __init__(self, attacker: str, target: str, damage: int, critical: bool = False, dodged: bool = False, by_player: bool = False):
+        self.attacker = attacker
+        self.target = target
+        self.damage = damage
+        self.critical = critical
+        self.dodged = dodged
+        self.by_player = by_player
+        self.target_hp = 0  # HP left to the target after the attack, filled by resolve_battle
+
+    def describe(self) -> str:
+        """Return the message shown to the player for this attack."""
+        if self.by_player:
+            if self.critical:
+                return f"OwO You landed a cringical.. Ahem. Critical hit for {self.damage} on {self.target}!"
+            return f"You attacked {self.target} for {self.damage} damage!"
+        if self.dodged:
+            return f"{self.target} dodged the attack from {self.attacker}!"
+        if self.critical:
+            return f"{self.attacker} landed a critical hit on {self.target} for {self.damage} damage!"
+        return f"{self.attacker} attacked {self.target} for {self.damage} damage!"
+
+class BattleResult:
+    """Outcome of a battle resolved by resolve_battle."""
+
+    def __init__(self, monster: Monster, winner: Optional[str], turns: int, log: List[BattleEvent],
+                 player_hp: int, monster_hp: int, gold_reward: int = 0, xp_reward: int = 0):
+        self.monster = monster
+        self.winner = winner  # 'player', 'monster' or None for a draw
+        self.turns = turns
+        self.log = log
+        self.player_hp = player_hp
+        self.monster_hp = monster_hp
+        self.gold_reward = gold_reward
+        self.xp_reward = xp_reward
 
-def explore_zone(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item], zone_requirements: Dict[str, str]) -> None:
-    print("zones disponibles : Meteor, Spatiofarm, Astropolis, Stellaris, Xenodrome, Nebulae, Elysium")
-    zone_command = input("Enter the name of the zone: ").strip().lower()
-    if zone_command in monsters:
-        required_achievement = zone_requirements.get(zone_command, None)
-        if required_achievement and not player.has_achievement(required_achievement):
-            print(f"You need the {required_achievement} achievement to enter {zone_command.capitalize()}!")
-            return
+    @property
+    def player_won(self) -> bool:
+        return self.winner == 'player'
+
+class Encounter:
+    """Live state of one fight: the HP of both sides, the turn count and the log.
+
+    The player and the monster template are only read, so any number of encounters
+    can run at the same time against the same templates.
+    """
+
+    def __init__(self, player: Player, monster: Monster, keep_log: bool = True):
+        self.player = player
+        self.monster = monster
+        self.player_hp = player.stats.max_hp
+        self.monster_hp = monster.hp
+        self.turns = 0
+        self.winner = None  # 'player' or 'monster' once the fight is over
+        self.keep_log = keep_log
+        self.log: List[BattleEvent] = []
 
-        selected_monsters = monsters[zone_command]
-        monster = random.choice(selected_monsters)
-        original_max_hp = player.max_hp  # Store the original max HP
-        player.max_hp = player.calculate_max_hp()  # Update max HP based on equipment
-        player.hp = player.max_hp  # Reset current HP to the new max HP
-        player.in_battle = True
-        while player.hp > 0 and monster.hp > 0:
-            player.max_hp = player.calculate_max_hp() # On calcule le max HP du joueur
-            # Update battle info
-            battle_info = f"\n{'*' * 50}\n"
-            battle_info += f"Yikes! A super-scary {monster.name} just popped up out of nowhere in the {zone_command.capitalize()}! （ΟΔΟ；）\n"
-            battle_info += f"Check out these stats:\n \n HP: \033[1m{monster.initial_hp}\033[0m *gulp*\nATK: \033[1m{monster.damage}\033[0m *sweats*\n"
-            battle_info += f"{'*' * 50}\n"
-            # Clear the console
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Now print the battle info and the current status
-            print(battle_info)
-            print(f"Player HP: {player.hp} Monster HP: {monster.hp}")
-            player.attack(monster)
-            if monster.hp <= 0:
-                os.system('cls' if os.name == 'nt' else 'clear')
-                player.hp = original_max_hp
-                player.max_hp = original_max_hp
-                reward = monster.variable_gold_reward
-                xp_reward = monster.xp_reward
-                player.add_xp(xp_reward)
-                print(f"You defeated {monster.name}! You earned {reward} gold. and {xp_reward} xp")
-                player.gold += reward
-                # Dire au joueur combien d'xp il lui reste pour passer au niveau suivant
-                print(f"XP required to up : {Player.xp_requirements[player.level] - player.xp} XP")
-                monster.hp = monster.initial_hp
-                player.in_battle = False
-                # Record the monster kill and check achievements
-                player.monster_kills[monster.name] = player.monster_kills.get(monster.name, 0) + 1
-                player.check_achievements()
-                break
-            time.sleep(0.7)  # Delay for one second before the monster attacks
-            if player.hp > 0:  # Check if the player is still alive
-                monster.attack(player)
-            if player.hp <= 0:
-                # I want that if the player dies, it clear the console and print the following message:
-                print(f"You have been defeated! {monster.name} had {monster.hp} left.")
-                player.hp = original_max_hp  # Reset the player's HP to the original max HP
-                player.max_hp = original_max_hp  # Reset the player's max HP to the original max HP
-                player.in_battle = False
-                monster.hp = monster.initial_hp
-                break
-            time.sleep(0.7)  # Delay for one second before the player attacks again
-    else:
-        print(f"Zone {zone_command.capitalize()} doesn't exist.")
-    if player.hp <= 0:
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    def player_turn(self, rng=random) -> BattleEvent:
+        """The player attacks the monster."""
+        self.turns += 1
+        event = self.player.roll_attack(self.monster, rng)
+        self.monster_hp -= event.damage
+        event.target_hp = self.monster_hp
+        if self.keep_log:
+            self.log.append(event)
+        if self.monster_hp <= 0:
+            self.winner = 'player'
+        return event
+
+    def monster_turn(self, rng=random) -> BattleEvent:
+        """The monster attacks the player."""
+        event = self.monster.roll_attack(self.player, rng)
+        self.player_hp -= event.damage
+        event.target_hp = self.player_hp
+        if self.keep_log:
+            self.log.append(event)
+        if self.player_hp <= 0:
+            self.winner = 'monster'
+        return event
+
+    def step(self, rng=random) -> List[BattleEvent]:
+        """Play one round: the player attacks, then the monster if it is still alive."""
+        events = [self.player_turn(rng)]
+        if not self.finished:
+            events.append(self.monster_turn(rng))
+        return events
+
+    def result(self, rng=random) -> BattleResult:
+        """Return the result of the fight, with the rewards rolled if the player won."""
+        if self.winner == 'player':
+            return BattleResult(self.monster, self.winner, self.turns, self.log, self.player_hp, self.monster_hp,
+                                self.monster.roll_gold_reward(rng), self.monster.xp_reward)
+        return BattleResult(self.monster, self.winner, self.turns, self.log, self.player_hp, self.monster_hp)
+
+def resolve_battle(player: Player, monster: Monster, rng=random, keep_log: bool = True, max_turns: int = MAX_BATTLE_TURNS) -> BattleResult:
+    """Resolve a whole battle in memory, without touching the player or the monster.
+
+    The player attacks first, then the monster, until one of them has no HP left.
+    Rewards are rolled but not given: see claim_battle_rewards.
+    """
+    encounter = Encounter(player, monster, keep_log)
+    while not encounter.finished and encounter.turns < max_turns:
+        encounter.player_turn(rng)
+        if not encounter.finished:
+            encounter.monster_turn(rng)
+    return encounter.result(rng)
+
+def claim_battle_rewards(player: Player, result: BattleResult, zone: Optional[str] = None) -> None:
+    """Give the rewards of a won battle to the player and check the achievements."""
+    if not result.player_won:
         return
-  
+    player.add_xp(result.xp_reward)
+    say(f"You defeated {result.monster.name}! You earned {result.gold_reward} gold. and {result.xp_reward} xp")
+    player.gold += result.gold_reward
+    # Dire au joueur combien d'xp il lui reste pour passer au niveau suivant
+    say(f"XP required to up : {Player.xp_requirements[player.level] - player.xp} XP")
+    # Record the monster kill and check achievements
+    player.record_kill(result.monster.id, zone)
+    player.check_achievements([kill_event(result.monster.id), zone_event(zone), GOLD_EVENT])
+
+def battle_header(monster: Monster, zone: str) -> str:
+    """Return the banner shown above every round of a battle."""
+    battle_info = f"\n{'*' * 50}\n"
+    battle_info += f"Yikes! A super-scary {monster.name} just popped up out of nowhere in the {zone.capitalize()}! （ΟΔΟ；）\n"
+    battle_info += f"Check out these stats:\n \n HP: \033[1m{monster.hp}\033[0m *gulp*\nATK: \033[1m{monster.damage}\033[0m *sweats*\n"
+    battle_info += f"{'*' * 50}\n"
+    return battle_info
+
+def battle_ending(result: BattleResult) -> Optional[str]:
+    """Return the message shown when the player lost or nobody won, None when the player won."""
+    if result.winner == 'monster':
+        return f"You have been defeated! {result.monster.name} had {result.monster_hp} left."
+    if result.winner is None:
+        return f"Nobody can hurt the other, {result.monster.name} walks away."
+    return None
+
+def render_battle(player: Player, result: BattleResult, zone: str, delay: float = BATTLE_DELAY) -> None:
+    """Replay a resolved battle in the terminal, one round at a time."""
+    monster = result.monster
+    battle_info = battle_header(monster, zone)
+    player_hp = player.stats.max_hp
+    monster_hp = monster.hp
+    for event in result.log:
+        if event.by_player:
+            # Clear the console, then print the battle info and the current status
+            clear_screen()
+            say(battle_info)
+            say(f"Player HP: {player_hp} Monster HP: {monster_hp}")
+            say(event.describe())
+            monster_hp = event.target_hp
+        else:
+            say(event.describe())
+            player_hp = event.target_hp
+        if delay and (event.by_player and monster_hp > 0 or not event.by_player and player_hp > 0):
+            time.sleep(delay)
+
+    if result.player_won:
+        clear_screen()
+    else:
+        say(battle_ending(result))
+
+def can_enter_zone(player: Player, monsters: Dict[str, List[Monster]], zone_requirements: Dict[str, str], zone_command: str) -> bool:
+    """Check the zone exists and the player has the achievement it requires."""
+    if zone_command not in monsters:
+        say(f"Zone {zone_command.capitalize()} doesn't exist.")
+        return False
+    required_achievement = zone_requirements.get(zone_command, None)
+    if required_achievement and not player.has_achievement(required_achievement):
+        say(f"You need the {required_achievement} achievement to enter {zone_command.capitalize()}!")
+        return False
+    return True
+
+def enter_zone(player: Player, monsters: Dict[str, List[Monster]], zone_requirements: Dict[str, str], zone_command: str) -> Optional[Monster]:
+    """Check the player may enter the zone, then pick the monster to fight."""
+    if not can_enter_zone(player, monsters, zone_requirements, zone_command):
+        return None
+    return random.choice(monsters[zone_command])
+
+def parse_zone_command(text: str) -> Tuple[str, int]:
+    """Split "meteor x100" into the zone and the number of fights (1 when there is no xN)."""
+    words = text.strip().lower().split()
+    if len(words) > 1 and words[-1][:1] == 'x' and words[-1][1:].isdigit():
+        return " ".join(words[:-1]), int(words[-1][1:])
+    return " ".join(words), 1
+
+class FarmSummary:
+    """Everything gained by farm_zone, shown as a single message."""
+
+    def __init__(self, zone: str):
+        self.zone = zone
+        self.kills: Dict[int, int] = {}  # Kills per monster ID
+        self.deaths = 0
+        self.draws = 0
+        self.gold = 0
+        self.xp = 0
+        self.levels_gained = 0
+        self.achievements: List[str] = []
+        self.seconds = 0.0  # Idle time the fights stand for (idle_rewards)
+
+    @property
+    def fights(self) -> int:
+        return sum(self.kills.values()) + self.deaths + self.draws
+
+    def describe(self) -> str:
+        lines = [f"*** {self.fights} fights in {self.zone.capitalize()} ***"]
+        for monster_id, kills in self.kills.items():
+            lines.append(f"You killed {kills} {monster_ids.name(monster_id)}(s).")
+        if self.deaths:
+            lines.append(f"You have been defeated {self.deaths} time(s).")
+        if self.draws:
+            lines.append(f"{self.draws} fight(s) ended with nobody able to hurt the other.")
+        lines.append(f"You earned {self.gold} gold and {self.xp} xp.")
+        if self.levels_gained:
+            lines.append(f"You gained {self.levels_gained} level(s)!")
+        if self.achievements:
+            lines.append(f"Achievements unlocked: {', '.join(self.achievements)}")
+        return "\n".join(lines)
+
+def farm_zone(player: Player, monsters: Dict[str, List[Monster]], zone_requirements: Dict[str, str], zone_command: str,
+              count: int, rng=random) -> Optional[FarmSummary]:
+    """Fight `count` monsters of a zone in a row, then give all the rewards at once.
+
+    The player keeps the same stats for the whole series: the XP, the level ups and the
+    achievements are applied once at the end, not after each kill.
+    """
+    if not can_enter_zone(player, monsters, zone_requirements, zone_command):
+        return None
+    if count > MAX_FARM_FIGHTS:
+        say(f"You can fight at most {MAX_FARM_FIGHTS} monsters in a row: {count} fights capped to {MAX_FARM_FIGHTS}.")
+        count = MAX_FARM_FIGHTS
+    summary = FarmSummary(zone_command)
+    zone_monsters = monsters[zone_command]
+    for _ in range(count):
+        monster = rng.choice(zone_monsters)
+        result = resolve_battle(player, monster, rng, keep_log=False)
+        if result.player_won:
+            summary.kills[monster.id] = summary.kills.get(monster.id, 0) + 1
+            summary.gold += result.gold_reward
+            summary.xp += result.xp_reward
+        elif result.winner == 'monster':
+            summary.deaths += 1
+        else:
+            summary.draws += 1
+
+    grant_farm_rewards(player, summary)
+    return summary
+
+def grant_farm_rewards(player: Player, summary: FarmSummary) -> None:
+    """Give the gold, XP and kills of a series of fights at once, then check the achievements once."""
+    level_before, achieved_before = player.level, player.achieved
+    player.add_xp(summary.xp)
+    player.gold += summary.gold
+    for monster_id, kills in summary.kills.items():
+        player.record_kill(monster_id, summary.zone, kills)
+    if summary.kills:
+        player.check_achievements([kill_event(monster_id) for monster_id in summary.kills] + [zone_event(summary.zone), GOLD_EVENT])
+    summary.levels_gained = player.level - level_before
+    summary.achievements = [achievement.name for achievement in player.achievements
+                            if player.is_achieved(achievement) and not achieved_before >> achievement.id & 1]
+    player.hp = player.max_hp
+
+def idle_rewards(player: Player, monsters: Dict[str, List[Monster]], zone_command: str, elapsed: float) -> FarmSummary:
+    """Expected result of farming a zone for `elapsed` seconds, in closed form.
+
+    For each monster of the zone (picked uniformly, like explore_zone) the exact win
+    probability and mean fight length come from formulaExact; the number of fights is
+    the elapsed time over the mean time of a fight. The cost doesn't depend on the time.
+    Only whole fights are counted: summary.seconds is the time they stand for, the rest
+    of `elapsed` is left for the next claim.
+    """
+    from formulaExact import solve_battle  # Needs numpy, only loaded when idling is used
+
+    zone_monsters = monsters[zone_command]
+    outcomes = []
+    mean_seconds = 0.0
+    for monster in zone_monsters:
+        outcome = solve_battle(player, monster)
+        decided = outcome.win_probability + outcome.loss_probability
+        turns = MAX_BATTLE_TURNS if not decided else decided * outcome.expected_turns + outcome.draw_probability * MAX_BATTLE_TURNS
+        mean_seconds += (turns * IDLE_SECONDS_PER_ROUND + IDLE_SECONDS_PER_FIGHT) / len(zone_monsters)
+        outcomes.append((monster, outcome))
+
+    fights = max(0.0, min(elapsed, MAX_IDLE_SECONDS)) / mean_seconds  # A clock set back gives nothing, not negative kills
+    summary = FarmSummary(zone_command)
+    for monster, outcome in outcomes:
+        monster_fights = fights / len(zone_monsters)
+        kills = int(monster_fights * outcome.win_probability)
+        if kills:
+            summary.kills[monster.id] = kills
+            summary.gold += kills * monster.gold_reward  # Mean of variable_gold_reward
+            summary.xp += kills * monster.xp_reward
+        summary.deaths += int(monster_fights * outcome.loss_probability)
+        summary.draws += int(monster_fights * outcome.draw_probability)
+    summary.seconds = summary.fights * mean_seconds
+    return summary
+
+def claim_idle(player: Player, monsters: Dict[str, List[Monster]], now: Optional[float] = None) -> Optional[FarmSummary]:
+    """Give the player the rewards of the idle time since the last claim, and restart the clock."""
+    now = time.time() if now is None else now
+    if player.idle_zone is None or player.idle_since is None or player.idle_zone not in monsters:
+        return None
+    start = min(max(player.idle_since, now - MAX_IDLE_SECONDS), now)  # Above a week is lost, a clock set back gives nothing
+    summary = idle_rewards(player, monsters, player.idle_zone, now - start)
+    player.idle_since = start + summary.seconds  # The part of a fight not counted yet stays for the next claim
+    grant_farm_rewards(player, summary)
+    return summary
+
+def idle_farm(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item], zone_requirements: Dict[str, str]) -> None:
+    """Claim the idle rewards, then keep idling in the same zone or in the one typed."""
+    zone_command = ask("Enter the zone to farm while you are away (empty to keep the same one): ").strip().lower()
+    summary = claim_idle(player, monsters)
+    if summary is not None:
+        say(summary.describe().replace(" fights in ", " idle fights in ", 1))
+    if zone_command and zone_command != player.idle_zone:
+        if not can_enter_zone(player, monsters, zone_requirements, zone_command):
+            return
+        player.idle_zone = zone_command
+        player.idle_since = time.time()
+        say(f"You are now farming {zone_command.capitalize()} while you are away. Type idle again to claim the rewards.")
+    elif player.idle_zone is None:
+        say("Tell me which zone to farm: type idle, then the zone.")
+
+def explore_zone(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item], zone_requirements: Dict[str, str],
+                 delay: float = BATTLE_DELAY) -> Optional[BattleResult]:
+    """Ask for a zone and fight one of its monsters. Return the result, or None if there was no single fight.
+
+    "meteor x100" fights 100 monsters in a row with farm_zone and shows one summary.
+    """
+    say(f"zones disponibles : {', '.join(zone.capitalize() for zone in monsters)}")
+    zone_command, count = parse_zone_command(ask("Enter the name of the zone (add x100 to fight 100 times): "))
+    if count > 1:
+        summary = farm_zone(player, monsters, zone_requirements, zone_command, count)
+        if summary is not None:
+            say(summary.describe())
+        return None
+
+    monster = enter_zone(player, monsters, zone_requirements, zone_command)
+    if monster is None:
+        return None
+
+    player.in_battle = True
+    result = resolve_battle(player, monster)
+    render_battle(player, result, zone_command, delay)
+    player.hp = player.max_hp
+    player.in_battle = False
+    claim_battle_rewards(player, result, zone_command)
+    return result
+
 def show_monster_kills(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
     """Display the number of monsters the player has killed."""
     player.print_monster_kills()
 
 def visit_shop(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
-    print(f"You have {player.gold} gold.\n")
-    print("Shop Items:\n")
+    say(f"You have {player.gold} gold.\n")
+    say("Shop Items:\n")
 
     weapon_items = [item for item in shop_items if isinstance(item, Weapon)]
     armor_items = [item for item in shop_items if isinstance(item, Armor)]
     ring_items = [item for item in shop_items if isinstance(item, Ring)]
     necklace_items = [item for item in shop_items if isinstance(item, Necklace)]
 
-    print("="*60)
-    print("[Weapons]")
-    print("-"*60)
+    say("="*60)
+    say("[Weapons]")
+    say("-"*60)
     for item in weapon_items:
         stats = f"Damage: {item.damage}"
-        print(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
+        say(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
 
     armor_types = ["Hat", "Chestplate", "Boots", "Pant"]
-    print("\n"+"="*60)
-    print("[Armors]")
+    say("\n"+"="*60)
+    say("[Armors]")
     for armor_type in armor_types:
-        print(f"\n{armor_type}s")
-        print("-"*60)
+        say(f"\n{armor_type}s")
+        say("-"*60)
         for item in armor_items:
             if item.slot == armor_type:
                 defense_stat = f"Defense: {item.defense}".ljust(20)
                 hp_bonus_stat = f"HP: {item.hp_bonus}".ljust(20)
                 stats = f"{defense_stat} {hp_bonus_stat}"
-                print(f"{item.name:<30} {stats:<40} Value: {item.value} gold")
+                say(f"{item.name:<30} {stats:<40} Value: {item.value} gold")
 
-    print("\n"+"="*60)
-    print("[Rings]")
-    print("-"*60)
+    say("\n"+"="*60)
+    say("[Rings]")
+    say("-"*60)
     for item in ring_items:
         stats = f"Crit Chance: {item.crit_chance}"
-        print(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
+        say(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
 
-    print("\n"+"="*60)
-    print("[Necklaces]")
-    print("-"*60)
+    say("\n"+"="*60)
+    say("[Necklaces]")
+    say("-"*60)
     for item in necklace_items:
         stats = f"Crit Damage: {item.crit_damage}"
-        print(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
+        say(f"{item.name:<30} {stats:<20} Value: {item.value} gold")
 
 def buy_item(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
-    item_name = input("Enter the name of the item you want to buy: ").strip().lower()
+    item_name = ask("Enter the name of the item you want to buy: ").strip().lower()
     item_name = remove_accents(item_name)  # Normalize user input
     if item_name == "":
-        print("Please specify the name of the item you want to buy.")
+        say("Please specify the name of the item you want to buy.")
         return
     available_items = [item for item in shop_items if remove_accents(item.name.lower()) == item_name]
     if available_items:
@@ -846,24 +1330,40 @@ def buy_item(player: Player, monsters: Dict[str, List[Monster]], shop_items: Lis
             elif isinstance(item, Necklace):
                 new_item = Necklace(item.name, item.value, item.crit_damage)
             player.inventory.append(new_item)
-            print(f"You bought {new_item.name}!")
+            say(f"You bought {new_item.name}!")
         else:
-            print("You don't have enough gold!")
+            say("You don't have enough gold!")
     else:
-        print("The item is not available in the shop.")
+        say("The item is not available in the shop.")
 
 def sell_item(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
-    item_name = input("Enter the name of the item you want to sell: ").strip().lower()
+    item_name = ask("Enter the name of the item you want to sell: ").strip().lower()
     item_name = remove_accents(item_name)  # Normalize user input
     player.sell(item_name)
 
 def equip_item(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
-    print("You have the following items in your inventory:")
+    say("You have the following items in your inventory:")
     player.print_inventory()
-    item_name = input("Enter the name of the item you want to equip: ")
+    item_name = ask("Enter the name of the item you want to equip: ")
     item_name = remove_accents(item_name)  # Normalize user input
     player.equip_item(item_name)
 
+def optimize_gear(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
+    """Show the loadout of the shop that beats a monster best with the gold of the player."""
+    from formulaGear import optimize_loadout  # Needs numpy, only loaded when the command is used
+    from formulaSim import find_monster
+
+    words = ask("Enter the monster to prepare for (add turns to kill it fastest): ").strip().split()
+    objective = "turns" if words and words[-1].lower() == "turns" else "win"
+    if objective == "turns":
+        words = words[:-1]
+    try:
+        monster = find_monster(" ".join(words), monsters)
+    except KeyError:
+        say("This monster doesn't exist.")
+        return
+    say(optimize_loadout(player, monster, player.gold, objective, shop_items).describe(player))
+
 def command_stats(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
     player.print_stats()
 
@@ -872,26 +1372,61 @@ def command_show_stuff(player: Player, monsters: Dict[str, List[Monster]], shop_
     player.print_inventory()
 
 def error_typing(player: Player, monsters: Dict[str, List[Monster]], shop_items: List[Item]) -> None:
-    print("This command doesn't exist. Type 'help' to see the list of available commands.")
-
-# Dictionnaires
-zone_requirements = {
-        'meteor': None,  # Pas d'exigence pour cette zone
-        'spatiofarm': 'Meteor Amateur',  # Nom de l'achievement nécessaire pour accéder à la zone
-        'astropolis': 'Spatiofarm Amateur',
-        'stellaris': 'Astropolis Amateur',
-        'xenodrome': 'Stellaris Amateur',
-        'nebulae': 'Xenodrome Amateur', 
-}
+    say("This command doesn't exist. Type 'help' to see the list of available commands.")
+
+class GameContent:
+    """Everything the commands read from content/, built as a whole and never changed afterwards.
+
+    A reload builds a new GameContent next to the old one and swaps the reference: the
+    commands already running keep the old one, and the fights keep their monster templates.
+    """
+
+    def __init__(self, monsters: Dict[str, List[Monster]], shop_items: List[Item], zone_requirements: Dict[str, Optional[str]],
+                 achievements: AchievementCatalogue):
+        self.monsters = monsters
+        self.shop_items = shop_items
+        self.zone_requirements = zone_requirements
+        self.achievements = achievements
+
+def load_game_content(content_dir: str = CONTENT_DIR, use_cache: bool = True) -> GameContent:
+    """Read content/ once and build every catalogue from that same read."""
+    records = load_records(content_dir, use_cache)
+    return GameContent(init_monsters(records), init_shop(records), init_zone_requirements(records), init_achievements(records))
+
+# Content the current command runs with (set by using_content, per asyncio task)
+current_content = contextvars.ContextVar('current_content', default=None)
+default_content: Optional[GameContent] = None  # content/ as read at the first need, outside of using_content
+
+def game_content() -> GameContent:
+    """The content of the current using_content block, else content/ read once, at the first call."""
+    global default_content
+    content = current_content.get()
+    if content is None:
+        if default_content is None:
+            default_content = load_game_content()
+        content = default_content
+    return content
+
+@contextlib.contextmanager
+def using_content(content: GameContent):
+    """Run the commands of the with block with this content."""
+    token = current_content.set(content)
+    try:
+        yield content
+    finally:
+        current_content.reset(token)
+
 effect_to_stat = {
     "increase_atk": "Attaque",
     "increase_def": "Défense",
     "increase_HP": "Point de vie"
 }
 command_functions = {
-    "zone": lambda player, monsters, shop_items: explore_zone(player, monsters, shop_items, zone_requirements),
+    "zone": lambda player, monsters, shop_items: explore_zone(player, monsters, shop_items, game_content().zone_requirements),
     "shop": visit_shop,
     "monster" : show_monster_kills,
+    "optimize": optimize_gear,
+    "idle": lambda player, monsters, shop_items: idle_farm(player, monsters, shop_items, game_content().zone_requirements),
     "succès" : Player.display_achievements,
     "buy": buy_item,
     "sell": sell_item,
@@ -901,122 +1436,37 @@ command_functions = {
 }
 
 def main():
-    # Monsters
-    monsters = init_monsters()
+    # Monsters, shop items, zones and achievements: content/ read once, the commands use the same
+    content = game_content()
+    monsters, shop_items, achievements = content.monsters, content.shop_items, content.achievements
 
-    # Shop Items
-    shop_items = init_shop()
+    from AlienSave import PlayerSave
 
     while True:
-        # Player
-        player = Player("Roi_Mouuw")
-        print(f"Bienvenue! Tu peux écrire Help pour voir les différentes commandes ou directement écrire Zone pour rentrer en combat.")
-        player.reset()  # Reset player stats for each new session
-
-        # Achievements
-        meteor_ach = Achievement('Meteor Guy', meteor_guy, (20, 150), "Tuer tous les monstres de la zone Meteor au moins une fois.")
-        player.add_achievement(meteor_ach)
-
-        crocus_ach = Achievement('Destructeur de Crocus', killed_10_crocus, (50, 250), 'Tuez 10 monstres Crocus.', display_condition=can_display_killed_10_crocus)
-        player.add_achievement(crocus_ach)
-
-        lunaris_ach = Achievement('Destructeur de Lunaris', killed_10_lunaris, (50, 250), 'Tuez 10 monstres Lunaris.', display_condition=can_display_killed_10_lunaris)
-        player.add_achievement(lunaris_ach)
-
-        eclair_ach = Achievement('Destructeur d\'Eclair', killed_10_eclair, (50, 250), 'Tuez 10 monstres Eclair.', display_condition=can_display_killed_10_eclair)
-        player.add_achievement(eclair_ach)
-
-        voltaic_ach = Achievement('Destructeur de Voltaic', killed_10_voltaic, (50, 250), 'Tuez 10 monstres Voltaic.', display_condition=can_display_killed_10_voltaic)
-        player.add_achievement(voltaic_ach)
-
-        all_meteor_ach_5 = Achievement('Meteor Amateur', killed_5_of_each_meteor_monster, (100, 600), 'Tuer tous les monstres de la zone Meteor au moins 5 fois.', display_condition=can_display_killed_5_of_each_meteor_monster)
-        player.add_achievement(all_meteor_ach_5)
-
-        all_meteor_ach_10 = Achievement('Meteor Walker', killed_10_of_each_meteor_monster, (400, 1500), 'Tuer tous les monstres de la zone Meteor au moins 10 fois.', display_condition=can_display_killed_10_of_each_meteor_monster)
-        player.add_achievement(all_meteor_ach_10)
-
-        meteor_100_ach = Achievement('Meteor Slayer', killed_100_meteor_monsters, (500, 2500), 'Tuez 100 monstres de la Zone Meteor.', display_condition=can_display_killed_100_meteor_monsters)
-        player.add_achievement(meteor_100_ach)
-
-        spatiofarm_ach = Achievement('Spatiofarm Guy', spatiofarm_guy, (150, 500), "Tuer tous les monstres de la zone Spatiofarm au moins une fois.")
-        player.add_achievement(spatiofarm_ach)
-
-        petalo_ach = Achievement('Destructeur de Petalo', killed_10_petalo, (250, 700), 'Tuez 10 monstres Petalo.', display_condition=can_display_killed_10_petalo)
-        player.add_achievement(petalo_ach)
-
-        gloo_ach = Achievement('Destructeur de Gloo', killed_10_gloo, (250, 700), 'Tuez 10 monstres Gloo.', display_condition=can_display_killed_10_gloo)
-        player.add_achievement(gloo_ach)
-
-        vaporis_ach = Achievement('Destructeur de Vaporis', killed_10_vaporis, (250, 700), 'Tuez 10 monstres Vaporis.', display_condition=can_display_killed_10_vaporis)
-        player.add_achievement(vaporis_ach)
-
-        foudro_ach = Achievement('Destructeur de Foudro', killed_10_foudro, (250, 700), 'Tuez 10 monstres Foudro.', display_condition=can_display_killed_10_foudro)
-        player.add_achievement(foudro_ach)
-
-        all_spatiofarm_ach_5 = Achievement('Spatiofarm Amateur', killed_5_of_each_spatiofarm_monster, (400, 1800), 'Tuer tous les monstres de la zone Spatiofarm au moins 5 fois.', display_condition=can_display_killed_5_of_each_spatiofarm_monster)
-        player.add_achievement(all_spatiofarm_ach_5)
-
-        all_spatiofarm_ach_10 = Achievement('Spatiofarm Walker', killed_10_of_each_spatiofarm_monster, (800, 4500), 'Tuer tous les monstres de la zone Spatiofarm au moins 10 fois.', display_condition=can_display_killed_10_of_each_spatiofarm_monster)
-        player.add_achievement(all_spatiofarm_ach_10)
-
-        spatiofarm_100_ach = Achievement('Spatiofarm Slayer', killed_100_spatiofarm_monsters, (1500, 8000), 'Tuez 100 monstres de la Zone Spatiofarm.', display_condition=can_display_killed_100_spatiofarm_monsters)
-        player.add_achievement(spatiofarm_100_ach)
-
-        astropolis_ach = Achievement('Astropolis guy', astropolis_guy, (300, 1000), "Tuer tous les monstres de la zone Astropolis au moins une fois.")
-        player.add_achievement(astropolis_ach)
-
-        hans_ach = Achievement('Destructeur de Hans', killed_10_hans, (500, 1200), 'Tuez 10 monstres Hans.', display_condition=can_display_killed_10_hans)
-        player.add_achievement(hans_ach)
-
-        wakashoko_ach = Achievement('Destructeur de Wakashoko', killed_10_wakashoko, (500, 1200), 'Tuez 10 monstres Wakashoko.', display_condition=can_display_killed_10_wakashoko)
-        player.add_achievement(wakashoko_ach)
-
-        glimmer_ach = Achievement('Destructeur de Glimmer', killed_10_glimmer, (500, 1200), 'Tuez 10 monstres Glimmer.', display_condition=can_display_killed_10_glimmer)
-        player.add_achievement(glimmer_ach)
-
-        all_astropolis_ach_5 = Achievement('Astropolis Amateur', killed_5_of_each_astropolis_monster, (800, 3000), 'Tuer tous les monstres de la zone Astropolis au moins 5 fois.', display_condition=can_display_killed_5_of_each_astropolis_monster)
-        player.add_achievement(all_astropolis_ach_5)
-
-        all_astropolis_ach_10 = Achievement('Astropolis Walker', killed_10_of_each_astropolis_monster, (1600, 6000), 'Tuer tous les monstres de la zone Astropolis au moins 10 fois.', display_condition=can_display_killed_10_of_each_astropolis_monster)
-        player.add_achievement(all_astropolis_ach_10)
-
-        astropolis_100_ach = Achievement('Astropolis Slayer', killed_100_astropolis_monsters, (3000, 12000), 'Tuez 100 monstres de la Zone Astropolis.', display_condition=can_display_killed_100_astropolis_monsters)
-        player.add_achievement(astropolis_100_ach)
-
-        xalith_ach = Achievement('Xa\'lith Swagger', kill_xalith, (1000, 5000), "Tuez Xa'lith, Roi du Vide.", effect=increase_atk, effect_params=(50,), display_condition=can_display_kill_xalith)
-        player.add_achievement(xalith_ach)
-
-        andariel_ach = Achievement('Andariel Swagger', kill_andariel, (1000, 5000), "Tuez, Andariel, l'Éradicateur des Mondes", effect=increase_def, effect_params=(20,), display_condition=can_display_kill_andariel)
-        player.add_achievement(andariel_ach)
-
-        mephis_ach = Achievement('Mephistofedes Swagger', kill_mephis, (1000, 5000), "Tuez Mephistofedes, le Fléau Cosmique.", effect=increase_HP, effect_params=(500,), display_condition=can_display_kill_mephis)
-        player.add_achievement(mephis_ach)
-
-        gold_achievement1 = Achievement('Poche', poche, (1, 200), 'Possédez au moins 100 pièces d\'or.')
-        player.add_achievement(gold_achievement1)
-
-        gold_achievement2 = Achievement('Gobelin', gobelin, (1, 2500), 'Possédez au moins 1000 pièces d\'or.', display_condition=can_display_gobelin)
-        player.add_achievement(gold_achievement2)
-
-        gold_achievement3 = Achievement('Enutrof', enutrof, (1, 30000), 'Possédez au moins 10000 pièces d\'or.', display_condition=can_display_enutrof)
-        player.add_achievement(gold_achievement3)
-
+        # Player: the saved one if there is a save, else a new one
+        save = PlayerSave("Roi_Mouuw")
+        player = save.load(achievements)
+        if player is None:
+            player = Player("Roi_Mouuw", achievements)
+            player.reset()  # Reset player stats for each new session
+        say(f"Bienvenue! Tu peux écrire Help pour voir les différentes commandes ou directement écrire Zone pour rentrer en combat.")
 
         # Game loop 
         while True:
             if not player.in_battle:
                 print_status(player)
-                command = input("> ").strip().lower()  # strip et lower pour normaliser la commande
+                command = ask("> ").strip().lower()  # strip et lower pour normaliser la commande
                 if command == "quit":
+                    save.compact(player)
                     break
                 elif command == "help":
                     player.print_commands()
                 elif command == "":
-                    print("Can you fucking write something instead of nothing?")
+                    say("Can you fucking write something instead of nothing?")
                 elif command == "admin" and player.name == "Roi_Mouuw":
                    player.admin_command()
                 elif command == "admin":
-                    print("Qu'essaies-tu de faire?")
+                    say("Qu'essaies-tu de faire?")
                 else:
                     # Exécute la fonction correspondante à la commande, ou la fonction d'erreur si la commande n'est pas reconnue
                     command_function = command_functions.get(command, error_typing)
@@ -1024,10 +1474,12 @@ def main():
                         command_function(player)
                     else:
                         command_function(player, monsters, shop_items)
+                save.save(player)  # Autosave: only what the command changed is appended to the journal
 
         # Break the outer loop when the player quits
         if command == "quit":
             break
 
 if __name__ == "__main__":
+    sys.modules['Alien'] = sys.modules[__name__]  # AlienSave and formulaGear import this module, not a second copy of it
     main()
@@ -0,0 +1,233 @@
+"""Game content (monsters, shop, zone gates, achievements) read from the JSON files of content/.
+
+The files are checked once and turned into plain records (tuples, lists, dicts of str and
+numbers), which Alien.py builds into its classes. The records are also written with
+marshal to content/.cache, keyed by the hash of the files: as long as nobody edits them,
+a startup only reads the cache, without parsing or checking anything again.
+"""
+import hashlib
+import json
+import marshal
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content')
+CONTENT_FILES = ('monsters.json', 'shop.json', 'zones.json', 'achievements.json')
+CACHE_VERSION = 1  # To bump when the records below change shape
+
+ITEM_FIELDS = {
+    'weapon': (('damage', int),),
+    'armor': (('defense', int), ('hp_bonus', int), ('slot', str)),
+    'ring': (('crit_chance', float),),
+    'necklace': (('crit_damage', float),),
+}
+ARMOR_SLOTS = ('Hat', 'Chestplate', 'Pant', 'Boots')
+CONDITIONS = ('kills', 'each_killed', 'zone_kills', 'gold')
+EFFECTS = ('increase_atk', 'increase_def', 'increase_HP')
+
+
+class ContentError(ValueError):
+    """A content file is missing or doesn't describe valid content."""
+
+
+def _field(entry: Dict[str, Any], key: str, kind: type, where: str, default: Any = None) -> Any:
+    """Read a field of a JSON object, checking its type (an int is fine where a float is expected)."""
+    if key not in entry:
+        if default is not None:
+            return default
+        raise ContentError(f"{where}: missing '{key}'")
+    value = entry[key]
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ContentError(f"{where}: '{key}' must be a {kind.__name__}, not {value!r}")
+    if kind in (int, float) and value < 0:
+        raise ContentError(f"{where}: '{key}' can't be negative")
+    return value
+
+
+def validate_monsters(data: Any) -> Dict[str, List[Tuple]]:
+    """Zone -> records (name, hp, damage, defense, gold_reward, xp_reward, crit_chance, crit_damage, dodge_chance)."""
+    if not isinstance(data, dict) or not data:
+        raise ContentError("monsters.json: expected an object of zones")
+    zones, names = {}, set()
+    for zone, monsters in data.items():
+        if not isinstance(monsters, list) or not monsters:
+            raise ContentError(f"monsters.json: zone {zone} must be a non-empty list of monsters")
+        records = []
+        for index, entry in enumerate(monsters):
+            where = f"monsters.json: {zone}[{index}]"
+            if not isinstance(entry, dict):
+                raise ContentError(f"{where}: expected an object")
+            name = _field(entry, 'name', str, where)
+            if name in names:
+                raise ContentError(f"{where}: two monsters are called {name}")
+            names.add(name)
+            hp = _field(entry, 'hp', int, where)
+            if hp <= 0:
+                raise ContentError(f"{where}: 'hp' must be positive")
+            records.append((name, hp, _field(entry, 'damage', int, where), _field(entry, 'defense', int, where),
+                            _field(entry, 'gold_reward', int, where), _field(entry, 'xp_reward', int, where),
+                            _field(entry, 'crit_chance', float, where, 0.03), _field(entry, 'crit_damage', float, where, 1.25),
+                            _field(entry, 'dodge_chance', float, where, 0.01)))
+        zones[zone] = records
+    return zones
+
+
+def validate_shop(data: Any) -> List[Tuple]:
+    """Records (kind, name, value, *stats of the kind), in the order of the shop."""
+    if not isinstance(data, list):
+        raise ContentError("shop.json: expected a list of items")
+    records, names = [], set()
+    for index, entry in enumerate(data):
+        where = f"shop.json: [{index}]"
+        if not isinstance(entry, dict):
+            raise ContentError(f"{where}: expected an object")
+        kind = _field(entry, 'type', str, where)
+        if kind not in ITEM_FIELDS:
+            raise ContentError(f"{where}: unknown item type {kind}, use one of {', '.join(ITEM_FIELDS)}")
+        name = _field(entry, 'name', str, where)
+        if name in names:
+            raise ContentError(f"{where}: two items are called {name}")
+        names.add(name)
+        stats = tuple(_field(entry, key, kind_of, where) for key, kind_of in ITEM_FIELDS[kind])
+        if kind == 'armor' and stats[-1] not in ARMOR_SLOTS:
+            raise ContentError(f"{where}: unknown armor slot {stats[-1]}, use one of {', '.join(ARMOR_SLOTS)}")
+        records.append((kind, name, _field(entry, 'value', int, where)) + stats)
+    return records
+
+
+def validate_zones(data: Any, zones: Dict[str, List[Tuple]]) -> Dict[str, Optional[str]]:
+    """Zone -> name of the achievement needed to enter it (None = open).
+
+    The achievement may not exist yet: the zone then stays closed until someone writes it.
+    """
+    if not isinstance(data, dict):
+        raise ContentError("zones.json: expected an object of zone -> achievement")
+    for zone, required in data.items():
+        if zone not in zones:
+            raise ContentError(f"zones.json: zone {zone} has no monsters in monsters.json")
+        if required is not None and not isinstance(required, str):
+            raise ContentError(f"zones.json: the requirement of {zone} must be an achievement name or null")
+    return dict(data)
+
+
+def _condition(spec: Any, where: str, monster_names: set, zones: Dict[str, List[Tuple]]) -> Tuple:
+    """Check a condition and return it as a record: ('kills', monster, n), ('each_killed', (monsters...), n),
+    ('zone_kills', zone, n) or ('gold', n)."""
+    if not isinstance(spec, dict):
+        raise ContentError(f"{where}: expected an object")
+    kind = _field(spec, 'type', str, where)
+    if kind not in CONDITIONS:
+        raise ContentError(f"{where}: unknown condition {kind}, use one of {', '.join(CONDITIONS)}")
+    at_least = _field(spec, 'at_least', int, where)
+    if kind == 'kills':
+        monster = _field(spec, 'monster', str, where)
+        if monster not in monster_names:
+            raise ContentError(f"{where}: unknown monster {monster}")
+        return (kind, monster, at_least)
+    if kind == 'each_killed':
+        monsters = _field(spec, 'monsters', list, where)
+        unknown = [monster for monster in monsters if monster not in monster_names]
+        if not monsters or unknown:
+            raise ContentError(f"{where}: 'monsters' must list known monsters (unknown: {', '.join(map(str, unknown))})")
+        return (kind, tuple(monsters), at_least)
+    if kind == 'zone_kills':
+        zone = _field(spec, 'zone', str, where)
+        if zone not in zones:
+            raise ContentError(f"{where}: unknown zone {zone}")
+        return (kind, zone, at_least)
+    return (kind, at_least)
+
+
+def validate_achievements(data: Any, zones: Dict[str, List[Tuple]]) -> List[Tuple]:
+    """Records (name, (gold, xp), description, condition, shown_after, effect), in the order of the catalogue.
+
+    shown_after is the achievement to get before this one is shown (or None); effect is
+    (effect name, amount) or None.
+    """
+    if not isinstance(data, list):
+        raise ContentError("achievements.json: expected a list of achievements")
+    monster_names = {record[0] for records in zones.values() for record in records}
+    names = [entry.get('name') for entry in data if isinstance(entry, dict)]
+    records = []
+    for index, entry in enumerate(data):
+        where = f"achievements.json: [{index}]"
+        if not isinstance(entry, dict):
+            raise ContentError(f"{where}: expected an object")
+        name = _field(entry, 'name', str, where)
+        if names.count(name) > 1:
+            raise ContentError(f"{where}: two achievements are called {name}")
+        reward = (_field(entry, 'gold', int, where), _field(entry, 'xp', int, where))
+        condition = _condition(entry.get('condition'), f"{where} condition", monster_names, zones)
+        shown_after = entry.get('shown_after')
+        if shown_after is not None and shown_after not in names:
+            raise ContentError(f"{where}: 'shown_after' names an unknown achievement {shown_after}")
+        effect = None
+        if 'effect' in entry:
+            effect_name = _field(entry['effect'], 'type', str, f"{where} effect")
+            if effect_name not in EFFECTS:
+                raise ContentError(f"{where}: unknown effect {effect_name}, use one of {', '.join(EFFECTS)}")
+            effect = (effect_name, _field(entry['effect'], 'amount', int, f"{where} effect"))
+        records.append((name, reward, entry.get('description', ''), condition, shown_after, effect))
+    return records
+
+
+def read_json(content_dir: str, file_name: str) -> Any:
+    path = os.path.join(content_dir, file_name)
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise ContentError(f"{file_name}: not found in {content_dir}") from None
+    except json.JSONDecodeError as error:
+        raise ContentError(f"{file_name}: {error}") from None
+
+
+def content_hash(content_dir: str = CONTENT_DIR) -> str:
+    """Hash of every content file, the key of the cache."""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for file_name in CONTENT_FILES:
+        try:
+            with open(os.path.join(content_dir, file_name), 'rb') as file:
+                digest.update(file_name.encode() + b'\0' + file.read())
+        except FileNotFoundError:
+            raise ContentError(f"{file_name}: not found in {content_dir}") from None
+    return digest.hexdigest()
+
+
+def parse_content(content_dir: str = CONTENT_DIR) -> Dict[str, Any]:
+    """Read and check every content file, without the cache."""
+    zones = validate_monsters(read_json(content_dir, 'monsters.json'))
+    return {
+        'monsters': zones,
+        'shop': validate_shop(read_json(content_dir, 'shop.json')),
+        'zones': validate_zones(read_json(content_dir, 'zones.json'), zones),
+        'achievements': validate_achievements(read_json(content_dir, 'achievements.json'), zones),
+    }
+
+
+def load_records(content_dir: str = CONTENT_DIR, use_cache: bool = True) -> Dict[str, Any]:
+    """Records of the content: from the cache when the files didn't change, else parsed, checked and cached."""
+    key = content_hash(content_dir)
+    cache_path = os.path.join(content_dir, '.cache', 'content.marshal')
+    if use_cache:
+        try:
+            with open(cache_path, 'rb') as file:
+                cached_key, records = marshal.load(file)
+            if cached_key == key:
+                return records
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # No cache yet, or a cache of another Python version: parse again
+
+    records = parse_content(content_dir)
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'wb') as file:
+                marshal.dump((key, records), file)
+            os.replace(temporary_path, cache_path)  # Another process never reads a half-written cache
+        except OSError:
+            pass  # Read-only install: run without the cache
+    return records
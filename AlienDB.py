@@ -0,0 +1,297 @@
+"""SQLite storage of the players for the bot: one database file in WAL mode.
+
+The game never waits for the disk. save() compares the player with what was already sent
+and queues only the rows that changed (absolute values: a counter, the player row...); a
+writer thread takes everything queued during flush_interval seconds and writes it in one
+transaction, the last value of each row winning. The reads (load, the profile of another
+player) take a connection of a small pool, WAL letting them run while the writer writes.
+If a transaction fails, its players are written in full at their next save().
+
+Tables: players (the numbers of Player), inventory (worn and carried items), kills and
+zone_kills (the counters, by name) and achievements (the names achieved).
+"""
+import contextlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from Alien import AchievementCatalogue, Player, monster_ids, zone_ids
+from AlienSave import ARMOR_SLOTS, SaveState, build_item, gear_record, set_counter
+
+FLUSH_INTERVAL = 0.05  # Seconds of updates written in one transaction
+READ_CONNECTIONS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    key TEXT PRIMARY KEY, name TEXT NOT NULL,
+    level INTEGER, xp INTEGER, total_xp INTEGER, gold INTEGER, hp INTEGER, max_hp INTEGER, base_atk INTEGER, defense INTEGER,
+    crit_chance REAL, crit_damage REAL, dodge_chance REAL, level_bonuses INTEGER, idle_zone TEXT, idle_since REAL
+);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE TABLE IF NOT EXISTS inventory (
+    key TEXT, position INTEGER, worn TEXT, kind TEXT, name TEXT, value INTEGER,
+    damage INTEGER, defense INTEGER, hp_bonus INTEGER, slot TEXT, crit_chance REAL, crit_damage REAL,
+    PRIMARY KEY (key, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS kills (key TEXT, monster TEXT, count INTEGER, PRIMARY KEY (key, monster)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS zone_kills (key TEXT, zone TEXT, count INTEGER, PRIMARY KEY (key, zone)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS achievements (key TEXT, name TEXT, PRIMARY KEY (key, name)) WITHOUT ROWID;
+"""
+PLAYER_COLUMNS = ('key', 'name') + Player.STORED_FIELDS + ('level_bonuses', 'idle_zone', 'idle_since')
+ITEM_STATS = {'weapon': ('damage',), 'armor': ('defense', 'hp_bonus', 'slot'), 'ring': ('crit_chance',), 'necklace': ('crit_damage',)}
+ITEM_COLUMNS = ('damage', 'defense', 'hp_bonus', 'slot', 'crit_chance', 'crit_damage')
+WORN_SLOTS = ('Weapon', 'Ring', 'Necklace') + ARMOR_SLOTS  # Order of the worn items in gear_record
+
+# Statements of the writer, by kind of queued row
+WRITES = {
+    'player': f"INSERT OR REPLACE INTO players VALUES ({', '.join('?' * len(PLAYER_COLUMNS))})",
+    'kills': "INSERT OR REPLACE INTO kills VALUES (?, ?, ?)",
+    'zone_kills': "INSERT OR REPLACE INTO zone_kills VALUES (?, ?, ?)",
+    'achieved': "INSERT OR IGNORE INTO achievements VALUES (?, ?)",
+    'lost': "DELETE FROM achievements WHERE key = ? AND name = ?",
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # With WAL, a power cut may lose the last transactions, never corrupt
+    return connection
+
+
+def inventory_rows(key: str, gear: tuple) -> List[tuple]:
+    """Rows of the inventory table: the worn items (worn = their slot) then the carried ones, in order."""
+    weapon, ring, necklace, armor, carried = gear
+    items = [(slot, record) for slot, record in zip(WORN_SLOTS, (weapon, ring, necklace) + armor) if record is not None]
+    items += [(None, record) for record in carried]
+    rows = []
+    for position, (worn, (kind, name, value, *stats)) in enumerate(items):
+        columns = dict(zip(ITEM_STATS[kind], stats))
+        rows.append((key, position, worn, kind, name, value) + tuple(columns.get(column) for column in ITEM_COLUMNS))
+    return rows
+
+
+class PlayerDatabase:
+    """Players in SQLite, written behind by a thread and read through a pool of connections."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL, read_connections: int = READ_CONNECTIONS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.writer = connect(path)
+        self.writer.executescript(SCHEMA)
+        self.readers: queue.Queue = queue.Queue()
+        for _ in range(read_connections):
+            self.readers.put(connect(path))
+        self.pending: queue.Queue = queue.Queue()  # (kind, row key, row) written by the writer thread
+        self.saved: Dict[str, SaveState] = {}  # What was already queued for each player
+        self.unwritten: Dict[str, int] = {}  # Rows of each player still in the queue
+        self.unwritten_lock = threading.Lock()
+        self.written = threading.Condition(self.unwritten_lock)  # Notified when rows leave the queue
+        self.failed = set()  # Players with rows lost in a failed transaction: their next save writes everything
+        self.error: Optional[BaseException] = None
+        self.transactions = 0
+        self.rows_written = 0
+        self.thread = threading.Thread(target=self._write_behind, name="AlienDB writer", daemon=True)
+        self.thread.start()
+
+    # Writing
+    def save(self, key: str, player: Player) -> int:
+        """Queue the rows of the player that changed since its last save. Return how many were queued.
+
+        Called from the game (the event loop): only plain tuples cross to the writer thread.
+        """
+        with self.unwritten_lock:
+            if key in self.failed:
+                self.failed.discard(key)
+                self.saved.pop(key, None)  # What it was compared with never reached the disk
+        saved = self.saved.get(key)
+        rows: List[Tuple[str, tuple, tuple]] = []
+        fields = tuple(getattr(player, field) for field in Player.STORED_FIELDS)
+        if (saved is None or fields != saved.fields or player.level_bonuses != saved.level_bonuses
+                or (player.idle_zone, player.idle_since) != saved.idle):
+            rows.append(('player', (key,), (key, player.name) + fields + (player.level_bonuses, player.idle_zone, player.idle_since)))
+        for kind, counts, ids, old_counts in (('kills', player.kills, monster_ids, saved.kills if saved else ()),
+                                              ('zone_kills', player.zone_kills, zone_ids, saved.zone_kills if saved else ())):
+            if saved is not None and counts == old_counts:
+                continue
+            for index in range(max(len(counts), len(old_counts))):
+                count = counts[index] if index < len(counts) else 0
+                if count != (old_counts[index] if index < len(old_counts) else 0):
+                    name = ids.name(index)
+                    rows.append((kind, (key, name), (key, name, count)))
+        if saved is None or player.achieved != saved.achieved or player.achievements is not saved.achievements:
+            before = set() if saved is None else {achievement.name for achievement in saved.achievements
+                                                  if saved.achieved >> achievement.id & 1}
+            now = {achievement.name for achievement in player.achievements if player.is_achieved(achievement)}
+            rows += [('achieved', (key, name), (key, name)) for name in now - before]
+            rows += [('lost', (key, name), (key, name)) for name in before - now]
+        gear = gear_record(player)
+        if saved is None or gear != saved.gear:
+            rows.append(('gear', (key,), (key, tuple(inventory_rows(key, gear)))))
+        if rows:
+            with self.unwritten_lock:
+                self.unwritten[key] = self.unwritten.get(key, 0) + len(rows)
+        for row in rows:
+            self.pending.put(row)
+        self.saved[key] = SaveState(player)
+        return len(rows)
+
+    def _write_behind(self) -> None:
+        """Writer thread: one transaction for everything queued during flush_interval."""
+        while True:
+            first = self.pending.get()
+            if first is None:
+                self.pending.task_done()
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    row = self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    self.pending.put(None)  # Close once this batch is written
+                    self.pending.task_done()
+                    break
+                batch.append(row)
+            try:
+                self._write(batch)
+            except sqlite3.Error as error:
+                self.error = error
+                print(f"AlienDB: {len(batch)} rows not written: {error}", file=sys.stderr)
+                with self.unwritten_lock:
+                    self.failed.update(row_key[0] for _, row_key, _ in batch)
+            finally:
+                with self.unwritten_lock:
+                    for _, row_key, _ in batch:
+                        left = self.unwritten[row_key[0]] - 1
+                        if left:
+                            self.unwritten[row_key[0]] = left
+                        else:
+                            del self.unwritten[row_key[0]]
+                    self.written.notify_all()
+                for _ in batch:
+                    self.pending.task_done()
+
+    def _write(self, batch: List[Tuple[str, tuple, tuple]]) -> None:
+        latest: Dict[Tuple[str, tuple], tuple] = {}
+        for kind, row_key, row in batch:
+            if kind in ('achieved', 'lost'):
+                latest.pop(('lost' if kind == 'achieved' else 'achieved', row_key), None)
+            latest[(kind, row_key)] = row  # Every row holds absolute values: the last one is the truth
+        by_kind: Dict[str, List[tuple]] = {}
+        for (kind, _), row in latest.items():
+            by_kind.setdefault(kind, []).append(row)
+
+        with self.writer:  # One transaction
+            self.writer.execute("BEGIN")
+            for kind, rows in by_kind.items():
+                if kind == 'gear':
+                    self.writer.executemany("DELETE FROM inventory WHERE key = ?", [(key,) for key, _ in rows])
+                    self.writer.executemany("INSERT INTO inventory VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            [item for _, items in rows for item in items])
+                else:
+                    self.writer.executemany(WRITES[kind], rows)
+        self.transactions += 1
+        self.rows_written += len(latest)
+
+    def wait_written(self, key: str) -> None:
+        """Wait until the rows of this player queued so far are written (or failed), whatever the queue holds for the others."""
+        with self.written:
+            self.written.wait_for(lambda: key not in self.unwritten)
+
+    def flush(self) -> None:
+        """Wait until everything saved so far is in the database."""
+        self.pending.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def forget(self, key: str) -> None:
+        """Drop what is known of the last save of the player, once it is out of memory. Its next save writes everything."""
+        self.saved.pop(key, None)
+
+    def close(self) -> None:
+        self.pending.put(None)
+        self.thread.join()
+        self.writer.close()
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+
+    # Reading
+    @contextlib.contextmanager
+    def reading(self) -> Iterator[sqlite3.Connection]:
+        """A read connection of the pool, waiting for one to be free."""
+        connection = self.readers.get()
+        try:
+            yield connection
+        finally:
+            self.readers.put(connection)
+
+    def load(self, key: str, achievements: AchievementCatalogue) -> Optional[Player]:
+        """The player as last saved, or None, to play with: its next save() only writes what changes from here.
+
+        If rows of the player are still queued (saved just before being evicted), they are written first.
+        Blocks on the disk: the server calls it in an executor thread.
+        """
+        self.wait_written(key)
+        player = self.peek(key, achievements)
+        with self.unwritten_lock:
+            self.failed.discard(key)  # Compared with what is on the disk from here
+            if player is not None:
+                self.saved[key] = SaveState(player)
+        return player
+
+    def peek_by_name(self, name: str, achievements: Optional[AchievementCatalogue] = None) -> Optional[Player]:
+        """Like peek, finding the player by its name (the first one if several share it)."""
+        with self.reading() as connection:
+            row = connection.execute("SELECT key FROM players WHERE name = ? LIMIT 1", (name,)).fetchone()
+        return None if row is None else self.peek(row[0], achievements)
+
+    def peek(self, key: str, achievements: Optional[AchievementCatalogue] = None) -> Optional[Player]:
+        """The player as last written, or None, only to be shown. The rows still in the write-behind queue are not seen.
+
+        Safe from any thread: it only uses a connection of the pool.
+        """
+        with self.reading() as connection:
+            row = connection.execute("SELECT * FROM players WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            items = connection.execute("SELECT * FROM inventory WHERE key = ? ORDER BY position", (key,)).fetchall()
+            kills = connection.execute("SELECT monster, count FROM kills WHERE key = ?", (key,)).fetchall()
+            zone_kills = connection.execute("SELECT zone, count FROM zone_kills WHERE key = ?", (key,)).fetchall()
+            achieved = connection.execute("SELECT name FROM achievements WHERE key = ?", (key,)).fetchall()
+
+        values = dict(zip(PLAYER_COLUMNS, row))
+        player = Player(values['name'], achievements)
+        for field in Player.STORED_FIELDS:
+            setattr(player, field, values[field])
+        player.level_bonuses = values['level_bonuses']
+        player.idle_zone, player.idle_since = values['idle_zone'], values['idle_since']
+        worn = {slot: None for slot in WORN_SLOTS}
+        player.inventory = []
+        for _, _, slot, kind, name, value, *stats in items:
+            columns = dict(zip(ITEM_COLUMNS, stats))
+            item = build_item((kind, name, value) + tuple(columns[column] for column in ITEM_STATS[kind]))
+            if slot is None:
+                player.inventory.append(item)
+            else:
+                worn[slot] = item
+        player.equipped_weapon, player.equipped_ring, player.equipped_necklace = worn['Weapon'], worn['Ring'], worn['Necklace']
+        player.equipped_armor = {slot: worn[slot] for slot in ARMOR_SLOTS}
+        for name, count in kills:
+            set_counter(player.kills, monster_ids.intern(name), count)
+        for zone, count in zone_kills:
+            set_counter(player.zone_kills, zone_ids.intern(zone), count)
+        player.total_kills = sum(player.kills)
+        for (name,) in achieved:
+            achievement = player.achievements.by_name.get(name)
+            if achievement is not None:
+                player.achieved |= 1 << achievement.id
+        player.invalidate_stats()
+        return player
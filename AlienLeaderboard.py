@@ -0,0 +1,268 @@
+"""Leaderboards of the server: total XP, gold, total kills and kills of each monster.
+
+Each leaderboard is an ordered index (a skip list) kept up to date by Player.on_change on
+every kill and every change of XP or gold: an update costs O(log n), the top k is read in
+O(k) and the rank of a player in O(log n), so /leaderboard stays instant with tens of
+thousands of players.
+"""
+import itertools
+import random
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from Alien import Player, monster_ids, say
+
+MAX_LEVEL = 32  # Enough for 4**32 entries with P_LEVEL = 0.25
+P_LEVEL = 0.25
+BOARD_FIELDS = {'xp': 'total_xp', 'gold': 'gold', 'kills': 'kills'}  # Name typed in /leaderboard -> field of Player.on_change
+
+
+class _Node:
+    __slots__ = ('key', 'value', 'next', 'width')
+
+    def __init__(self, key, value, level: int):
+        self.key = key
+        self.value = value
+        self.next: List[Optional['_Node']] = [None] * level
+        self.width = [0] * level  # Entries skipped by next[i], the node of next[i] included
+
+
+class SkipList:
+    """Sorted keys with a value each: insert, remove and rank in O(log n), the first k in O(k).
+
+    The keys must be unique and comparable. The links of each level know how many entries
+    they skip, so the rank of a key is summed on the way down.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.head = _Node(None, None, MAX_LEVEL)
+        self.level = 1
+        self.size = 0
+        self.rng = random.Random(seed)  # Not the global random: the fights of the game stay reproducible
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_LEVEL and self.rng.random() < P_LEVEL:
+            level += 1
+        return level
+
+    def insert(self, key, value) -> None:
+        update = [self.head] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self.head
+        for i in reversed(range(self.level)):
+            rank[i] = rank[i + 1] if i + 1 < self.level else 0
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.width[i]
+                node = node.next[i]
+            update[i] = node
+        level = self._random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                self.head.width[i] = self.size  # The new levels of the head skip every entry
+            self.level = level
+
+        new = _Node(key, value, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.width[i] = update[i].width[i] - (rank[0] - rank[i])
+            update[i].width[i] = rank[0] - rank[i] + 1
+        for i in range(level, self.level):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key) -> None:
+        update = [self.head] * MAX_LEVEL
+        node = self.head
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+        node = node.next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(self.level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self.level > 1 and self.head.next[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+
+    def rank(self, key) -> int:
+        """Position of the key, from 1. Raise KeyError if it isn't in the list."""
+        position, node = 0, self.head
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+        if node is self.head or node.key != key:
+            raise KeyError(key)
+        return position
+
+    def items(self) -> Iterator[Tuple]:
+        """(key, value) in order, lazily: taking the first k costs O(k)."""
+        node = self.head.next[0]
+        while node is not None:
+            yield node.key, node.value
+            node = node.next[0]
+
+
+class RetiredPlayer:
+    """What the boards need of a player that left the memory (evicted by the server): its name and frozen scores."""
+    __slots__ = ('name', 'total_xp', 'gold', 'total_kills', 'kills')
+
+    def __init__(self, player: Player):
+        self.name = player.name
+        self.total_xp = player.total_xp
+        self.gold = player.gold
+        self.total_kills = player.total_kills
+        self.kills = array('I', player.kills)
+
+    def kill_count(self, monster_id: int) -> int:
+        return self.kills[monster_id] if monster_id < len(self.kills) else 0
+
+
+class Leaderboard:
+    """Players ranked by a score, highest first. On a tie, the first to reach the score stays ahead."""
+
+    def __init__(self, name: str, score: Callable[[Player], int]):
+        self.name = name
+        self.score = score
+        self.entries = SkipList()
+        self.keys: Dict[Player, Tuple[int, int]] = {}  # Current key (-score, order of arrival) of each player
+        self.arrivals = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def update(self, player: Player) -> None:
+        """Move the player to the place of its current score."""
+        score = self.score(player)
+        key = self.keys.get(player)
+        if key is not None:
+            if key[0] == -score:
+                return
+            self.entries.remove(key)
+        key = self.keys[player] = (-score, next(self.arrivals))
+        self.entries.insert(key, player)
+
+    def remove(self, player: Player) -> None:
+        key = self.keys.pop(player, None)
+        if key is not None:
+            self.entries.remove(key)
+
+    def replace(self, player, other) -> None:
+        """Put other at the place of player, with the same key: same score, same order on a tie."""
+        key = self.keys.pop(player, None)
+        if key is not None:
+            self.entries.remove(key)
+            self.keys[other] = key
+            self.entries.insert(key, other)
+
+    def top(self, k: int = 10) -> List[Tuple[Player, int]]:
+        """The k best players with their score."""
+        return [(player, -key[0]) for key, player in itertools.islice(self.entries.items(), k)]
+
+    def rank(self, player: Player) -> Optional[int]:
+        """Place of the player, from 1, or None if the player isn't ranked."""
+        key = self.keys.get(player)
+        return None if key is None else self.entries.rank(key)
+
+
+class Leaderboards:
+    """Every leaderboard of a server. Players added here keep them up to date by themselves (Player.on_change)."""
+
+    def __init__(self):
+        self.boards: Dict[str, Leaderboard] = {
+            'total_xp': Leaderboard("XP", lambda player: player.total_xp),
+            'gold': Leaderboard("Gold", lambda player: player.gold),
+            'kills': Leaderboard("Kills", lambda player: player.total_kills),
+        }
+        self.monster_boards: Dict[int, Leaderboard] = {}  # Monster ID -> board, made at the first kill of the monster
+        self.players = set()
+        self.retired: Dict[str, RetiredPlayer] = {}  # User ID -> stand-in of a player out of memory
+
+    def monster_board(self, monster_id: int) -> Leaderboard:
+        board = self.monster_boards.get(monster_id)
+        if board is None:
+            board = self.monster_boards[monster_id] = Leaderboard(f"{monster_ids.name(monster_id)} kills",
+                                                                  lambda player: player.kill_count(monster_id))
+        return board
+
+    def add(self, player: Player, key: Optional[str] = None) -> None:
+        """Rank the player. The key (user ID) takes back the place of its RetiredPlayer, if it has one."""
+        retired = self.retired.pop(key, None) if key is not None else None
+        if retired is not None:
+            for board in self._boards():
+                board.replace(retired, player)
+        self.players.add(player)
+        player.on_change = self.changed
+        for board in self.boards.values():
+            board.update(player)
+        for monster_id, kills in enumerate(player.kills):
+            if kills:
+                self.monster_board(monster_id).update(player)
+
+    def remove(self, player: Player) -> None:
+        self.players.discard(player)
+        if player.on_change == self.changed:
+            player.on_change = None
+        for board in self._boards():
+            board.remove(player)
+
+    def retire(self, key: str, player: Player) -> None:
+        """The player leaves the memory but keeps its places, held by a RetiredPlayer until add(player, key)."""
+        retired = self.retired[key] = RetiredPlayer(player)
+        self.players.discard(player)
+        if player.on_change == self.changed:
+            player.on_change = None
+        for board in self._boards():
+            board.replace(player, retired)
+
+    def _boards(self) -> Iterator[Leaderboard]:
+        return itertools.chain(self.boards.values(), self.monster_boards.values())
+
+    def changed(self, player: Player, field: str, monster_id: Optional[int] = None) -> None:
+        """Player.on_change: move the player in the boards of the field."""
+        self.boards[field].update(player)
+        if field != 'kills':
+            return
+        if monster_id is not None:
+            self.monster_board(monster_id).update(player)
+        else:
+            for killed, board in self.monster_boards.items():  # Every counter changed (Player.reset)
+                if player.kill_count(killed):
+                    board.update(player)
+                else:
+                    board.remove(player)
+
+    def find(self, name: str) -> Optional[Leaderboard]:
+        """Board typed by a player: xp, gold, kills or the name of a monster (any case)."""
+        name = name.strip().lower()
+        if name in BOARD_FIELDS:
+            return self.boards[BOARD_FIELDS[name]]
+        for monster_id, board in self.monster_boards.items():
+            if monster_ids.name(monster_id).lower() == name:
+                return board
+        return None
+
+    def show(self, name: str, player: Optional[Player] = None, k: int = 10) -> None:
+        """Print the top k of a board, and the place of the player when not in it."""
+        board = self.find(name or 'xp')
+        if board is None:
+            say(f"No leaderboard called {name}. Try xp, gold, kills or the name of a monster you killed.")
+            return
+        say(f"Leaderboard {board.name}:")
+        top = board.top(k)
+        for place, (ranked, score) in enumerate(top, 1):
+            say(f"{place:>3}. {ranked.name:<20} {score}")
+        rank = board.rank(player) if player is not None else None
+        if rank is not None and rank > len(top):
+            say(f"...\n{rank:>3}. {player.name:<20} {board.score(player)}")
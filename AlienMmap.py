@@ -0,0 +1,207 @@
+"""Hot fields of the players in fixed-size records of a memory-mapped file, one slot per player.
+
+Level, XP, gold, stats and the IDs of the worn items of a player are one record of
+RECORD_TYPE at a fixed offset of the file. The columns are NumPy views of the mapping, so
+a Player attached to the store (like to a PlayerStore) reads and writes its record in
+place: loading a player is finding its slot, nothing is parsed or copied. flush() is an
+msync of the mapping; after a crash the file holds the records of the last flush, or
+newer ones.
+
+Layout: a header, ITEM_NAMES fixed slots for the names of the item IDs, then the records.
+
+A standalone backend for now: the server and Alien.main keep their players with AlienDB
+and AlienSave.
+"""
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Alien import AchievementCatalogue, Item, Player
+from AlienSave import ARMOR_SLOTS, build_item, item_record
+
+MAGIC = b'ALMM'
+VERSION = 2
+HEADER = struct.Struct('<4sIIII')  # Magic, version, record size, capacity, item names used
+ITEM_NAMES = 1024  # Most item IDs the file can name
+ITEM_NAME_BYTES = 64
+NO_ITEM = 0xFFFF
+KEY_BYTES = 32  # User ID of the player of a slot, UTF-8
+NAME_BYTES = 32  # Name shown of the player, UTF-8
+GEAR_SLOTS = ('Weapon', 'Ring', 'Necklace') + ARMOR_SLOTS
+
+RECORD_TYPE = np.dtype([
+    ('xp', '<i8'), ('total_xp', '<i8'), ('gold', '<i8'), ('hp', '<i8'), ('max_hp', '<i8'), ('base_atk', '<i8'), ('defense', '<i8'),
+    ('crit_chance', '<f8'), ('crit_damage', '<f8'), ('dodge_chance', '<f8'), ('level_bonuses', '<u8'), ('level', '<i4'),
+    ('gear', '<u2', (len(GEAR_SLOTS),)), ('used', 'u1'), ('key', f'S{KEY_BYTES}'), ('name', f'S{NAME_BYTES}'),
+])
+NAMES_OFFSET = HEADER.size
+RECORDS_OFFSET = NAMES_OFFSET + ITEM_NAMES * ITEM_NAME_BYTES
+
+
+class MappedPlayerStore:
+    """Records of players in a memory-mapped file, found by the key (user ID) of their slot."""
+
+    def __init__(self, path: str, capacity: int = 1024):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) >= RECORDS_OFFSET
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, version, record_size, capacity, names = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD_TYPE.itemsize:
+                raise ValueError(f"{path} is not a player store of version {VERSION}")
+        else:
+            names = 0
+            self.file.truncate(RECORDS_OFFSET + capacity * RECORD_TYPE.itemsize)
+        self._map(capacity)
+        self.item_names: List[str] = [self._read_name(item_id) for item_id in range(names)]
+        self.item_ids: Dict[str, int] = {name: item_id for item_id, name in enumerate(self.item_names)}
+        self.players: Dict[int, Player] = {}  # Players attached to a slot in this process
+        used = np.flatnonzero(self.records['used'])
+        self.slots: Dict[str, int] = {self.records['key'][slot].decode('utf-8'): int(slot) for slot in used}
+        self.free: List[int] = sorted(set(range(self.capacity)) - set(used.tolist()), reverse=True)
+        if not exists:
+            self._write_header()
+
+    def _map(self, capacity: int) -> None:
+        """Map the file and make the column views. The views of a previous mapping stay valid but go stale."""
+        self.capacity = capacity
+        self.mapping = mmap.mmap(self.file.fileno(), RECORDS_OFFSET + capacity * RECORD_TYPE.itemsize)
+        self.records = np.frombuffer(self.mapping, dtype=RECORD_TYPE, count=capacity, offset=RECORDS_OFFSET)
+        self.columns: Dict[str, np.ndarray] = {name: self.records[name] for name in Player.STORED_FIELDS}
+
+    def _grow(self) -> None:
+        capacity = self.capacity * 2
+        self.mapping.flush()
+        self.file.truncate(RECORDS_OFFSET + capacity * RECORD_TYPE.itemsize)  # The new records read as zeros: free
+        old_capacity = self.capacity
+        self._map(capacity)  # The attached players read self.columns at each access, they follow
+        self.free = list(range(capacity - 1, old_capacity - 1, -1)) + self.free
+        self._write_header()
+
+    def _write_header(self) -> None:
+        HEADER.pack_into(self.mapping, 0, MAGIC, VERSION, RECORD_TYPE.itemsize, self.capacity, len(self.item_names))
+
+    def _read_name(self, item_id: int) -> str:
+        offset = NAMES_OFFSET + item_id * ITEM_NAME_BYTES
+        return bytes(self.mapping[offset:offset + ITEM_NAME_BYTES]).rstrip(b'\0').decode('utf-8')
+
+    def item_id(self, item: Optional[Item]) -> int:
+        """ID of the item name in this file, given now if it is new."""
+        if item is None:
+            return NO_ITEM
+        item_id = self.item_ids.get(item.name)
+        if item_id is None:
+            data = item.name.encode('utf-8')
+            if len(data) > ITEM_NAME_BYTES or len(self.item_names) >= ITEM_NAMES:
+                raise ValueError(f"Can't give an ID to the item {item.name}: name too long or too many items")
+            item_id = len(self.item_names)
+            offset = NAMES_OFFSET + item_id * ITEM_NAME_BYTES
+            self.mapping[offset:offset + len(data)] = data
+            self.item_names.append(item.name)
+            self.item_ids[item.name] = item_id
+            self._write_header()
+        return item_id
+
+    # Players
+    def slot(self, key: str) -> Optional[int]:
+        return self.slots.get(key)
+
+    def attach(self, key: str, player: Player) -> int:
+        """Give the player the slot of the key (a new one the first time), with its current values."""
+        slot = self.slots.get(key)
+        if slot is None:
+            encoded = key.encode('utf-8')
+            if len(encoded) > KEY_BYTES:
+                raise ValueError(f"Player key {key} is longer than {KEY_BYTES} bytes")
+            if len(player.name.encode('utf-8')) > NAME_BYTES:
+                raise ValueError(f"Player name {player.name} is longer than {NAME_BYTES} bytes")
+            if not self.free:
+                self._grow()
+            slot = self.slots[key] = self.free.pop()
+            self.records['key'][slot] = encoded
+        if player._store is not None:
+            player._store.remove(player)
+        for name in Player.STORED_FIELDS:
+            self.columns[name][slot] = getattr(player, name)
+        self.records['used'][slot] = 1
+        self.players[slot] = player
+        player._store, player._row = self, slot
+        self.save(player)
+        return slot
+
+    def load(self, key: str, achievements: AchievementCatalogue, shop_items: List[Item]) -> Optional[Player]:
+        """The player of the key as a view of its record, or None. Only the worn items are built, from the shop.
+
+        Raise ValueError if a worn item isn't in the shop: the stats of the record count it.
+        """
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        player = self.players.get(slot)
+        if player is not None:
+            return player
+        player = Player(self.records['name'][slot].decode('utf-8', 'ignore'), achievements)
+        player._store, player._row = self, slot  # From here every stored field is read in the record
+        player.level_bonuses = int(self.records['level_bonuses'][slot])
+        shop = {item.name: item for item in shop_items}
+        worn = [player.equipped_weapon, None, None, None, None, None, None]  # The default weapon isn't in the shop
+        for index, item_id in enumerate(self.records['gear'][slot]):
+            if item_id == NO_ITEM:
+                worn[index] = None
+                continue
+            name = self.item_names[item_id]
+            if name in shop:
+                worn[index] = build_item(item_record(shop[name]))  # Each player owns its copy, like buy_item
+            elif worn[index] is None or worn[index].name != name:
+                raise ValueError(f"{key} wears {name}, which isn't in the shop")
+        player.equipped_weapon, player.equipped_ring, player.equipped_necklace = worn[:3]
+        player.equipped_armor = dict(zip(ARMOR_SLOTS, worn[3:]))
+        player.invalidate_stats()
+        self.players[slot] = player
+        return player
+
+    def save(self, player: Player) -> None:
+        """Write what isn't written as it changes: the name, the IDs of the worn items and the level bonuses."""
+        slot = player._row
+        self.records['name'][slot] = player.name.encode('utf-8')[:NAME_BYTES]
+        worn = [player.equipped_weapon, player.equipped_ring, player.equipped_necklace] + [player.equipped_armor[s] for s in ARMOR_SLOTS]
+        self.records['gear'][slot] = [self.item_id(item) for item in worn]
+        self.records['level_bonuses'][slot] = player.level_bonuses
+
+    def remove(self, player: Player) -> None:
+        """Detach the player: its values go back to its own slots, its record stays in the file."""
+        if player._store is not self:
+            return
+        slot = player._row
+        values = {name: self.columns[name][slot].item() for name in Player.STORED_FIELDS}
+        player._store, player._row = None, -1
+        for name, value in values.items():
+            setattr(player, name, value)
+        self.players.pop(slot, None)
+
+    def delete(self, key: str) -> None:
+        """Forget the player of the key and free its slot."""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        player = self.players.get(slot)
+        if player is not None:
+            self.remove(player)
+        self.records[slot] = np.zeros((), dtype=RECORD_TYPE)
+        self.free.append(slot)
+
+    def flush(self) -> None:
+        """msync: the records written so far survive a crash of the process or of the machine."""
+        self.mapping.flush()
+
+    def close(self) -> None:
+        for player in list(self.players.values()):
+            self.remove(player)
+        self.flush()
+        self.columns = {}
+        self.records = None
+        self.mapping.close()
+        self.file.close()
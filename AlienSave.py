@@ -0,0 +1,348 @@
+"""Saves of the players: a compact snapshot, plus a journal of what changed since.
+
+A save is two files in saves/: <name>.snap, the whole player written with marshal, and
+<name>.journal, small struct records appended by every autosave (a kill counter, a field,
+an achievement, the gear...). An autosave after a command writes a few bytes instead of
+the whole player. Loading replays the journal onto the snapshot; once the journal is
+past COMPACT_BYTES, a new snapshot is written and the journal starts over.
+
+The kill counters are written by monster and zone ID (Alien.monster_ids, zone_ids), with
+the name of each ID so the save reads back whatever the IDs of the next run are.
+"""
+import hashlib
+import marshal
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Dict, Optional, Tuple
+
+from Alien import (AchievementCatalogue, Armor, ITEM_CLASSES, Item, Player, Ring, Weapon, monster_ids,
+                   zone_ids)
+
+SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves')
+SAVE_VERSION = 1
+COMPACT_BYTES = 64 * 1024  # Journal size from which a new snapshot is written
+ARMOR_SLOTS = ('Hat', 'Chestplate', 'Pant', 'Boots')
+FLOAT_FIELDS = {'crit_chance', 'crit_damage', 'dodge_chance'}
+NO_ID = 0xFFFF
+
+SNAPSHOT_MAGIC = b'ALS1'
+JOURNAL_MAGIC = b'ALJ1'
+JOURNAL_HEADER = struct.Struct('<4sI')  # Magic, generation of the snapshot the journal goes with
+
+# Journal records: a type byte, then fixed fields (NAME and GEAR are followed by their bytes)
+FIELD_INT = struct.Struct('<cBq')  # b'F', index in Player.STORED_FIELDS, value
+FIELD_FLOAT = struct.Struct('<cBd')  # b'R', index in Player.STORED_FIELDS, value
+KILLS = struct.Struct('<cHI')  # b'K', monster ID, kills of that monster
+ZONE_KILLS = struct.Struct('<cHI')  # b'Z', zone ID, kills in that zone
+ACHIEVED = struct.Struct('<cH')  # b'A', achievement ID
+BONUSES = struct.Struct('<cQ')  # b'B', Player.level_bonuses
+IDLE = struct.Struct('<cHd')  # b'I', zone ID of idle_zone (NO_ID: none), idle_since (NaN: none)
+NAME = struct.Struct('<cBHH')  # b'N', kind of ID, ID, length of the UTF-8 name that follows
+GEAR = struct.Struct('<cI')  # b'G', length of the marshal of the gear that follows
+
+MONSTER, ZONE, ACHIEVEMENT = 0, 1, 2  # Kinds of ID named by a NAME record
+
+
+def item_record(item: Optional[Item]) -> Optional[tuple]:
+    """(kind, name, value, *stats), like the records of content/shop.json."""
+    if item is None:
+        return None
+    if isinstance(item, Weapon):
+        return ('weapon', item.name, item.value, item.damage)
+    if isinstance(item, Armor):
+        return ('armor', item.name, item.value, item.defense, item.hp_bonus, item.slot)
+    if isinstance(item, Ring):
+        return ('ring', item.name, item.value, item.crit_chance)
+    return ('necklace', item.name, item.value, item.crit_damage)
+
+
+def build_item(record: Optional[tuple]) -> Optional[Item]:
+    if record is None:
+        return None
+    kind, *fields = record
+    return ITEM_CLASSES[kind](*fields)
+
+
+def gear_record(player: Player) -> tuple:
+    """(weapon, ring, necklace, armor by slot, inventory) as item records."""
+    return (item_record(player.equipped_weapon), item_record(player.equipped_ring), item_record(player.equipped_necklace),
+            tuple(item_record(player.equipped_armor[slot]) for slot in ARMOR_SLOTS),
+            tuple(item_record(item) for item in player.inventory))
+
+
+def set_gear(player: Player, gear: tuple) -> None:
+    """Put back the gear of gear_record. max_hp already counts the armor, it is a saved field."""
+    weapon, ring, necklace, armor, inventory = gear
+    player.equipped_weapon, player.equipped_ring, player.equipped_necklace = build_item(weapon), build_item(ring), build_item(necklace)
+    player.equipped_armor = {slot: build_item(record) for slot, record in zip(ARMOR_SLOTS, armor)}
+    player.inventory = [build_item(record) for record in inventory]
+
+
+def counter_bytes(counts: array) -> bytes:
+    """The counters as little-endian uint32, whatever the machine."""
+    counts = array('I', counts)
+    if sys.byteorder == 'big':
+        counts.byteswap()
+    return counts.tobytes()
+
+
+def counter_from_bytes(data: bytes) -> array:
+    counts = array('I')
+    counts.frombytes(data)
+    if sys.byteorder == 'big':
+        counts.byteswap()
+    return counts
+
+
+def set_counter(counts: array, index: int, value: int) -> None:
+    if index >= len(counts):
+        counts.extend([0] * (index + 1 - len(counts)))
+    counts[index] = value
+
+
+def save_key(name: str) -> str:
+    """File name of a player: the name when it is safe, else a safe version with a hash to keep it unique."""
+    key = re.sub(r'[^A-Za-z0-9_-]', '_', name)
+    if key != name:
+        key = f"{key}-{hashlib.sha1(name.encode()).hexdigest()[:8]}"
+    return key
+
+
+class SaveState:
+    """What the files already hold, to write only the differences at the next autosave."""
+
+    __slots__ = ('fields', 'level_bonuses', 'achievements', 'achieved', 'kills', 'zone_kills', 'gear', 'idle')
+
+    def __init__(self, player: Player):
+        self.fields = tuple(getattr(player, field) for field in Player.STORED_FIELDS)
+        self.level_bonuses = player.level_bonuses
+        self.achievements = player.achievements
+        self.achieved = player.achieved
+        self.kills = array('I', player.kills)
+        self.zone_kills = array('I', player.zone_kills)
+        self.gear = gear_record(player)
+        self.idle = (player.idle_zone, player.idle_since)
+
+
+class PlayerSave:
+    """Snapshot and journal of one player."""
+
+    def __init__(self, name: str, directory: str = SAVE_DIR, compact_bytes: int = COMPACT_BYTES):
+        self.name = name
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, save_key(name) + '.snap')
+        self.journal_path = os.path.join(directory, save_key(name) + '.journal')
+        self.compact_bytes = compact_bytes
+        self.generation = 0
+        self.journal_size = 0
+        self.saved: Optional[SaveState] = None
+        self.named: Dict[Tuple[int, int], str] = {}  # Names already given to the IDs in the current journal
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    # Writing
+    def compact(self, player: Player) -> None:
+        """Write the whole player as a new snapshot, then start an empty journal for it."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation += 1
+        idle_zone, idle_since = player.idle_zone, player.idle_since
+        snapshot = (SAVE_VERSION, self.generation, player.name,
+                    tuple(getattr(player, field) for field in Player.STORED_FIELDS), player.level_bonuses,
+                    tuple(achievement.name for achievement in player.achievements if player.is_achieved(achievement)),
+                    tuple(monster_ids.names[:len(player.kills)]), counter_bytes(player.kills),
+                    tuple(zone_ids.names[:len(player.zone_kills)]), counter_bytes(player.zone_kills),
+                    gear_record(player), idle_zone, idle_since)
+        temporary_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(SNAPSHOT_MAGIC + marshal.dumps(snapshot))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.snapshot_path)  # A crash leaves the old snapshot, never half a new one
+        # A journal of another generation is ignored at load, so a crash here loses nothing
+        with open(self.journal_path, 'wb') as file:
+            file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, self.generation))
+        self.journal_size = JOURNAL_HEADER.size
+        self.named.clear()
+        self.saved = SaveState(player)
+
+    def save(self, player: Player) -> int:
+        """Autosave: append what changed since the last save to the journal. Return the bytes written.
+
+        The first save, a counter going down or a lost achievement write a snapshot instead.
+        """
+        saved = self.saved
+        if saved is None:
+            self.compact(player)
+            return 0
+        records = bytearray()
+        for index, (old, field) in enumerate(zip(saved.fields, Player.STORED_FIELDS)):
+            value = getattr(player, field)
+            if value != old:
+                records += (FIELD_FLOAT.pack(b'R', index, value) if field in FLOAT_FIELDS else FIELD_INT.pack(b'F', index, value))
+        if player.level_bonuses != saved.level_bonuses:
+            records += BONUSES.pack(b'B', player.level_bonuses)
+        if player.achieved != saved.achieved or player.achievements is not saved.achievements:
+            before = {achievement.name for achievement in saved.achievements if saved.achieved >> achievement.id & 1}
+            for achievement in player.achievements:
+                if player.is_achieved(achievement) and achievement.name not in before:
+                    records += self._name(ACHIEVEMENT, achievement.id, achievement.name) + ACHIEVED.pack(b'A', achievement.id)
+                before.discard(achievement.name)
+            if before:
+                self.compact(player)
+                return 0
+        for counts, old_counts, record, kind, ids in ((player.kills, saved.kills, KILLS, MONSTER, monster_ids),
+                                                      (player.zone_kills, saved.zone_kills, ZONE_KILLS, ZONE, zone_ids)):
+            if counts == old_counts:
+                continue
+            if len(counts) < len(old_counts):
+                self.compact(player)
+                return 0
+            for index, count in enumerate(counts):
+                old = old_counts[index] if index < len(old_counts) else 0
+                if count < old:
+                    self.compact(player)
+                    return 0
+                if count != old:
+                    records += self._name(kind, index, ids.name(index)) + record.pack(b'K' if kind == MONSTER else b'Z', index, count)
+        gear = gear_record(player)
+        if gear != saved.gear:
+            data = marshal.dumps(gear)
+            records += GEAR.pack(b'G', len(data)) + data
+        idle = (player.idle_zone, player.idle_since)
+        if idle != saved.idle:
+            zone_id = NO_ID if player.idle_zone is None else zone_ids.intern(player.idle_zone)
+            records += self._name(ZONE, zone_id, player.idle_zone) if zone_id != NO_ID else b''
+            records += IDLE.pack(b'I', zone_id, math.nan if player.idle_since is None else player.idle_since)
+        if not records:
+            return 0
+
+        with open(self.journal_path, 'ab') as file:
+            file.write(records)
+        self.journal_size += len(records)
+        self.saved = SaveState(player)
+        if self.journal_size > self.compact_bytes:
+            self.compact(player)
+        return len(records)
+
+    def _name(self, kind: int, name_id: int, name: str) -> bytes:
+        """NAME record of the ID, the first time the journal uses it (or when the ID changed name, after a reload)."""
+        if self.named.get((kind, name_id)) == name:
+            return b''
+        self.named[(kind, name_id)] = name
+        data = name.encode('utf-8')
+        return NAME.pack(b'N', kind, name_id, len(data)) + data
+
+    # Reading
+    def load(self, achievements: AchievementCatalogue) -> Optional[Player]:
+        """The saved player (snapshot + journal), or None when there is no save.
+
+        The catalogue is needed: without it the achievements of the save would be dropped at the next snapshot.
+        """
+        try:
+            with open(self.snapshot_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        if not data.startswith(SNAPSHOT_MAGIC):
+            raise ValueError(f"{self.snapshot_path} is not a save")
+        (version, self.generation, name, fields, level_bonuses, achieved, monster_names, kills,
+         zone_names, zone_kills, gear, idle_zone, idle_since) = marshal.loads(data[len(SNAPSHOT_MAGIC):])
+        if version != SAVE_VERSION:
+            raise ValueError(f"{self.snapshot_path}: save version {version}, expected {SAVE_VERSION}")
+
+        player = Player(name, achievements)
+        for field, value in zip(Player.STORED_FIELDS, fields):
+            setattr(player, field, value)
+        player.level_bonuses = level_bonuses
+        for achievement_name in achieved:
+            achievement = player.achievements.by_name.get(achievement_name)
+            if achievement is not None:  # Achievements removed from content/ are dropped
+                player.achieved |= 1 << achievement.id
+        for names, data, counts, ids in ((monster_names, kills, player.kills, monster_ids),
+                                         (zone_names, zone_kills, player.zone_kills, zone_ids)):
+            for saved_name, count in zip(names, counter_from_bytes(data)):
+                if count:
+                    set_counter(counts, ids.intern(saved_name), count)
+        set_gear(player, gear)
+        player.idle_zone, player.idle_since = idle_zone, idle_since
+
+        replayed = self._replay(player)
+        player.total_kills = sum(player.kills)
+        player.invalidate_stats()
+        self.saved = SaveState(player)
+        if not replayed or self.journal_size > self.compact_bytes:
+            self.compact(player)
+        return player
+
+    def _replay(self, player: Player) -> bool:
+        """Apply the journal to the player. Return False when there is no journal of this snapshot to append to.
+
+        A record cut by a crash ends the journal: it is dropped, the records before it are kept.
+        """
+        try:
+            with open(self.journal_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return False
+        if len(data) < JOURNAL_HEADER.size or JOURNAL_HEADER.unpack_from(data) != (JOURNAL_MAGIC, self.generation):
+            return False  # Journal of an older snapshot, already in it
+
+        names: Dict[Tuple[int, int], str] = {}
+        offset = JOURNAL_HEADER.size
+        while offset < len(data):
+            kind = data[offset:offset + 1]
+            try:
+                if kind == b'F' or kind == b'R':
+                    _, index, value = (FIELD_INT if kind == b'F' else FIELD_FLOAT).unpack_from(data, offset)
+                    setattr(player, Player.STORED_FIELDS[index], value)
+                    offset += FIELD_INT.size
+                elif kind == b'K' or kind == b'Z':
+                    _, name_id, count = KILLS.unpack_from(data, offset)
+                    if kind == b'K':
+                        set_counter(player.kills, monster_ids.intern(names[(MONSTER, name_id)]), count)
+                    else:
+                        set_counter(player.zone_kills, zone_ids.intern(names[(ZONE, name_id)]), count)
+                    offset += KILLS.size
+                elif kind == b'A':
+                    _, name_id = ACHIEVED.unpack_from(data, offset)
+                    achievement = player.achievements.by_name.get(names[(ACHIEVEMENT, name_id)])
+                    if achievement is not None:
+                        player.achieved |= 1 << achievement.id
+                    offset += ACHIEVED.size
+                elif kind == b'B':
+                    _, player.level_bonuses = BONUSES.unpack_from(data, offset)
+                    offset += BONUSES.size
+                elif kind == b'I':
+                    _, name_id, since = IDLE.unpack_from(data, offset)
+                    player.idle_zone = None if name_id == NO_ID else names[(ZONE, name_id)]
+                    player.idle_since = None if math.isnan(since) else since
+                    offset += IDLE.size
+                elif kind == b'N':
+                    _, name_kind, name_id, length = NAME.unpack_from(data, offset)
+                    end = offset + NAME.size + length
+                    if end > len(data):
+                        break
+                    names[(name_kind, name_id)] = data[offset + NAME.size:end].decode('utf-8')
+                    offset = end
+                elif kind == b'G':
+                    _, length = GEAR.unpack_from(data, offset)
+                    end = offset + GEAR.size + length
+                    if end > len(data):
+                        break
+                    set_gear(player, marshal.loads(data[offset + GEAR.size:end]))
+                    offset = end
+                else:
+                    break  # Garbage after a crash
+            except (struct.error, KeyError, ValueError, EOFError):
+                break
+        if offset < len(data):
+            with open(self.journal_path, 'r+b') as file:
+                file.truncate(offset)
+        self.journal_size = offset
+        self.named = names
+        return True
@@ -0,0 +1,377 @@
+"""Asyncio game server: many players in one process, for the Discord bot.
+
+Every chat message is run as a command of Alien.command_functions, with the console of
+its session so the messages go back to the right user. Battles are paced with
+asyncio.sleep, so one player's fight never blocks the commands of the others.
+reload_content reads content/ again and swaps the catalogues without stopping anything.
+With a database, the players live in a SessionCache: loaded at their first message, written
+back and dropped from memory when they have been idle too long or too many are resident.
+FakeChat stands in for Discord when running locally or in tests.
+"""
+import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from Alien import (BATTLE_DELAY, MAX_BATTLE_TURNS, Console, Encounter, GameContent, Item, Monster, Player, AchievementCatalogue,
+                   ask, battle_ending, battle_header, claim_battle_rewards, command_functions, enter_zone, error_typing,
+                   load_game_content, parse_zone_command, say, using_console, using_content)
+from AlienContent import CONTENT_DIR, ContentError
+from AlienLeaderboard import Leaderboards
+
+if TYPE_CHECKING:
+    from AlienDB import PlayerDatabase
+    from AlienStore import PlayerStore  # NumPy is only needed when a store is given
+
+PROFILE_COMMANDS = ("stats", "stuff")  # "stats alice" shows the saved profile of another player
+MAX_SESSIONS = 10000  # Players resident at once, with a database
+SESSION_TTL = 15 * 60  # Seconds without a message before a player is written back and dropped
+
+Send = Callable[[str, str], Awaitable[None]]
+
+
+class ChatConsole(Console):
+    """Console of one chat message: the prompts are answered with the words typed after the command."""
+
+    def __init__(self, answers: Optional[List[str]] = None):
+        self.answers = deque(answers or [])
+        self.lines: List[str] = []
+
+    def write(self, message: str) -> None:
+        self.lines.append(message)
+
+    def read(self, prompt: str) -> str:
+        return self.answers.popleft() if self.answers else ""
+
+    def clear(self) -> None:
+        pass  # A chat has no screen to clear
+
+    def flush(self) -> str:
+        """Return everything written since the last flush, as one message."""
+        text = "\n".join(self.lines)
+        self.lines.clear()
+        return text
+
+
+class Session:
+    """A player kept in memory between two messages of the same user."""
+
+    def __init__(self, user_id: str, player: Player):
+        self.user_id = user_id
+        self.player = player
+        self.lock = asyncio.Lock()  # The commands of one player run one after the other
+        self.last_used = 0.0  # time.monotonic() of its last message
+
+    @property
+    def busy(self) -> bool:
+        """A command or a fight is running: the session can't leave the memory now."""
+        return self.lock.locked() or self.player.in_battle
+
+
+class SessionCache:
+    """Resident sessions by user ID, least recently used first, with at most max_sessions of them.
+
+    A miss opens the session (open_session loads or creates the player, off the event loop);
+    the other messages of the user wait for that same opening. Each access also
+    closes the sessions idle for more than ttl seconds; close_session writes them back. Busy
+    sessions are never closed. Without close_session nothing is ever evicted.
+    """
+
+    def __init__(self, open_session: Callable[[str, Optional[str]], Awaitable[Session]],
+                 close_session: Optional[Callable[[Session], None]] = None,
+                 max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL, clock: Callable[[], float] = time.monotonic):
+        self.open_session = open_session
+        self.close_session = close_session
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.clock = clock
+        self.sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self.opening: Dict[str, asyncio.Future] = {}  # User ID -> session being opened
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.sessions
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self.sessions.values()))
+
+    async def get(self, user_id: str, name: Optional[str] = None) -> Session:
+        """The session of the user, opened if it isn't resident, as the most recently used."""
+        session = self.sessions.get(user_id)
+        if session is not None:
+            self.hits += 1
+            self.sessions.move_to_end(user_id)
+        elif user_id in self.opening:
+            self.hits += 1  # Loaded once for both messages
+            session = await asyncio.shield(self.opening[user_id])
+        else:
+            self.misses += 1
+            opening = self.opening[user_id] = asyncio.get_running_loop().create_future()
+            try:
+                session = await self.open_session(user_id, name)
+            except asyncio.CancelledError:
+                opening.cancel()
+                raise
+            except BaseException as error:
+                opening.set_exception(error)
+                opening.exception()  # Retrieved: no warning if nobody else was waiting
+                raise
+            finally:
+                del self.opening[user_id]
+            opening.set_result(session)
+            self.sessions[user_id] = session
+        now = self.clock()
+        session.last_used = now
+        self.evict(now, keep=user_id)
+        return session
+
+    def evict(self, now: Optional[float] = None, keep: Optional[str] = None) -> int:
+        """Close the idle sessions, then the least recently used ones over max_sessions. Return how many were closed.
+
+        Called at each access; a timer can call it too, to write back the players of a quiet server.
+        """
+        if self.close_session is None:
+            return 0
+        now = self.clock() if now is None else now
+        closed, skipped = 0, []
+        while self.sessions:
+            user_id, session = next(iter(self.sessions.items()))  # The least recently used
+            if user_id == keep or (now - session.last_used <= self.ttl
+                                   and len(self.sessions) + len(skipped) <= self.max_sessions):
+                break
+            del self.sessions[user_id]
+            if session.busy:
+                skipped.append(session)  # Put back below, still the least recently used
+                continue
+            self.close_session(session)
+            closed += 1
+        for session in reversed(skipped):
+            self.sessions[session.user_id] = session
+            self.sessions.move_to_end(session.user_id, last=False)
+        self.evictions += closed
+        return closed
+
+    def clear(self) -> None:
+        """Close every session that isn't busy, e.g. before stopping the server."""
+        if self.close_session is None:
+            return
+        for session in self:
+            if not session.busy:
+                del self.sessions[session.user_id]
+                self.close_session(session)
+                self.evictions += 1
+
+    def stats(self) -> str:
+        looked_up = self.hits + self.misses
+        rate = f"{self.hits / looked_up:.1%}" if looked_up else "-"
+        return f"{len(self)} resident, {self.hits} hits, {self.misses} misses ({rate} hit rate), {self.evictions} evictions"
+
+
+class GameServer:
+    """Registry of the sessions by user ID, dispatching the chat messages to the game commands."""
+
+    def __init__(self, send: Send, monsters: Optional[Dict[str, List[Monster]]] = None, shop_items: Optional[List[Item]] = None,
+                 achievements: Optional[AchievementCatalogue] = None, battle_delay: float = BATTLE_DELAY,
+                 content_dir: str = CONTENT_DIR, store: Optional['PlayerStore'] = None,
+                 database: Optional['PlayerDatabase'] = None, max_sessions: int = MAX_SESSIONS, session_ttl: float = SESSION_TTL):
+        self.send = send
+        self.content_dir = content_dir
+        # Read once per command: reload_content replaces it, it is never changed in place
+        content = load_game_content(content_dir)  # The catalogues given replace the ones of content_dir
+        self.content = GameContent(monsters if monsters is not None else content.monsters,
+                                   shop_items if shop_items is not None else content.shop_items, content.zone_requirements,
+                                   achievements if achievements is not None else content.achievements)
+        self.battle_delay = battle_delay
+        self.store = store  # When given, every new player gets a row of it (leaderboards, events for everyone)
+        self.database = database  # When given, the players are loaded from it and saved after each command
+        self.leaderboards = Leaderboards()
+        # Without a database an evicted player would be lost: then every session stays resident
+        self.sessions = SessionCache(self.open_session, self.close_session if database is not None else None,
+                                     max_sessions, session_ttl)
+        self.tasks = set()
+
+    async def session(self, user_id: str, name: Optional[str] = None) -> Session:
+        """Return the session of the user, loading or creating its player if it isn't in memory."""
+        return await self.sessions.get(user_id, name)
+
+    async def open_session(self, user_id: str, name: Optional[str] = None) -> Session:
+        """SessionCache miss: the player as saved, or a new one on the first message of the user."""
+        player = None
+        if self.database is not None:
+            # The read (and the wait for its rows still queued) runs in a thread: the other users keep playing
+            player = await asyncio.get_running_loop().run_in_executor(None, self.database.load, user_id,
+                                                                      self.content.achievements)
+        session = Session(user_id, player or Player(name or user_id, self.content.achievements))
+        if self.store is not None:
+            self.store.add(session.player)
+        self.leaderboards.add(session.player, user_id)
+        return session
+
+    def close_session(self, session: Session) -> None:
+        """SessionCache eviction: write the player back and let go of every reference to it."""
+        self.database.save(session.user_id, session.player)  # Queued; a load before it is written waits for it
+        self.database.forget(session.user_id)
+        if self.store is not None:
+            self.store.remove(session.player)
+        self.leaderboards.retire(session.user_id, session.player)
+
+    def dispatch(self, user_id: str, line: str, name: Optional[str] = None) -> asyncio.Task:
+        """Handle a message in its own task, so a long command never delays the other users."""
+        task = asyncio.get_running_loop().create_task(self.handle(user_id, line, name))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def handle(self, user_id: str, line: str, name: Optional[str] = None) -> None:
+        """Run one chat message, e.g. "zone meteor", "buy epee meteor" or "stats"."""
+        command, _, argument = line.strip().partition(" ")
+        command, argument = command.lower(), argument.strip()
+        session = await self.session(user_id, name)
+        if session.player.in_battle:
+            await self.send(user_id, "You are already fighting!")
+            return
+
+        if command in PROFILE_COMMANDS and argument and self.database is not None:
+            # Another player's profile, read on a connection of the pool without blocking the loop
+            text = await asyncio.get_running_loop().run_in_executor(None, self.profile, command, argument, self.content)
+            await self.send(user_id, text)
+            return
+
+        async with session.lock:
+            content = self.content  # The whole command sees the same content, even if a reload happens meanwhile
+            console = ChatConsole([argument] if argument else [])
+            try:
+                if session.player.achievements is not content.achievements:
+                    with using_console(console):
+                        session.player.use_achievements(content.achievements)
+                if command == "zone":
+                    zone, count = parse_zone_command(argument)
+                    if count == 1:
+                        await self.fight(session, zone, content, console)
+                        return
+                with using_console(console), using_content(content):
+                    self.run_command(session.player, command, content)
+                text = console.flush()
+                if text:
+                    await self.send(user_id, text)
+            finally:
+                if self.database is not None:
+                    self.database.save(user_id, session.player)  # Only queued: the writer thread does the disk
+
+    def run_command(self, player: Player, command: str, content: Optional[GameContent] = None) -> None:
+        """Run a command that never waits, like the game loop of Alien.main does."""
+        content = content if content is not None else self.content
+        if command == "help":
+            player.print_commands()
+            say("- leaderboard: Show the best players, e.g. leaderboard gold (xp, gold, kills or a monster)")
+        elif command == "leaderboard":
+            self.leaderboards.show(ask(""), player)
+        elif command == "":
+            say("Can you fucking write something instead of nothing?")
+        elif command == "succès":
+            command_functions[command](player)
+        else:
+            command_functions.get(command, error_typing)(player, content.monsters, content.shop_items)
+
+    def profile(self, command: str, who: str, content: GameContent) -> str:
+        """Output of stats or stuff for the saved player `who` (user ID or name). Runs in an executor thread."""
+        player = self.database.peek(who, content.achievements) or self.database.peek_by_name(who, content.achievements)
+        if player is None:
+            return f"Nobody called {who} has played yet."
+        console = ChatConsole()
+        with using_console(console):
+            command_functions[command](player, content.monsters, content.shop_items)
+        return console.flush()
+
+    async def reload_content(self) -> Optional[str]:
+        """Read content/ again off the event loop, then swap the catalogues. Return the error if the files are wrong.
+
+        The players switch to the new achievements at their next command (use_achievements);
+        the fights in progress end with the monsters they started with.
+        """
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(None, functools.partial(load_game_content, self.content_dir))
+        except ContentError as error:
+            return str(error)  # The old content stays in use
+        self.content = content
+        return None
+
+    async def fight(self, session: Session, zone: str, content: Optional[GameContent] = None,
+                    console: Optional[ChatConsole] = None) -> None:
+        """Play a battle round by round, sending each round to the chat."""
+        player, user_id = session.player, session.user_id
+        content = content if content is not None else self.content
+        console = console if console is not None else ChatConsole()
+        with using_console(console):
+            monster = enter_zone(player, content.monsters, content.zone_requirements, zone)
+        if monster is None:
+            await self.send(user_id, console.flush())
+            return
+
+        encounter = Encounter(player, monster)
+        player.in_battle = True
+        try:
+            await self.send(user_id, "\n".join(filter(None, [console.flush(), battle_header(monster, zone)])))
+            while not encounter.finished and encounter.turns < MAX_BATTLE_TURNS:
+                status = f"Player HP: {encounter.player_hp} Monster HP: {encounter.monster_hp}"
+                events = encounter.step()
+                await self.send(user_id, "\n".join([status] + [event.describe() for event in events]))
+                if not encounter.finished and self.battle_delay:
+                    await asyncio.sleep(self.battle_delay)
+        finally:
+            player.in_battle = False
+
+        result = encounter.result()
+        with using_console(console):
+            ending = battle_ending(result)
+            if ending:
+                say(ending)
+            claim_battle_rewards(player, result, zone)
+        await self.send(user_id, console.flush())
+
+    async def drain(self) -> None:
+        """Wait for every dispatched message to be handled."""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks))
+
+
+class FakeChat:
+    """Local stand-in for Discord: keeps what the bot sent to each user, and can echo it."""
+
+    def __init__(self, echo: bool = False):
+        self.echo = echo
+        self.messages: Dict[str, List[str]] = {}
+
+    async def send(self, user_id: str, text: str) -> None:
+        self.messages.setdefault(user_id, []).append(text)
+        if self.echo:
+            print(f"[{user_id}] {text}")
+
+
+async def run_local() -> None:
+    """Play from the terminal as several users, by typing "user: command"."""
+    chat = FakeChat(echo=True)
+    server = GameServer(chat.send)
+    loop = asyncio.get_running_loop()
+    print('Type "user: command", e.g. "alice: zone meteor", or "reload" after editing content/. Empty line to quit.')
+    while True:
+        line = await loop.run_in_executor(None, input)
+        if not line.strip():
+            break
+        if line.strip() == "reload":
+            error = await server.reload_content()
+            print(f"Content not reloaded: {error}" if error else "Content reloaded.")
+            continue
+        user_id, _, command = line.partition(":")
+        server.dispatch(user_id.strip(), command.strip())
+    await server.drain()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_local())
@@ -0,0 +1,150 @@
+"""Columnar store of the players: one NumPy array per number (level, xp, gold, hp...), one row per player.
+
+A Player added to the store keeps working as before, its stored fields (Player.STORED_FIELDS)
+just read and write its row. The operations over every player of the server (top 10 by
+XP, event XP for everyone, full heal) are then a few array operations instead of a loop
+over the Player objects.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Alien import Player
+
+COLUMN_TYPES = {
+    'level': np.int32,
+    'xp': np.int64,
+    'total_xp': np.int64,
+    'gold': np.int64,
+    'hp': np.int64,
+    'max_hp': np.int64,
+    'base_atk': np.int64,
+    'defense': np.int64,
+    'crit_chance': np.float64,
+    'crit_damage': np.float64,
+    'dodge_chance': np.float64,
+}
+
+
+class PlayerStore:
+    """Rows of players in NumPy columns. The rows of removed players are reused."""
+
+    def __init__(self, capacity: int = 1024):
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+        self.active = np.zeros(capacity, dtype=bool)  # Rows holding a player
+        self.players: List[Optional[Player]] = [None] * capacity
+        self.free: List[int] = []  # Rows of removed players, taken again first
+        self.size = 0  # Rows used at least once
+
+    def __len__(self) -> int:
+        return int(self.active.sum())
+
+    def _grow(self) -> None:
+        capacity = len(self.active) * 2
+        for name, column in self.columns.items():
+            self.columns[name] = np.resize(column, capacity)
+        self.active = np.concatenate([self.active, np.zeros(capacity - len(self.active), dtype=bool)])
+        self.players.extend([None] * (capacity - len(self.players)))
+
+    def add(self, player: Player) -> int:
+        """Move the stored fields of the player into a row of the store and return the row."""
+        if player._store is self:
+            return player._row
+        if player._store is not None:
+            player._store.remove(player)
+        if self.free:
+            row = self.free.pop()
+        else:
+            if self.size == len(self.active):
+                self._grow()
+            row = self.size
+            self.size += 1
+        for name in Player.STORED_FIELDS:
+            self.columns[name][row] = getattr(player, name)
+        self.active[row] = True
+        self.players[row] = player
+        player._store, player._row = self, row
+        return row
+
+    def remove(self, player: Player) -> None:
+        """Give the player its values back in its own slots and free its row."""
+        if player._store is not self:
+            return
+        row = player._row
+        values = {name: self.columns[name][row].item() for name in Player.STORED_FIELDS}
+        player._store, player._row = None, -1
+        for name, value in values.items():
+            setattr(player, name, value)
+        self.active[row] = False
+        self.players[row] = None
+        self.free.append(row)
+
+    def top(self, column: str, k: int = 10) -> List[Player]:
+        """The k players with the highest value of the column, best first."""
+        rows = np.flatnonzero(self.active[:self.size])
+        values = self.columns[column][rows]
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        best = np.argpartition(-values, k - 1)[:k]
+        best = best[np.argsort(-values[best], kind='stable')]
+        return [self.players[row] for row in rows[best]]
+
+    def heal_all(self) -> None:
+        """Give every player its HP back (hp = max_hp, like after a fight)."""
+        active = self.active[:self.size]
+        self.columns['hp'][:self.size][active] = self.columns['max_hp'][:self.size][active]
+
+    def give_gold_to_all(self, amount: int) -> None:
+        active = self.active[:self.size]
+        self.columns['gold'][:self.size][active] += amount
+        self._notify(np.flatnonzero(active), 'gold')
+
+    def _notify(self, rows: np.ndarray, field: str) -> None:
+        """Tell Player.on_change (the leaderboards) about a field written in the columns directly."""
+        for row in rows:
+            player = self.players[row]
+            if player.on_change is not None:
+                player.on_change(player, field, None)
+
+    def give_xp_to_all(self, amount: int) -> int:
+        """Give XP to every player at once, with the level ups of Player.level_up. Return the number of players who leveled up.
+
+        The levels, stat gains and level bonuses are computed for all the rows together; the
+        Player objects are only touched to forget their cached stats.
+        """
+        rows = np.flatnonzero(self.active[:self.size])
+        if len(rows) == 0:
+            return 0
+        columns = self.columns
+        cumulative = np.asarray(Player.xp_cumulative, dtype=np.int64)
+        gains = np.asarray(Player.stat_gains_cumulative, dtype=np.int64)  # gains[level] = (max_hp, base_atk, defense)
+        max_level = len(Player.xp_requirements) - 1
+
+        level = columns['level'][rows].astype(np.int64)
+        columns['total_xp'][rows] += amount
+        self._notify(rows, 'total_xp')
+        progress = cumulative[level] + columns['xp'][rows] + amount
+        new_level = np.minimum(np.searchsorted(cumulative, progress, side='right') - 1, max_level)
+        new_level = np.maximum(new_level, level)
+        columns['xp'][rows] = np.where(new_level >= max_level, Player.xp_requirements[-1], progress - cumulative[new_level])
+        columns['max_hp'][rows] += gains[new_level, 0] - gains[level, 0]
+        columns['base_atk'][rows] += gains[new_level, 1] - gains[level, 1]
+        columns['defense'][rows] += gains[new_level, 2] - gains[level, 2]
+        columns['level'][rows] = new_level
+
+        # Bonus levels (Player.level_bonuses_data) crossed by this XP, given like Player.give_bonus does
+        crossed_bits = np.zeros(len(rows), dtype=np.int64)
+        for bonus_level, bonuses in Player.level_bonuses_data.items():
+            crossed = (level < bonus_level) & (new_level >= bonus_level)
+            if crossed.any():
+                crossed_bits[crossed] |= 1 << bonus_level
+                for bonus_type, bonus_value in bonuses.items():
+                    columns[bonus_type][rows[crossed]] += bonus_value
+
+        leveled = np.flatnonzero(new_level > level)
+        for index in leveled:
+            player = self.players[rows[index]]
+            player.level_bonuses |= int(crossed_bits[index])
+            player.invalidate_stats()
+        return len(leveled)
@@ -1,92 +1,110 @@
-import time
-import pyautogui
-
-# Délai avant de commencer l'automatisation
-time.sleep(5)
-
-# Positionnez le curseur de la souris sur la fenêtre où vous souhaitez taper les commandes
-# Assurez-vous que la fenêtre est active et visible avant de lancer le script
-
-# Délai pour vous permettre de positionner le curseur de la souris sur la fenêtre
-time.sleep(2)
-
-# Fonction pour exécuter la macro 1
-def executer_macro_1():
-    for _ in range(35):
-        # Saisie de la commande "zone"
-        pyautogui.typewrite("zone")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.1)
-
-        # Saisie de la commande "meteor"
-        pyautogui.typewrite("meteor")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.8)
-
-    # Saisie de la commande "monster" après les 30 itérations
-    pyautogui.typewrite("monster")
-    pyautogui.press("enter")
-
-# Fonction pour exécuter la macro 2
-def executer_macro_2():
-    for _ in range(35):
-        # Saisie de la commande "zone"
-        pyautogui.typewrite("zone")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.1)
-
-        # Saisie de la commande "spatiofarm"
-        pyautogui.typewrite("spatiofarm")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.8)
-
-    # Saisie de la commande "monster" après les 30 itérations
-    pyautogui.typewrite("monster")
-    pyautogui.press("enter")
-
-
-def executer_macro_3():
-    for _ in range(35):
-        # Saisie de la commande "zone"
-        pyautogui.typewrite("zone")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.1)
-
-        # Saisie de la commande "astropolis"
-        pyautogui.typewrite("astropolis")
-        pyautogui.press("enter")
-
-        # Délai entre les commandes
-        time.sleep(0.8)
-
-    # Saisie de la commande "monster" après les 30 itérations
-    pyautogui.typewrite("monster")
-    pyautogui.press("enter")
-
-# Demande à l'utilisateur de choisir une macro
-print("Choisissez une macro à exécuter :")
-print("1. Macro 1 (zone + meteor)")
-print("2. Macro 2 (zone + spatiofarm)")
-print("3. Macro 3 (zone + astropolis)")
-
-choix = input("Votre choix : ")
-
-# Exécute la macro en fonction du choix de l'utilisateur
-if choix == "1":
-    executer_macro_1()
-elif choix == "2":
-    executer_macro_2()
-elif choix == "3":
-    executer_macro_3()
-else:
-    print("Choix invalide. Le script se termine.")
+"""Scripted farming to try the achievements without getting tired of killing monsters.
+
+The commands of Alien.py are called directly, in the same process: no keyboard,
+no focused window and no waiting between fights, so it also runs headless (CI).
+"""
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from Alien import (GameContent, Player, SilentConsole, command_functions, error_typing, explore_zone, farm_zone, game_content,
+                   parse_zone_command, say, show_monster_kills, using_console, using_content)
+
+# A script is a list of (command, repeat), e.g. ("zone meteor", 35) or ("zone meteor x35", 1)
+MACROS = {
+    "1": ("zone + meteor", [("zone meteor", 35), ("monster", 1)]),
+    "2": ("zone + spatiofarm", [("zone spatiofarm", 35), ("monster", 1)]),
+    "3": ("zone + astropolis", [("zone astropolis", 35), ("monster", 1)]),
+}
+
+
+class ScriptConsole(SilentConsole):
+    """Console answering the prompts of the commands from the script, and keeping or dropping the output."""
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self.answers = deque()
+
+    def write(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+    def read(self, prompt: str) -> str:
+        return self.answers.popleft() if self.answers else ""
+
+
+class ZoneReport:
+    """What a script gained in one zone."""
+
+    def __init__(self, zone: str):
+        self.zone = zone
+        self.fights = 0
+        self.kills = 0
+        self.deaths = 0
+        self.xp = 0
+        self.gold = 0
+
+    def __str__(self) -> str:
+        return f"{self.zone.capitalize()}: {self.kills} kills, {self.deaths} deaths in {self.fights} fights, +{self.xp} XP, +{self.gold} gold"
+
+
+def run_script(player: Player, script: List[Tuple[str, int]], content: Optional[GameContent] = None,
+               verbose: bool = False) -> Dict[str, ZoneReport]:
+    """Play every (command, repeat) of the script and return what was gained per zone.
+
+    The script plays with the given content, else with the current one (Alien.game_content), read at each run.
+    """
+    content = content if content is not None else game_content()
+    monsters, shop_items = content.monsters, content.shop_items
+    reports: Dict[str, ZoneReport] = {}
+    console = ScriptConsole(verbose)
+    with using_console(console), using_content(content):
+        for line, repeat in script:
+            command, _, argument = line.strip().lower().partition(" ")
+            for _ in range(repeat):
+                if command == "zone":
+                    xp_before, gold_before = player.total_xp, player.gold
+                    zone, count = parse_zone_command(argument)
+                    if count > 1:  # "zone meteor x100": one farm_zone series, like explore_zone does
+                        summary = farm_zone(player, monsters, content.zone_requirements, zone, count)
+                        if summary is None:
+                            break  # Unknown or locked zone, no need to try again
+                        say(summary.describe())
+                        fights, kills, deaths = summary.fights, sum(summary.kills.values()), summary.deaths
+                    else:
+                        console.answers.append(zone)
+                        result = explore_zone(player, monsters, shop_items, content.zone_requirements, delay=0)
+                        if result is None:
+                            break
+                        fights, kills, deaths = 1, int(result.player_won), int(result.winner == 'monster')
+                    report = reports.setdefault(zone, ZoneReport(zone))
+                    report.fights += fights
+                    report.kills += kills
+                    report.deaths += deaths
+                    report.xp += player.total_xp - xp_before
+                    report.gold += player.gold - gold_before
+                elif command == "monster":
+                    show_monster_kills(player, monsters, shop_items)
+                else:
+                    if argument:
+                        console.answers.append(argument)
+                    command_functions.get(command, error_typing)(player, monsters, shop_items)
+    return reports
+
+
+if __name__ == "__main__":
+    # Demande à l'utilisateur de choisir une macro
+    print("Choisissez une macro à exécuter :")
+    for key, (label, _) in MACROS.items():
+        print(f"{key}. Macro {key} ({label})")
+    choix = input("Votre choix : ")
+
+    if choix in MACROS:
+        player = Player("Roi_Mouuw", game_content().achievements)
+        # Les zones d'après demandent les succès des zones d'avant: on joue les macros précédentes d'abord
+        script = [step for key in sorted(MACROS) if key <= choix for step in MACROS[key][1]]
+        for report in run_script(player, script).values():
+            print(report)
+        print(f"Level {player.level}, {player.gold} gold")
+        player.print_monster_kills()
+    else:
+        print("Choix invalide. Le script se termine.")
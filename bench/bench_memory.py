@@ -0,0 +1,59 @@
+"""Memory of the resident players: bytes per Player with a typical mid-game state.
+
+    python bench/bench_memory.py -n 10000
+
+The shared catalogues (monsters, shop, achievements) are built before measuring, so
+only what each player owns is counted: the Player, its inventory, kill counters, etc.
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Alien import Player, SilentConsole, init_achievements, init_monsters, init_shop, using_console  # noqa: E402
+
+
+def resident_player(index: int, monsters, shop_items, achievements, rng: random.Random) -> Player:
+    """A player as the bot keeps it between two messages: some levels, items and kills."""
+    player = Player(f"player{index}", achievements)
+    player.add_xp(rng.randint(1000, 50000))
+    for item in rng.sample(shop_items, 4):
+        player.inventory.append(copy.copy(item))  # buy_item gives each player its own copy
+    player.equip_item(player.inventory[0].name)
+    for zone in ('meteor', 'spatiofarm'):
+        for monster in monsters[zone]:
+            player.record_kill(monster.id, zone, rng.randint(1, 40))
+    player.gold = rng.randint(0, 20000)
+    player.check_achievements()
+    return player
+
+
+def measure(n: int, seed: int = 0) -> float:
+    """Bytes allocated per resident player, catalogues excluded."""
+    monsters, shop_items, achievements = init_monsters(), init_shop(), init_achievements()
+    rng = random.Random(seed)
+    with using_console(SilentConsole()):
+        resident_player(-1, monsters, shop_items, achievements, rng)  # Warm up the caches of the interpreter
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        players = [resident_player(index, monsters, shop_items, achievements, rng) for index in range(n)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del players
+    return allocated / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per resident player.")
+    parser.add_argument("-n", "--players", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"{measure(args.players):.0f} bytes per resident player ({args.players} players)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Kills per second persisted to SQLite (AlienDB), with the write-behind queue or one commit per kill.
+
+    python bench/bench_sqlite.py -k 20000 -p 200
+
+Every kill is a won fight given by claim_battle_rewards (gold, XP, kill counters,
+achievements) followed by PlayerDatabase.save, as the server does after each command. The
+time runs until the last kill is in the database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Alien import BattleResult, Player, SilentConsole, claim_battle_rewards, init_achievements, init_monsters, using_console  # noqa: E402
+from AlienDB import FLUSH_INTERVAL, PlayerDatabase  # noqa: E402
+
+
+def persisted_kills_per_second(kills: int, players: int, flush_interval: float, commit_each: bool, seed: int = 0) -> float:
+    monsters, achievements = init_monsters(), init_achievements()
+    zone_monsters = [(zone, monster) for zone in ('meteor', 'spatiofarm') for monster in monsters[zone]]
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory, using_console(SilentConsole()):
+        database = PlayerDatabase(os.path.join(directory, 'bench.db'), flush_interval)
+        roster = [(f"user{index}", Player(f"player{index}", achievements)) for index in range(players)]
+        for key, player in roster:
+            database.save(key, player)
+        database.flush()
+
+        start = time.perf_counter()
+        for _ in range(kills):
+            key, player = rng.choice(roster)
+            zone, monster = rng.choice(zone_monsters)
+            claim_battle_rewards(player, BattleResult(monster, 'player', 3, [], player.hp, 0, monster.gold_reward, monster.xp_reward), zone)
+            database.save(key, player)
+            if commit_each:
+                database.flush()
+        database.flush()
+        elapsed = time.perf_counter() - start
+        transactions = database.transactions
+        database.close()
+    print(f"  {transactions} transactions", end="")
+    return kills / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kills per second persisted to SQLite.")
+    parser.add_argument("-k", "--kills", type=int, default=20000)
+    parser.add_argument("-p", "--players", type=int, default=200)
+    parser.add_argument("-i", "--interval", type=float, default=FLUSH_INTERVAL, help="seconds per write-behind transaction")
+    args = parser.parse_args()
+    for label, commit_each in (("write-behind", False), ("commit each kill", True)):
+        kills = args.kills if not commit_each else max(args.kills // 10, 1)  # Slower, fewer kills give the same rate
+        print(f"{label}:", end="")
+        rate = persisted_kills_per_second(kills, args.players, 0 if commit_each else args.interval, commit_each)
+        print(f", {rate:,.0f} kills/s persisted ({kills} kills, {args.players} players)")
+
+
+if __name__ == "__main__":
+    main()
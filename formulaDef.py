@@ -1,16 +1,110 @@
-import math
+"""Balance tables: effective damage and hits to kill over whole grids of attack and defense.
+
+Nothing here asks for input, so other tools can import it and call it in bulk.
+"""
+import argparse
+import csv
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Alien import Weapon, init_monsters, init_shop
+
 
 def calculate_damage(attk, defense):
-    """Calculate the damage done with a given attack and defense value."""
-    damage_reduction = 100 * (1 - math.exp(-defense / 200.0))
+    """Calculate the damage done with a given attack and defense value.
+
+    Works on plain numbers and on NumPy arrays (broadcasted against each other).
+    """
+    damage_reduction = 100 * (1 - np.exp(-np.asarray(defense) / 200.0))
     effective_damage = attk * (1 - (damage_reduction / 100.0))  # Apply the damage reduction
     return effective_damage
 
-def main():
-    attk = float(input("Enter attack value: "))
-    defense = float(input("Enter defense value: "))
-    damage = calculate_damage(attk, defense)
-    print(f"Effective damage done: {damage}")
+
+def damage_grid(attacks: Sequence[float], defenses: Sequence[float]) -> np.ndarray:
+    """Effective damage for every attack (rows) against every defense (columns)."""
+    return calculate_damage(np.asarray(attacks, dtype=float)[:, None], np.asarray(defenses, dtype=float)[None, :])
+
+
+def hits_to_kill(damage: np.ndarray, hp) -> np.ndarray:
+    """Number of average hits needed to take `hp` HP, inf where the damage is 0."""
+    damage = np.asarray(damage, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.where(damage > 0, np.ceil(hp / np.where(damage > 0, damage, 1)), np.inf)
+
+
+def weapon_monster_tables(monsters: Optional[Dict[str, list]] = None, shop_items: Optional[list] = None,
+                          base_atk: int = 15) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """Effective damage and hits to kill of every shop weapon (columns) on every monster (rows).
+
+    The attack of a weapon is base_atk + the weapon damage, like Player.calculate_atk.
+    """
+    monsters = monsters if monsters is not None else init_monsters()
+    shop_items = shop_items if shop_items is not None else init_shop()
+    monster_list = [monster for zone_monsters in monsters.values() for monster in zone_monsters]
+    weapons = [item for item in shop_items if isinstance(item, Weapon)]
+
+    attacks = np.array([base_atk + weapon.damage for weapon in weapons], dtype=float)
+    defenses = np.array([monster.defense for monster in monster_list], dtype=float)
+    hps = np.array([monster.hp for monster in monster_list], dtype=float)
+    damage = damage_grid(attacks, defenses).T  # rows = monsters
+    hits = hits_to_kill(damage, hps[:, None])
+    return [monster.name for monster in monster_list], [weapon.name for weapon in weapons], damage, hits
+
+
+def format_table(row_names: Sequence[str], column_names: Sequence[str], values: np.ndarray, precision: int = 1) -> str:
+    """Format a table with one line per row, ready to be printed."""
+    width = max(10, max(len(name) for name in column_names) + 2)
+    label = max(len(name) for name in row_names) + 2
+    lines = [" " * label + "".join(f"{name:>{width}}" for name in column_names)]
+    for name, row in zip(row_names, values):
+        lines.append(f"{name:<{label}}" + "".join(f"{value:>{width}.{precision}f}" for value in row))
+    return "\n".join(lines)
+
+
+def export_csv(path: str, row_names: Sequence[str], column_names: Sequence[str], values: np.ndarray) -> None:
+    """Write a table as CSV, the first column holding the row names (heatmap-ready)."""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow([""] + list(column_names))
+        for name, row in zip(row_names, values):
+            writer.writerow([name] + [f"{value:.4f}" for value in row])
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Effective damage and hits to kill tables.")
+    parser.add_argument("attack", nargs="?", type=float, help="single attack value (with defense)")
+    parser.add_argument("defense", nargs="?", type=float, help="single defense value (with attack)")
+    parser.add_argument("--base-atk", type=int, default=15, help="player attack without weapon")
+    parser.add_argument("--grid", nargs=6, type=float, metavar=("ATK_MIN", "ATK_MAX", "ATK_STEP", "DEF_MIN", "DEF_MAX", "DEF_STEP"),
+                        help="effective damage over a grid of attack and defense values")
+    parser.add_argument("--csv", metavar="PREFIX", help="export the tables as PREFIX_damage.csv and PREFIX_hits.csv")
+    args = parser.parse_args(argv)
+
+    if args.attack is not None and args.defense is not None:
+        print(f"Effective damage done: {calculate_damage(args.attack, args.defense)}")
+        return
+
+    if args.grid:
+        atk_min, atk_max, atk_step, def_min, def_max, def_step = args.grid
+        attacks = np.arange(atk_min, atk_max + atk_step / 2, atk_step)
+        defenses = np.arange(def_min, def_max + def_step / 2, def_step)
+        rows, columns = [f"{value:g}" for value in attacks], [f"{value:g}" for value in defenses]
+        damage = damage_grid(attacks, defenses)
+        print(format_table(rows, columns, damage))
+        if args.csv:
+            export_csv(f"{args.csv}_damage.csv", rows, columns, damage)
+        return
+
+    monster_names, weapon_names, damage, hits = weapon_monster_tables(base_atk=args.base_atk)
+    print("Effective damage (monsters x weapons)")
+    print(format_table(monster_names, weapon_names, damage))
+    print("\nHits to kill (monsters x weapons)")
+    print(format_table(monster_names, weapon_names, hits, precision=0))
+    if args.csv:
+        export_csv(f"{args.csv}_damage.csv", monster_names, weapon_names, damage)
+        export_csv(f"{args.csv}_hits.csv", monster_names, weapon_names, hits)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+"""Exact win probability and turns-to-kill of a fight, without sampling.
+
+The damage of one attack is turned into an exact probability table, with the rules
+of Player.roll_attack and Monster.roll_attack. The fight is then a Markov chain over
+(player HP, monster HP) states. The player's hits never depend on the player's HP and
+the monster's hits never depend on the monster's HP, so the chain splits in two: a DP
+over the monster HP gives P(the player needs t hits), a DP over the player HP gives
+P(the monster needs t hits), and the player wins when needing no more hits than the
+monster (the player always strikes first).
+"""
+import argparse
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Alien import MAX_BATTLE_TURNS, Monster, Player
+
+TOLERANCE = 1e-12  # Probability mass left alive under which the DP stops
+FFT_MIN_DAMAGE_VALUES = 256  # Above this many damage values, hits_to_kill convolves with the FFT
+
+
+class ExactResult:
+    """Exact outcome of a fight, computed by solve_battle."""
+
+    def __init__(self, win_probability: float, loss_probability: float, expected_turns: float,
+                 expected_turns_to_kill: float, turns_to_kill: List[float]):
+        self.win_probability = win_probability
+        self.loss_probability = loss_probability
+        self.draw_probability = max(0.0, 1.0 - win_probability - loss_probability)
+        self.expected_turns = expected_turns  # Mean length of a fight that ends before MAX_BATTLE_TURNS
+        self.expected_turns_to_kill = expected_turns_to_kill  # Mean length of a won fight
+        self.turns_to_kill = turns_to_kill  # turns_to_kill[t] = P(the player wins at turn t)
+
+    def summary(self) -> str:
+        return (f"Win: {self.win_probability * 100:.4f}%  Loss: {self.loss_probability * 100:.4f}%  "
+                f"Draw: {self.draw_probability * 100:.4f}%\n"
+                f"Expected turns: {self.expected_turns:.3f}  Expected turns to kill: {self.expected_turns_to_kill:.3f}")
+
+
+def player_stats(player: Player) -> Tuple[int, int, int, float, float, float]:
+    """Return the stats of the player that matter in a fight, as a hashable tuple."""
+    stats = player.stats
+    return (stats.atk, stats.max_hp, stats.defense, stats.crit_chance, stats.crit_damage, stats.dodge_chance)
+
+
+def monster_stats(monster: Monster) -> Tuple[str, int, int, int, float, float]:
+    """Return the stats of the monster that matter in a fight, as a hashable tuple."""
+    return (monster.name, monster.hp, monster.damage, monster.defense, monster.crit_chance, monster.crit_damage)
+
+
+def rolled_damage(damage: int) -> Dict[int, float]:
+    """Probability of each value of round(damage +- 10%)."""
+    if damage == 0:
+        return {0: 1.0}
+    low, high = damage * 0.9, damage * 1.1
+    table = {}
+    for value in range(math.floor(low + 0.5), math.ceil(high + 0.5) + 1):
+        width = min(high, value + 0.5) - max(low, value - 0.5)
+        if width > 0:
+            table[value] = width / (high - low)
+    return table
+
+
+def player_hit_table(stats: Tuple, monster: Tuple) -> Dict[int, float]:
+    """Probability of each damage value of one player attack."""
+    atk, _, _, crit_chance, crit_damage, _ = stats
+    if atk <= 0:
+        return {0: 1.0}
+    damage_reduction = Player.calculate_damage_reduction(monster[3])
+    table = {}
+    for rolled, probability in rolled_damage(atk).items():
+        effective = round(rolled * (1 - damage_reduction / 100.0))
+        crit = round(effective * crit_damage)
+        table[effective] = table.get(effective, 0.0) + probability * (1 - crit_chance)
+        table[crit] = table.get(crit, 0.0) + probability * crit_chance
+    return table
+
+
+def monster_hit_table(monster: Tuple, stats: Tuple) -> Dict[int, float]:
+    """Probability of each damage value of one monster attack."""
+    _, _, damage, _, crit_chance, crit_damage = monster
+    _, _, defense, _, _, dodge_chance = stats
+    damage_reduction = Player.calculate_damage_reduction(defense)
+    table = {0: dodge_chance}
+    for rolled, probability in rolled_damage(damage).items():
+        probability *= 1 - dodge_chance
+        effective = round(rolled * (1 - damage_reduction / 100.0))
+        crit = round(round(rolled * crit_damage) * (1 - damage_reduction / 100.0))
+        table[effective] = table.get(effective, 0.0) + probability * (1 - crit_chance)
+        table[crit] = table.get(crit, 0.0) + probability * crit_chance
+    return table
+
+
+def hits_to_kill(hit_table: Dict[int, float], hp: int, max_turns: int = MAX_BATTLE_TURNS) -> np.ndarray:
+    """Return P(the target dies at hit t) for t = 0..T, by a DP over the damage already taken."""
+    alive = np.zeros(hp)  # alive[h] = P(the target took h damage and is still alive)
+    alive[0] = 1.0
+    damage = np.zeros(min(max(hit_table), hp) + 1)  # damage[d] = P(one hit does d damage), hits >= hp put at hp
+    for value, probability in hit_table.items():
+        damage[min(value, hp)] += probability
+    if len(damage) > FFT_MIN_DAMAGE_VALUES:
+        # Big hits on a big HP pool: convolve through the FFT, on a size where nothing wraps around
+        size = 1 << (hp + len(damage)).bit_length()
+        spectrum = np.fft.rfft(damage, size)
+        convolve = lambda alive: np.maximum(np.fft.irfft(np.fft.rfft(alive, size) * spectrum, size)[:hp], 0.0)
+    else:
+        convolve = lambda alive: np.convolve(alive, damage)[:hp]
+    kills = [0.0]
+    for _ in range(max_turns):
+        alive_before = alive.sum()
+        alive = convolve(alive)
+        kills.append(alive_before - alive.sum())
+        if alive_before - kills[-1] < TOLERANCE:
+            break
+    return np.array(kills)
+
+
+@lru_cache(maxsize=4096)
+def _solve(stats: Tuple, monster: Tuple, max_turns: int) -> ExactResult:
+    player_kills = hits_to_kill(player_hit_table(stats, monster), monster[1], max_turns)
+    monster_kills = hits_to_kill(monster_hit_table(monster, stats), stats[1], max_turns)
+    turns = max(len(player_kills), len(monster_kills))
+    player_kills = np.pad(player_kills, (0, turns - len(player_kills)))
+    monster_kills = np.pad(monster_kills, (0, turns - len(monster_kills)))
+
+    # The player wins at turn t if the monster needs t hits and the player survived t - 1 hits
+    player_survives = 1.0 - np.cumsum(monster_kills) + monster_kills
+    # The monster wins at turn t if it needs t hits and the player needed more than t
+    monster_survives = 1.0 - np.cumsum(player_kills)
+    wins = player_kills * player_survives
+    losses = monster_kills * monster_survives
+    t = np.arange(turns)
+    win_probability = float(wins.sum())
+    loss_probability = float(losses.sum())
+    decided = win_probability + loss_probability
+    expected_turns = float((t * (wins + losses)).sum() / decided) if decided else math.inf
+    expected_turns_to_kill = float((t * wins).sum() / win_probability) if win_probability else math.inf
+    return ExactResult(win_probability, loss_probability, expected_turns, expected_turns_to_kill, wins.tolist())
+
+
+def solve_battle(player: Player, monster: Monster, max_turns: int = MAX_BATTLE_TURNS) -> ExactResult:
+    """Exact outcome of a fight of the player against the monster, memoized by stats."""
+    return _solve(player_stats(player), monster_stats(monster), max_turns)
+
+
+def main():
+    from formulaSim import build_player, find_monster
+
+    parser = argparse.ArgumentParser(description="Exact win probability of one player build against one monster.")
+    parser.add_argument("monster", help="name of the monster, e.g. Andariel")
+    parser.add_argument("-l", "--level", type=int, default=1)
+    parser.add_argument("-i", "--item", action="append", default=[], help="shop item to equip, can be repeated")
+    args = parser.parse_args()
+
+    result = solve_battle(build_player(args.level, args.item), find_monster(args.monster))
+    print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
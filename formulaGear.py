@@ -0,0 +1,249 @@
+"""Best loadout of the shop for a gold budget, against one monster.
+
+Each slot keeps only its Pareto frontier (no other item is cheaper AND better), and the
+slots are grouped by what they change in a fight: the weapon, ring and necklace make the
+player's hits, the four armor pieces make the monster's hits. Each group is a small
+frontier of its own, and each of its loadouts gets one kill distribution (formulaExact).
+A query then only crosses the two groups with one matrix product, masked by the budget.
+"""
+import argparse
+import copy
+import itertools
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Alien import MAX_BATTLE_TURNS, Armor, Item, Monster, Player, Ring, SilentConsole, Weapon, init_shop, using_console
+from formulaExact import hits_to_kill, monster_hit_table, monster_stats, player_hit_table, player_stats
+
+EXCLUDED_ITEMS = ("Baby",)  # Objet de test à 1 gold, aucun joueur ne peut l'acheter normalement
+ARMOR_SLOTS = ('Hat', 'Chestplate', 'Pant', 'Boots')
+OBJECTIVES = ("win", "turns")
+MAX_EXACT_HP = 2048  # Above this many HP, the kill distributions are computed on packs of HP (see kill_distribution)
+
+# An option of a slot or of a group: (cost, stats that only get better when higher, items)
+Option = Tuple[int, Tuple[float, ...], Tuple[Item, ...]]
+
+
+def slot_of(item: Item) -> str:
+    if isinstance(item, Weapon):
+        return 'Weapon'
+    if isinstance(item, Armor):
+        return item.slot
+    if isinstance(item, Ring):
+        return 'Ring'
+    return 'Necklace'
+
+
+def item_stats(item: Item) -> Tuple[float, ...]:
+    """The stats an item gives, all better when higher."""
+    if isinstance(item, Weapon):
+        return (item.damage,)
+    if isinstance(item, Armor):
+        return (item.defense, item.hp_bonus)
+    if isinstance(item, Ring):
+        return (item.crit_chance,)
+    return (item.crit_damage,)
+
+
+def pareto_front(options: List[Option]) -> List[Option]:
+    """Drop every option for which another one costs no more and has every stat at least as high."""
+    front: List[Option] = []
+    for option in sorted(options, key=lambda option: (option[0], [-stat for stat in option[1]])):
+        cost, stats, _ = option
+        if not any(all(kept >= stat for kept, stat in zip(other[1], stats)) for other in front):
+            front.append(option)
+    return front
+
+
+def slot_options(player: Player, shop_items: List[Item]) -> Dict[str, List[Option]]:
+    """Frontier of every slot: what the player wears or owns costs nothing, the rest of the shop costs its price."""
+    worn = {'Weapon': player.equipped_weapon, 'Ring': player.equipped_ring, 'Necklace': player.equipped_necklace}
+    worn.update(player.equipped_armor)
+    # An empty slot is an option too: it costs nothing and gives nothing
+    options: Dict[str, List[Option]] = {slot: [(0, (0, 0) if slot in ARMOR_SLOTS else (0,), ())] for slot in worn}
+    owned = {item.name for item in player.inventory} | {item.name for item in worn.values() if item}
+    for item in list(worn.values()) + player.inventory:
+        if item:
+            options[slot_of(item)].append((0, item_stats(item), (item,)))
+    for item in shop_items:
+        if item.name not in owned and item.name not in EXCLUDED_ITEMS:
+            options[slot_of(item)].append((item.value, item_stats(item), (item,)))
+    return {slot: pareto_front(slot_items) for slot, slot_items in options.items()}
+
+
+def group_front(slot_fronts: List[List[Option]], budget: int) -> List[Option]:
+    """Frontier of the loadouts of several slots within the budget, the stats of the slots put side by side."""
+    loadouts = []
+    for combination in itertools.product(*slot_fronts):
+        cost = sum(option[0] for option in combination)
+        if cost <= budget:
+            stats = tuple(stat for option in combination for stat in option[1])
+            loadouts.append((cost, stats, tuple(item for option in combination for item in option[2])))
+    return pareto_front(loadouts)
+
+
+def loadout_stats(player: Player, items: Sequence[Item]):
+    """Stats the player would have after equipping the items, computed by the game itself on a copy."""
+    trial = copy.copy(player)
+    trial.inventory = list(player.inventory)
+    trial.equipped_armor = dict(player.equipped_armor)
+    trial.invalidate_stats()
+    with using_console(SilentConsole()):
+        for item in items:
+            worn = [trial.equipped_weapon, trial.equipped_ring, trial.equipped_necklace, *trial.equipped_armor.values()]
+            if any(item is other for other in worn):
+                continue
+            if not any(item is other for other in trial.inventory):
+                trial.inventory.append(item)  # Bought from the shop
+            trial.equip_item(item.name)
+    return trial.stats
+
+
+@lru_cache(maxsize=65536)
+def kill_distribution(hit_table: Tuple[Tuple[int, float], ...], hp: int, max_turns: int) -> np.ndarray:
+    """P(the target dies at hit t), memoized: the same build against the same target is never solved twice.
+
+    Above MAX_EXACT_HP, the HP are counted by packs of `scale` HP so the DP stays small: a
+    hit of d damage is split between the two nearest packs, keeping its mean exact.
+    """
+    scale = -(-hp // MAX_EXACT_HP)
+    if scale == 1:
+        return hits_to_kill(dict(hit_table), hp, max_turns)
+    packs: Dict[int, float] = {}
+    for damage, probability in hit_table:
+        low, part = divmod(damage, scale)
+        packs[low] = packs.get(low, 0.0) + probability * (scale - part) / scale
+        if part:
+            packs[low + 1] = packs.get(low + 1, 0.0) + probability * part / scale
+    return hits_to_kill(packs, -(-hp // scale), max_turns)
+
+
+class Loadout:
+    """Result of a query: the items to wear, what they cost and how the fight goes with them."""
+
+    def __init__(self, monster: Monster, items: List[Item], cost: int, win_probability: float, expected_turns_to_kill: float):
+        self.monster = monster
+        self.items = items
+        self.cost = cost
+        self.win_probability = win_probability
+        self.expected_turns_to_kill = expected_turns_to_kill
+
+    def describe(self, player: Optional[Player] = None) -> str:
+        owned = set()
+        if player is not None:
+            owned = {item.name for item in player.inventory} | {item.name for item in [player.equipped_weapon, player.equipped_ring,
+                                                                                        player.equipped_necklace, *player.equipped_armor.values()] if item}
+        lines = [f"Best loadout against {self.monster.name}, {self.cost} gold to spend:"]
+        for item in self.items:
+            lines.append(f"- {item.name}" + (" (owned)" if item.name in owned else f" ({item.value} gold)"))
+        lines.append(f"Win: {self.win_probability * 100:.2f}%  Expected turns to kill: {self.expected_turns_to_kill:.2f}")
+        return "\n".join(lines)
+
+
+class GearSolver:
+    """Precomputed frontiers and kill distributions of one player against one monster, for many budgets.
+
+    The frontiers are built for the largest budget asked (max_budget, the whole shop when
+    None); every query with a smaller budget is one masked matrix product.
+    """
+
+    def __init__(self, player: Player, monster: Monster, max_budget: Optional[int] = None,
+                 shop_items: Optional[List[Item]] = None, max_turns: int = MAX_BATTLE_TURNS):
+        shop_items = shop_items if shop_items is not None else init_shop()
+        self.monster = monster
+        self.max_budget = math.inf if max_budget is None else max_budget
+        slots = slot_options(player, shop_items)
+        self.offense = group_front([slots['Weapon'], slots['Ring'], slots['Necklace']], self.max_budget)
+        self.defense = group_front([slots[slot] for slot in ARMOR_SLOTS], self.max_budget)
+
+        target = monster_stats(monster)
+        player_kills, monster_kills = [], []
+        for _, _, items in self.defense:
+            stats = loadout_stats(player, items)
+            table = monster_hit_table(target, (0, stats.max_hp, stats.defense, 0, 0, stats.dodge_chance))
+            monster_kills.append(kill_distribution(tuple(sorted(table.items())), stats.max_hp, max_turns))
+        # Past the turn where even the best armor is dead, the player's hits don't change anything
+        player_turns = max(len(kills) for kills in monster_kills) - 1
+        for _, _, items in self.offense:
+            stats = loadout_stats(player, items)
+            table = player_hit_table((stats.atk, 0, 0, stats.crit_chance, stats.crit_damage, 0), target)
+            player_kills.append(kill_distribution(tuple(sorted(table.items())), monster.hp, player_turns))
+
+        turns = max(len(kills) for kills in player_kills + monster_kills)
+        self.player_kills = np.array([np.pad(kills, (0, turns - len(kills))) for kills in player_kills])
+        monster_kills = np.array([np.pad(kills, (0, turns - len(kills))) for kills in monster_kills])
+        # P(the player is still alive when making the t-th hit), as in formulaExact._solve
+        self.player_survives = 1.0 - np.cumsum(monster_kills, axis=1) + monster_kills
+        self.offense_cost = np.array([cost for cost, _, _ in self.offense])
+        self.defense_cost = np.array([cost for cost, _, _ in self.defense])
+        kill_chance = self.player_kills.sum(axis=1)
+        t = np.arange(turns)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.turns_to_kill = np.where(kill_chance > 0, (self.player_kills * t).sum(axis=1) / kill_chance, np.inf)
+
+    def best(self, budget: Optional[int] = None, objective: str = "win") -> Loadout:
+        """Best loadout costing at most `budget`: highest win rate ("win") or fewest turns to kill ("turns").
+
+        Ties are broken by the other objective, then by the price.
+        """
+        budget = self.max_budget if budget is None else min(budget, self.max_budget)
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective}, use one of {', '.join(OBJECTIVES)}.")
+        wins = self.player_kills @ self.player_survives.T  # wins[o, d] = P(win) with offense o and defense d
+        cost = self.offense_cost[:, None] + self.defense_cost[None, :]
+        turns = np.broadcast_to(self.turns_to_kill[:, None], wins.shape)
+        feasible = cost <= budget
+        odds = np.round(wins[feasible], 9)  # A loadout must win noticeably more often to be worth its price
+        if objective == "win":
+            keys = (cost[feasible], turns[feasible], -odds)
+        else:
+            keys = (cost[feasible], -odds, turns[feasible])
+        choice = np.lexsort(keys)[0]  # The last key of lexsort is the first criterion
+        o, d = np.argwhere(feasible)[choice]
+        items = list(self.offense[o][2]) + list(self.defense[d][2])
+        return Loadout(self.monster, items, int(cost[o, d]), float(wins[o, d]), float(self.turns_to_kill[o]))
+
+
+_solvers: Dict[tuple, GearSolver] = {}  # Solvers of the last builds asked, by (stats, items owned, monster, shop)
+MAX_SOLVERS = 256
+
+
+def optimize_loadout(player: Player, monster: Monster, budget: Optional[int] = None, objective: str = "win",
+                     shop_items: Optional[List[Item]] = None) -> Loadout:
+    """Best loadout of the player against the monster for the budget (the player's gold by default).
+
+    The solver of a build is kept, so asking again with another budget only costs the query.
+    """
+    budget = player.gold if budget is None else budget
+    shop_items = shop_items if shop_items is not None else init_shop()
+    worn = [player.equipped_weapon, player.equipped_ring, player.equipped_necklace, *player.equipped_armor.values()]
+    key = (player_stats(player), tuple(sorted(item.name for item in worn + player.inventory if item)),
+           monster_stats(monster), tuple(item.name for item in shop_items))
+    solver = _solvers.get(key)
+    if solver is None:
+        if len(_solvers) >= MAX_SOLVERS:
+            _solvers.clear()
+        solver = _solvers[key] = GearSolver(player, monster, shop_items=shop_items)
+    return solver.best(budget, objective)
+
+
+def main():
+    from formulaSim import build_player, find_monster
+
+    parser = argparse.ArgumentParser(description="Best shop loadout for a gold budget against one monster.")
+    parser.add_argument("monster", help="name of the monster, e.g. Andariel")
+    parser.add_argument("-g", "--gold", type=int, required=True, help="gold budget")
+    parser.add_argument("-l", "--level", type=int, default=1)
+    parser.add_argument("-i", "--item", action="append", default=[], help="item already owned and worn, can be repeated")
+    parser.add_argument("-o", "--objective", choices=OBJECTIVES, default="win")
+    args = parser.parse_args()
+
+    player = build_player(args.level, args.item)
+    print(optimize_loadout(player, find_monster(args.monster), args.gold, args.objective).describe(player))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Whole playthroughs from level 1, played by bots, to see how long the game takes.
+
+A policy decides where to farm and what to buy; the fights and the rewards are the ones
+of Alien.py (resolve_battle, claim_battle_rewards). Thousands of playthroughs run on a
+process pool, each one with its own seeded random.Random, and the fights needed to
+reach every level, zone and achievement are shown as percentiles.
+"""
+import argparse
+import copy
+import csv
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from Alien import (Armor, Item, Monster, Necklace, Player, Ring, SilentConsole, Weapon, claim_battle_rewards, game_content,
+                   init_achievements, init_monsters, init_shop, resolve_battle, using_console)
+from formulaGear import EXCLUDED_ITEMS
+
+LEVEL_MILESTONES = (5, 10, 20, 30, 40, 50)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def equipped_in_slot(player: Player, item: Item) -> Optional[Item]:
+    """Return the item the player wears where `item` would go."""
+    if isinstance(item, Weapon):
+        return player.equipped_weapon
+    if isinstance(item, Armor):
+        return player.equipped_armor[item.slot]
+    if isinstance(item, Ring):
+        return player.equipped_ring
+    if isinstance(item, Necklace):
+        return player.equipped_necklace
+    return None
+
+
+def buy_and_equip(player: Player, item: Item) -> None:
+    """Buy an item of the shop and wear it at once, like typing buy then equip."""
+    player.gold -= item.value
+    player.inventory.append(copy.copy(item))  # Each player owns its copy, like buy_item
+    player.equip_item(item.name)
+
+
+class Policy:
+    """How a bot plays: where it farms, and what it buys after a fight. By default the highest unlocked zone, and nothing bought."""
+
+    name = "policy"
+
+    def choose_zone(self, player: Player, monsters: Dict[str, List[Monster]], zones: List[str]) -> str:
+        return zones[-1]
+
+    def shop(self, player: Player, shop_items: List[Item]) -> None:
+        pass
+
+
+class HighestZonePolicy(Policy):
+    """Farm the highest unlocked zone, and buy the best affordable item (the most expensive one) when it beats the worn one."""
+
+    name = "highest"
+
+    def __init__(self, buy: bool = True):
+        self.buy = buy
+
+    def shop(self, player: Player, shop_items: List[Item]) -> None:
+        if not self.buy:
+            return
+        while True:
+            upgrades = [item for item in shop_items
+                        if item.value <= player.gold and item.name not in EXCLUDED_ITEMS
+                        and item.value > getattr(equipped_in_slot(player, item), "value", -1)]
+            if not upgrades:
+                return
+            buy_and_equip(player, max(upgrades, key=lambda item: item.value))
+
+
+class SafeZonePolicy(HighestZonePolicy):
+    """Like highest, but only farm the zones the player wins at least min_win_rate of the time (exact odds)."""
+
+    name = "safe"
+
+    def __init__(self, min_win_rate: float = 0.9, buy: bool = True):
+        super().__init__(buy)
+        self.min_win_rate = min_win_rate
+        self._choice = (None, None, None)  # (stats, zones, zone): chosen again only when one of them changes
+
+    def choose_zone(self, player: Player, monsters: Dict[str, List[Monster]], zones: List[str]) -> str:
+        from formulaExact import solve_battle
+
+        stats, known_zones, zone = self._choice
+        if stats is player.stats and known_zones is zones:
+            return zone
+        zone = zones[0]
+        for candidate in reversed(zones):
+            win_rate = np.mean([solve_battle(player, monster).win_probability for monster in monsters[candidate]])
+            if win_rate >= self.min_win_rate:
+                zone = candidate
+                break
+        self._choice = (player.stats, zones, zone)
+        return zone
+
+
+POLICIES = {
+    "highest": HighestZonePolicy,
+    "safe": SafeZonePolicy,
+    "nogear": lambda: HighestZonePolicy(buy=False),
+}
+
+
+def unlocked_zones(player: Player, monsters: Dict[str, List[Monster]]) -> List[str]:
+    """Zones of the zone gates the player may enter, in the order of the game."""
+    return [zone for zone, required in game_content().zone_requirements.items()
+            if zone in monsters and (not required or player.has_achievement(required))]
+
+
+def play_through(policy: Policy, seed: int, max_fights: int = 100000, patience: int = 5000,
+                 monsters: Optional[Dict[str, List[Monster]]] = None, shop_items: Optional[List[Item]] = None) -> Dict[str, int]:
+    """Play one game from level 1 until level 50 with every zone open, max_fights, or `patience` fights without progress.
+
+    Return the number of fights played when each milestone ("level 10", "zone spatiofarm",
+    "achievement Poche") was first reached; the milestones never reached are missing.
+    """
+    rng = random.Random(seed)
+    monsters = monsters if monsters is not None else init_monsters()
+    shop_items = shop_items if shop_items is not None else init_shop()
+    player = Player("Bot", init_achievements())
+    reached: Dict[str, int] = {}
+    all_zones = [zone for zone in game_content().zone_requirements if zone in monsters]
+    max_level = len(Player.xp_requirements) - 1
+    progress = 0  # Last fight that reached a milestone
+
+    def mark(fights: int) -> None:
+        for level in LEVEL_MILESTONES:
+            if player.level >= level:
+                reached.setdefault(f"level {level}", fights)
+        for zone in zones:
+            reached.setdefault(f"zone {zone}", fights)
+        for achievement in player.achievements:
+            if player.is_achieved(achievement):
+                reached.setdefault(f"achievement {achievement.name}", fights)
+
+    with using_console(SilentConsole()):
+        zones = unlocked_zones(player, monsters)
+        mark(0)
+        for fights in range(1, max_fights + 1):
+            zone = policy.choose_zone(player, monsters, zones)
+            result = resolve_battle(player, rng.choice(monsters[zone]), rng, keep_log=False)
+            player.hp = player.max_hp
+            if result.player_won:
+                achieved, level = player.achieved, player.level
+                claim_battle_rewards(player, result, zone)
+                policy.shop(player, shop_items)
+                if player.achieved != achieved or player.level != level:
+                    zones = unlocked_zones(player, monsters)
+                    mark(fights)
+                    progress = fights
+                    if player.level >= max_level and len(zones) == len(all_zones):
+                        break
+            if fights - progress >= patience:
+                break  # Stuck: a zone nobody can unlock, or a wall the policy never passes
+    return reached
+
+
+def _play_chunk(policy_name: str, seeds: Sequence[int], max_fights: int, patience: int) -> List[Dict[str, int]]:
+    policy = POLICIES[policy_name]()
+    monsters, shop_items = init_monsters(), init_shop()
+    return [play_through(policy, seed, max_fights, patience, monsters, shop_items) for seed in seeds]
+
+
+def run_playthroughs(policy_name: str = "highest", n: int = 1000, seed: int = 0, max_fights: int = 100000, patience: int = 5000,
+                     workers: Optional[int] = None, chunk_size: int = 25) -> List[Dict[str, int]]:
+    """Play n games on a process pool. The seed of each game is drawn from `seed`, so the results don't depend on the workers."""
+    seed_rng = random.Random(seed)
+    seeds = [seed_rng.getrandbits(64) for _ in range(n)]
+    chunks = [seeds[start:start + chunk_size] for start in range(0, n, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_play_chunk, policy_name, chunk, max_fights, patience) for chunk in chunks]
+        return [reached for future in futures for reached in future.result()]
+
+
+def milestone_percentiles(runs: List[Dict[str, int]], percentiles: Sequence[float] = PERCENTILES) -> Dict[str, np.ndarray]:
+    """Fights needed for each milestone at the given percentiles, over the runs that reached it (in order of the median)."""
+    fights: Dict[str, List[int]] = {}
+    for reached in runs:
+        for milestone, count in reached.items():
+            fights.setdefault(milestone, []).append(count)
+    table = {milestone: np.percentile(counts, percentiles) for milestone, counts in fights.items()}
+    return dict(sorted(table.items(), key=lambda entry: entry[1][len(percentiles) // 2]))
+
+
+def format_percentiles(runs: List[Dict[str, int]], percentiles: Sequence[float] = PERCENTILES) -> str:
+    """One line per milestone: how many runs reached it and the fights needed at each percentile."""
+    table = milestone_percentiles(runs, percentiles)
+    label = max(len(milestone) for milestone in table) + 2
+    lines = [f"{'':<{label}}{'reached':>9}" + "".join(f"{f'p{p:g}':>9}" for p in percentiles)]
+    for milestone, values in table.items():
+        share = sum(milestone in reached for reached in runs) / len(runs)
+        lines.append(f"{milestone:<{label}}{share * 100:>8.0f}%" + "".join(f"{value:>9.0f}" for value in values))
+    return "\n".join(lines)
+
+
+def export_curves(path: str, runs: List[Dict[str, int]]) -> None:
+    """Write the whole percentile curve (0 to 100 by 5) of every milestone as CSV, one row per milestone."""
+    percentiles = list(range(0, 101, 5))
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["milestone"] + [f"p{p}" for p in percentiles])
+        for milestone, values in milestone_percentiles(runs, percentiles).items():
+            writer.writerow([milestone] + [f"{value:.0f}" for value in values])
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Fights needed to reach each level, zone and achievement, over many bot playthroughs.")
+    parser.add_argument("-p", "--policy", choices=sorted(POLICIES), default="highest")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("--max-fights", type=int, default=100000, help="a game stops after this many fights")
+    parser.add_argument("--patience", type=int, default=5000, help="a game stops after this many fights without progress")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", metavar="PATH", help="export the percentile curves as CSV")
+    args = parser.parse_args(argv)
+
+    runs = run_playthroughs(args.policy, args.games, args.seed, args.max_fights, args.patience, args.workers)
+    print(f"{len(runs)} games with the {args.policy} policy (fights needed, over the games that got there)")
+    print(format_percentiles(runs))
+    if args.csv:
+        export_curves(args.csv, runs)
+
+
+if __name__ == "__main__":
+    main()
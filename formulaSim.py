@@ -0,0 +1,167 @@
+"""Monte Carlo battle simulator, to balance a zone with thousands of fights instead of one.
+
+All the fights are played at once with NumPy arrays, following the same rules as
+Player.roll_attack and Monster.roll_attack: +-10% damage variation, crit, dodge and
+the exp(-defense/200) damage reduction.
+"""
+import argparse
+import contextlib
+import io
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from Alien import MAX_BATTLE_TURNS, Item, Monster, Player, init_monsters, init_shop, remove_accents
+
+
+class SimulationResult:
+    """Outcome of simulate_battles, one entry per fight."""
+
+    def __init__(self, monster: Monster, winners: np.ndarray, turns: np.ndarray, player_hp: np.ndarray, monster_hp: np.ndarray):
+        self.monster = monster
+        self.winners = winners  # 1 = player, 2 = monster, 0 = draw (max_turns reached)
+        self.turns = turns
+        self.player_hp = player_hp  # HP left to the player at the end of each fight
+        self.monster_hp = monster_hp  # HP left to the monster at the end of each fight
+
+    @property
+    def fights(self) -> int:
+        return len(self.winners)
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.mean(self.winners == 1))
+
+    @property
+    def turns_distribution(self) -> np.ndarray:
+        """Number of won fights for each turn count (index = turns to kill)."""
+        return np.bincount(self.turns[self.winners == 1], minlength=1)
+
+    def summary(self) -> str:
+        won = self.winners == 1
+        lines = [f"{self.monster.name}: {self.fights} fights, win rate {self.win_rate * 100:.2f}%"]
+        if won.any():
+            p10, p50, p90 = np.percentile(self.turns[won], [10, 50, 90])
+            lines.append(f"Turns to kill: mean {self.turns[won].mean():.2f}, p10 {p10:.0f}, p50 {p50:.0f}, p90 {p90:.0f}")
+            lines.append(f"Player HP left when winning: mean {self.player_hp[won].mean():.1f}")
+        lost = self.winners == 2
+        if lost.any():
+            lines.append(f"Monster HP left when losing: mean {self.monster_hp[lost].mean():.1f}")
+        return "\n".join(lines)
+
+
+def player_hits(player: Player, monster: Monster, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Roll `size` attacks of the player against the monster."""
+    stats = player.stats
+    atk = stats.atk
+    if atk <= 0:
+        return np.zeros(size, dtype=np.int64)
+    damage_variation = atk * 0.1
+    rolled = np.round(atk + rng.uniform(-damage_variation, damage_variation, size))
+    effective = np.round(rolled * monster.damage_factor)
+    crits = rng.random(size) < stats.crit_chance
+    effective[crits] = np.round(effective[crits] * stats.crit_damage)
+    return effective.astype(np.int64)
+
+
+def monster_hits(monster: Monster, player: Player, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Roll `size` attacks of the monster against the player."""
+    damage_variation = monster.damage * 0.1
+    rolled = np.round(monster.damage + rng.uniform(-damage_variation, damage_variation, size))
+    stats = player.stats
+    reduction = stats.damage_factor
+    dodged = rng.random(size) <= stats.dodge_chance
+    crits = rng.random(size) <= monster.crit_chance
+    damage = np.where(crits, np.round(np.round(rolled * monster.crit_damage) * reduction), np.round(rolled * reduction))
+    damage[dodged] = 0
+    return damage.astype(np.int64)
+
+
+def simulate_battles(player: Player, monster: Monster, n: int = 100000, seed: Optional[int] = None,
+                     max_turns: int = MAX_BATTLE_TURNS) -> SimulationResult:
+    """Play `n` independent fights of the player against the monster."""
+    rng = np.random.default_rng(seed)
+    winners = np.zeros(n, dtype=np.int8)
+    turns = np.full(n, max_turns, dtype=np.int64)
+    player_hp_left = np.empty(n, dtype=np.int64)
+    monster_hp_left = np.empty(n, dtype=np.int64)
+
+    # Only the fights still running are kept in these arrays
+    fights = np.arange(n)
+    player_hp = np.full(n, player.stats.max_hp, dtype=np.int64)
+    monster_hp = np.full(n, monster.hp, dtype=np.int64)
+    for turn in range(1, max_turns + 1):
+        if fights.size == 0:
+            break
+        monster_hp -= player_hits(player, monster, fights.size, rng)
+        done = monster_hp <= 0
+        if done.any():
+            ended = fights[done]
+            winners[ended] = 1
+            turns[ended] = turn
+            player_hp_left[ended] = player_hp[done]
+            monster_hp_left[ended] = monster_hp[done]
+            fights, player_hp, monster_hp = fights[~done], player_hp[~done], monster_hp[~done]
+
+        player_hp -= monster_hits(monster, player, fights.size, rng)
+        done = player_hp <= 0
+        if done.any():
+            ended = fights[done]
+            winners[ended] = 2
+            turns[ended] = turn
+            player_hp_left[ended] = player_hp[done]
+            monster_hp_left[ended] = monster_hp[done]
+            fights, player_hp, monster_hp = fights[~done], player_hp[~done], monster_hp[~done]
+
+    # Draws: nobody died before max_turns
+    player_hp_left[fights] = player_hp
+    monster_hp_left[fights] = monster_hp
+    return SimulationResult(monster, winners, turns, player_hp_left, monster_hp_left)
+
+
+def find_monster(monster_name: str, monsters=None) -> Monster:
+    """Find a monster of init_monsters() by its name or the start of it, accents and case ignored."""
+    monsters = monsters if monsters is not None else init_monsters()
+    wanted = remove_accents(monster_name.strip().lower())
+    candidates = [monster for zone_monsters in monsters.values() for monster in zone_monsters]
+    for monster in candidates:
+        if remove_accents(monster.name.lower()) == wanted:
+            return monster
+    for monster in candidates:
+        if remove_accents(monster.name.lower()).startswith(wanted):
+            return monster
+    raise KeyError(f"Unknown monster: {monster_name}")
+
+
+def build_player(level: int = 1, item_names: Iterable[str] = (), shop_items: Optional[List[Item]] = None) -> Player:
+    """Build a player of the given level wearing items of the shop, without printing anything."""
+    shop_items = shop_items if shop_items is not None else init_shop()
+    player = Player("Simulation")
+    with contextlib.redirect_stdout(io.StringIO()):
+        player.add_xp(sum(Player.xp_requirements[1:level]))
+        for item_name in item_names:
+            wanted = remove_accents(item_name.strip().lower())
+            matches = [item for item in shop_items if remove_accents(item.name.strip().lower()) == wanted]
+            if not matches:
+                raise KeyError(f"Unknown item: {item_name}")
+            player.inventory.append(matches[0])
+            player.equip_item(matches[0].name)
+    return player
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many fights of one player build against one monster.")
+    parser.add_argument("monster", help="name of the monster, e.g. Eclair")
+    parser.add_argument("-n", "--fights", type=int, default=100000)
+    parser.add_argument("-l", "--level", type=int, default=1)
+    parser.add_argument("-i", "--item", action="append", default=[], help="shop item to equip, can be repeated")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    player = build_player(args.level, args.item)
+    result = simulate_battles(player, find_monster(args.monster), args.fights, args.seed)
+    print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,30 @@
-def xp_needed_for_level() -> int:
-    target_level = int(input("Please enter the target level: "))
-    
-    base_xp = 75
-    total_xp = 0
-
-    for i in range(1, target_level):
-        total_xp += base_xp
-
-        if i < 10:
-            increase_percent = 1.20
-        elif i < 20:
-            increase_percent = 1.13
-        elif i < 30:
-            increase_percent = 1.15
-        elif i < 40:
-            increase_percent = 1.17
-        elif i < 42:
-            increase_percent = 1.20
-        else:
-            increase_percent += 0.01
-
-        base_xp *= increase_percent
-
-    level_xp = int(base_xp)
-    total_xp += level_xp
+from typing import Tuple
+
+from Alien import Player
+
+
+def xp_needed_for_level(target_level: int) -> Tuple[int, int]:
+    """Return the total XP needed to clear the target level and the XP of that level alone.
 
+    Read from the cumulative table the game itself uses (Player.xp_cumulative).
+    """
+    max_level = len(Player.xp_requirements) - 1
+    if not 1 <= target_level <= max_level:
+        raise ValueError(f"The target level must be between 1 and {max_level}.")
+    level_xp = Player.xp_requirements[target_level]
+    total_xp = Player.xp_cumulative[target_level] + level_xp
     return total_xp, level_xp
 
-# Testing
-total_xp_needed, level_xp_needed = xp_needed_for_level()
-print("Total XP needed:", total_xp_needed)
-print("XP needed for the target level:", level_xp_needed)
+
+def stats_gained_at_level(target_level: int) -> Tuple[int, int, int]:
+    """Return the (max_hp, base_atk, defense) gained from level 1 to the target level."""
+    return Player.stat_gains_cumulative[target_level]
+
+
+if __name__ == "__main__":
+    target_level = int(input("Please enter the target level: "))
+    total_xp_needed, level_xp_needed = xp_needed_for_level(target_level)
+    hp, atk, defense = stats_gained_at_level(target_level)
+    print("Total XP needed:", total_xp_needed)
+    print("XP needed for the target level:", level_xp_needed)
+    print(f"Stats gained since level 1: HP +{hp}, ATK +{atk}, DEF +{defense}")
@@ -0,0 +1,54 @@
+"""Shared players for the tests. The modules of the game are flat scripts at the root of the repo."""
+import copy
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Alien import Player, SilentConsole, farm_zone, game_content, using_console  # noqa: E402
+from AlienSave import gear_record  # noqa: E402
+
+
+def trimmed(counts) -> tuple:
+    """Counters without their trailing zeros: an array padded by a later ID is the same counter."""
+    counts = list(counts)
+    while counts and not counts[-1]:
+        counts.pop()
+    return tuple(counts)
+
+
+def player_state(player: Player) -> tuple:
+    """Everything a save must give back."""
+    return (player.name, tuple(getattr(player, field) for field in Player.STORED_FIELDS), player.level_bonuses,
+            player.achieved, trimmed(player.kills), trimmed(player.zone_kills), gear_record(player),
+            player.idle_zone, player.idle_since)
+
+
+def play(player: Player, fights: int, zone: str = 'meteor', seed: int = 0) -> None:
+    """Some fights of the real game, with their rewards, level ups and achievements."""
+    content = game_content()
+    with using_console(SilentConsole()):
+        farm_zone(player, content.monsters, content.zone_requirements, zone, fights, random.Random(seed))
+
+
+def buy(player: Player, name: str) -> None:
+    item = next(item for item in game_content().shop_items if item.name == name)
+    player.inventory.append(copy.copy(item))
+    with using_console(SilentConsole()):
+        player.equip_item(item.name)
+
+
+@pytest.fixture
+def content():
+    return game_content()
+
+
+@pytest.fixture
+def player(content):
+    player = Player("Testeur", content.achievements)
+    play(player, 60)
+    buy(player, "DUSK")
+    return player
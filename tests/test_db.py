@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from AlienDB import PlayerDatabase
+from conftest import play, player_state
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = PlayerDatabase(str(tmp_path / 'test.db'), flush_interval=0.01)
+    yield database
+    database.close()
+
+
+def test_round_trip(tmp_path, content, player, database):
+    database.save('user1', player)
+    play(player, 30, seed=3)
+    database.save('user1', player)  # Only the changed rows
+    database.flush()
+    other = PlayerDatabase(str(tmp_path / 'test.db'))
+    try:
+        assert player_state(other.load('user1', content.achievements)) == player_state(player)
+        assert other.peek_by_name(player.name, content.achievements).gold == player.gold
+    finally:
+        other.close()
+
+
+def test_load_waits_for_the_queued_rows(content, player, database):
+    database.save('user1', player)
+    play(player, 30, seed=4)
+    database.save('user1', player)  # No flush: load must wait for these rows
+    assert player_state(database.load('user1', content.achievements)) == player_state(player)
+
+
+def test_failed_batch_is_written_in_full_at_the_next_save(content, player, database, monkeypatch):
+    database.save('user1', player)
+    database.flush()
+
+    def fail(batch):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(database, '_write', fail)
+    play(player, 30, seed=5)
+    database.save('user1', player)
+    with pytest.raises(sqlite3.OperationalError):
+        database.flush()
+    monkeypatch.undo()
+
+    assert database.failed == {'user1'}
+    database.save('user1', player)  # Nothing changed since, but the lost rows are written again
+    database.flush()
+    assert player_state(database.peek('user1', content.achievements)) == player_state(player)
+
+
+def test_unknown_player(content, database):
+    assert database.load('nobody', content.achievements) is None
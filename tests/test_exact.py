@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from Alien import Player, SilentConsole, resolve_battle, using_console
+from formulaExact import FFT_MIN_DAMAGE_VALUES, TOLERANCE, hits_to_kill, rolled_damage, solve_battle
+
+
+def direct_hits_to_kill(hit_table, hp, max_turns):
+    """Same DP, one state at a time."""
+    alive = {0: 1.0}
+    kills = [0.0]
+    for _ in range(max_turns):
+        after = {}
+        for taken, p in alive.items():
+            for damage, q in hit_table.items():
+                if taken + damage < hp:
+                    after[taken + damage] = after.get(taken + damage, 0.0) + p * q
+        kills.append(sum(alive.values()) - sum(after.values()))
+        alive = after
+    return np.array(kills)
+
+
+def test_fixed_hits():
+    kills = hits_to_kill({3: 1.0}, 10)
+    assert kills[4] == pytest.approx(1.0) and kills[:4].sum() == pytest.approx(0.0)
+
+
+def test_rolled_damage_is_a_distribution():
+    for damage in (1, 7, 20, 333):
+        table = rolled_damage(damage)
+        assert sum(table.values()) == pytest.approx(1.0)
+        assert min(table) >= round(damage * 0.9) - 1 and max(table) <= round(damage * 1.1) + 1
+
+
+@pytest.mark.parametrize("values", [5, FFT_MIN_DAMAGE_VALUES + 100])  # Direct convolution, then the FFT
+def test_hits_to_kill_matches_the_direct_dp(values):
+    rng = np.random.default_rng(0)
+    weights = rng.random(values)
+    hit_table = {int(damage): float(weight / weights.sum()) for damage, weight in zip(rng.choice(400, values, replace=False), weights)}
+    hp, turns = 600, 12
+    expected = direct_hits_to_kill(hit_table, hp, turns)
+    kills = hits_to_kill(hit_table, hp, turns)
+    assert np.allclose(kills, expected[:len(kills)], atol=1e-9)
+    assert expected[len(kills):].sum() < TOLERANCE * 10
+
+
+def test_solve_battle_matches_the_game(content):
+    player = Player("Testeur", content.achievements)
+    with using_console(SilentConsole()):
+        player.add_xp(5000)
+    monster = next(monster for monster in content.monsters['spatiofarm'] if monster.name == "Petalo")
+    exact = solve_battle(player, monster)
+    assert 0.2 < exact.win_probability < 0.8  # A close fight, where a wrong rule shows
+    assert exact.win_probability + exact.loss_probability + exact.draw_probability == pytest.approx(1.0)
+    assert sum(exact.turns_to_kill) == pytest.approx(exact.win_probability)
+
+    rng, fights = random.Random(0), 4000
+    wins = sum(resolve_battle(player, monster, rng, keep_log=False).player_won for _ in range(fights))
+    sigma = (exact.win_probability * (1 - exact.win_probability) / fights) ** 0.5
+    assert abs(wins / fights - exact.win_probability) <= 4 * sigma + 1e-3
@@ -0,0 +1,52 @@
+import random
+
+from Alien import Player
+from AlienLeaderboard import Leaderboards, RetiredPlayer, SkipList
+
+
+def test_skip_list_matches_a_sorted_list():
+    rng = random.Random(0)
+    entries = SkipList(seed=1)
+    expected = []
+    for _ in range(3000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            entries.remove(key)
+        else:
+            key = (rng.randrange(500), rng.random())
+            entries.insert(key, str(key))
+            expected.append(key)
+            expected.sort()
+    assert len(entries) == len(expected)
+    assert [key for key, _ in entries.items()] == expected
+    for position, key in enumerate(expected, 1):
+        assert entries.rank(key) == position
+
+
+def test_ranks_follow_the_scores(content):
+    boards = Leaderboards()
+    players = [Player(f"p{index}", content.achievements) for index in range(5)]
+    for player in players:
+        boards.add(player)
+    for index, player in enumerate(players):
+        player.gold = [30, 10, 50, 10, 20][index]  # Watched: the board moves at once
+    board = boards.find('gold')
+    assert [(player.name, score) for player, score in board.top(5)] == [("p2", 50), ("p0", 30), ("p4", 20), ("p1", 10), ("p3", 10)]
+    assert [board.rank(player) for player in players] == [2, 4, 1, 5, 3]  # p1 reached 10 first
+
+
+def test_retired_player_keeps_its_place(content):
+    boards = Leaderboards()
+    alice, bob = Player("alice", content.achievements), Player("bob", content.achievements)
+    boards.add(alice, 'a')
+    boards.add(bob, 'b')
+    alice.gold, bob.gold = 100, 50
+    boards.retire('a', alice)
+    board = boards.find('gold')
+    first, score = board.top(1)[0]
+    assert isinstance(first, RetiredPlayer) and (first.name, score) == ("alice", 100)
+    alice.gold = 10  # Out of the boards: nothing moves
+    assert board.top(1)[0][1] == 100
+
+    boards.add(alice, 'a')
+    assert board.rank(alice) == 2 and len(board) == 2 and not boards.retired
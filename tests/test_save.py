@@ -0,0 +1,39 @@
+import os
+
+from AlienSave import PlayerSave
+from conftest import play, player_state
+
+
+def test_snapshot_round_trip(tmp_path, content, player):
+    save = PlayerSave(player.name, str(tmp_path))
+    save.compact(player)
+    assert player_state(PlayerSave(player.name, str(tmp_path)).load(content.achievements)) == player_state(player)
+
+
+def test_journal_replay(tmp_path, content, player):
+    save = PlayerSave(player.name, str(tmp_path))
+    save.save(player)  # First save: snapshot
+    for seed in range(5):
+        play(player, 20, seed=seed)
+        player.idle_zone, player.idle_since = 'meteor', 1000.0 + seed
+        assert save.save(player) > 0  # Only appended to the journal
+    assert os.path.getsize(save.journal_path) > 0
+    assert player_state(PlayerSave(player.name, str(tmp_path)).load(content.achievements)) == player_state(player)
+
+
+def test_torn_journal_keeps_the_records_before(tmp_path, content, player):
+    save = PlayerSave(player.name, str(tmp_path))
+    save.save(player)
+    play(player, 20, seed=1)
+    save.save(player)
+    before = player_state(player)
+    size = os.path.getsize(save.journal_path)
+    play(player, 20, seed=2)
+    save.save(player)
+    with open(save.journal_path, 'r+b') as file:
+        file.truncate(size + 3)  # A crash in the middle of the next record
+    assert player_state(PlayerSave(player.name, str(tmp_path)).load(content.achievements)) == before
+
+
+def test_no_save(tmp_path, content):
+    assert PlayerSave("Personne", str(tmp_path)).load(content.achievements) is None